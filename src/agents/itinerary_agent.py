@@ -1,17 +1,27 @@
+import contextvars
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
 from groq import Groq
 
-def itinerary_agent_run(data: dict):
-    client = Groq(api_key=os.getenv("GROQ_API_KEY"))
+from src.tools.circuit_breaker import CircuitOpenError, get_breaker
+from src.tools.deadline import DeadlineExceeded, call_timeout, record_cut, remaining
+from src.tools.llm_telemetry import record_llm_call
+from src.tools.itinerary_template import render_days, render_itinerary
+from src.tools.rate_limit import MAX_BACKOFF_S, _parse_retry_after, acquire, penalize, try_acquire
 
-    budget = data["budget"]
-    weather = data["weather"]
-    places = data["places"]
-    routing = data["routing_summary"]
+MODEL = "llama-3.1-8b-instant"
+# Token bucket (src.tools.rate_limit) every completion waits for
+GROQ_HOST = "api.groq.com"
 
-    # -----------------------------
-    # FIXED WEATHER COMPRESSION
-    # -----------------------------
+# Per-day mode: one bounded completion per day plus an overview, run concurrently
+DAY_MAX_TOKENS = 450
+OVERVIEW_MAX_TOKENS = 300
+CALL_TIMEOUT_S = 30
+MAX_PARALLEL_CALLS = 12
+
+
+def _compress_weather(weather: dict, days: int = 2) -> list:
     forecast = weather.get("forecast", {})
 
     compressed_weather = []
@@ -21,20 +31,71 @@ def itinerary_agent_run(data: dict):
         tmin = forecast.get("temperature_2m_min", [])
         rain = forecast.get("precipitation_sum", [])
 
-        for i in range(min(2, len(dates))):
+        for i in range(min(days, len(dates))):
             compressed_weather.append({
                 "date": dates[i],
                 "max": tmax[i],
                 "min": tmin[i],
                 "rain": rain[i]
             })
+    return compressed_weather
+
+
+def _place_names(places: dict, group: str) -> list:
+    return [p["name"] for p in places.get(group, [])]
+
+
+def _city_section(city: dict) -> str:
+    """Compact prompt block for one stop of a multi-city trip."""
+    return f"""
+## {city['destination']} ({city['days']} days)
+Weather: {_compress_weather(city['weather'])}
+Top Attractions: {_place_names(city['places'], 'attractions')}
+Top Beaches: {_place_names(city['places'], 'beaches')}
+Food Places: {_place_names(city['places'], 'food')}
+Travel Time (summary): {city['routing_summary'].get('summary')}
+"""
+
+
+def itinerary_agent_run(data: dict):
+    budget = data["budget"]
+
+    # -----------------------------
+    # MULTI-CITY: one section per stop, single completion
+    # -----------------------------
+    if data.get("cities"):
+        sections = "".join(_city_section(c) for c in data["cities"])
+        prompt = f"""
+You are an expert travel planner.
+
+Multi-city trip: {budget['breakdown']['destination']}
+Total days: {budget['breakdown']['days']}
+Budget: ₹{budget['breakdown']['total_estimated']}
+{sections}
+Write a clear, friendly, day-by-day itinerary covering the cities in order:
+- Morning / Afternoon / Evening plan
+- Places to visit
+- Travel between cities on the transfer days
+- Food suggestions
+- Short budget usage summary
+    """
+        return _complete_or_summary(prompt, data)
+
+    weather = data["weather"]
+    places = data["places"]
+    routing = data["routing_summary"]
+
+    # -----------------------------
+    # FIXED WEATHER COMPRESSION
+    # -----------------------------
+    compressed_weather = _compress_weather(weather)
 
     # -----------------------------
     # PLACES COMPRESSED
     # -----------------------------
-    top_attractions = [p["name"] for p in places.get("attractions", [])]
-    top_beaches = [p["name"] for p in places.get("beaches", [])]
-    top_food = [p["name"] for p in places.get("food", [])]
+    top_attractions = _place_names(places, "attractions")
+    top_beaches = _place_names(places, "beaches")
+    top_food = _place_names(places, "food")
 
     # -----------------------------
     # PROMPT
@@ -63,12 +124,242 @@ Write a clear, friendly, day-by-day itinerary:
 - Short budget usage summary
     """
 
-    response = client.chat.completions.create(
-        model="llama-3.1-8b-instant",
-        messages=[{"role": "user", "content": prompt}],
-        max_tokens=1500,
-        temperature=0.6,
+    return _complete_or_summary(prompt, data)
+
+
+def _client(retries: bool = True) -> Groq:
+    # Under a plan deadline the SDK's own retries would overrun it: one attempt only
+    if not retries or remaining() is not None:
+        return Groq(api_key=os.getenv("GROQ_API_KEY"), max_retries=0)
+    return Groq(api_key=os.getenv("GROQ_API_KEY"))
+
+
+def _usage(chunk):
+    # Groq reports usage on the last streamed chunk, under x_groq (or usage in newer SDKs)
+    usage = getattr(chunk, "usage", None) or getattr(getattr(chunk, "x_groq", None), "usage", None)
+    if usage is None:
+        return None, None
+    return getattr(usage, "prompt_tokens", None), getattr(usage, "completion_tokens", None)
+
+
+def _pace(max_wait_s: float = None) -> None:
+    """Wait for a Groq request slot, at most max_wait_s (None: as long as it takes)."""
+    if max_wait_s is None:
+        acquire(GROQ_HOST)
+    elif not try_acquire(GROQ_HOST, max_wait_s):
+        left = remaining()
+        if left is not None and left <= max_wait_s:
+            raise DeadlineExceeded("no groq slot before the deadline")
+        raise TimeoutError(f"no groq slot within {max_wait_s:.0f}s")
+
+
+def _complete(client, prompt: str, max_tokens: int = 1500, timeout: float = None, label: str = "itinerary") -> str:
+    """
+    One streamed completion. Records tokens, time to first token, latency,
+    throughput and truncation (src.tools.llm_telemetry), also for failures.
+    `timeout` bounds the whole call, including the wait for a slot in the
+    shared Groq rate limit: the SDK gets what is left per read, and the
+    stream is closed once it has passed (at most one read timeout late).
+    A 429 blocks the Groq bucket for its Retry-After and, like in
+    polite_get, does not count as a circuit breaker failure.
+    """
+    # Shared "groq" circuit breaker: fail fast while the LLM is down
+    breaker = get_breaker("groq")
+    if not breaker.allow():
+        raise CircuitOpenError("groq circuit open; not calling the LLM")
+    timeout = call_timeout(timeout)
+    give_up = time.monotonic() + timeout if timeout else None
+    _pace(timeout)
+    if give_up is not None:
+        left = give_up - time.monotonic()
+        if left <= 0:
+            raise TimeoutError(f"no time left for the completion after waiting {timeout:.0f}s for a slot")
+        timeout = call_timeout(left)
+    options = {"timeout": timeout} if timeout else {}
+    record = {"label": label, "model": MODEL, "ok": False, "prompt_tokens": None, "completion_tokens": None,
+              "ttft_s": None, "latency_s": None, "tokens_per_s": None, "truncated": False,
+              "max_tokens": max_tokens, "prompt_chars": len(prompt), "error": None}
+    start = time.perf_counter()
+    parts, finish_reason = [], None
+    try:
+        stream = client.chat.completions.create(
+            model=MODEL,
+            messages=[{"role": "user", "content": prompt}],
+            max_tokens=max_tokens,
+            temperature=0.6,
+            stream=True,
+            **options,
+        )
+        # Close the HTTP response on every exit, including the deadline raises below
+        try:
+            for chunk in stream:
+                for choice in chunk.choices or []:
+                    content = getattr(choice.delta, "content", None)
+                    if content:
+                        if record["ttft_s"] is None:
+                            record["ttft_s"] = round(time.perf_counter() - start, 4)
+                        parts.append(content)
+                    finish_reason = choice.finish_reason or finish_reason
+                prompt_tokens, completion_tokens = _usage(chunk)
+                if prompt_tokens is not None:
+                    record["prompt_tokens"], record["completion_tokens"] = prompt_tokens, completion_tokens
+                # The SDK timeout bounds each read, not the whole stream
+                if remaining() == 0:
+                    raise DeadlineExceeded("plan deadline reached while streaming")
+                if give_up is not None and time.monotonic() > give_up:
+                    raise TimeoutError(f"completion still streaming after {timeout:.0f}s")
+        finally:
+            close = getattr(stream, "close", None)
+            if close:
+                close()
+    except Exception as e:
+        record["latency_s"] = round(time.perf_counter() - start, 4)
+        record["error"] = f"{type(e).__name__}: {e}"
+        record_llm_call(record)
+        # 429 means "slow down", not "unhealthy": hold back every caller instead
+        if getattr(e, "status_code", None) == 429:
+            retry_after = _parse_retry_after(getattr(getattr(e, "response", None), "headers", {}).get("retry-after"))
+            penalize(GROQ_HOST, min(retry_after if retry_after is not None else 1.0, MAX_BACKOFF_S))
+        breaker.record(getattr(e, "status_code", None) == 429)
+        raise
+    breaker.record(True)
+
+    latency = time.perf_counter() - start
+    generating = latency - (record["ttft_s"] or 0)
+    record.update({
+        "ok": True,
+        "latency_s": round(latency, 4),
+        "truncated": finish_reason == "length",
+        "tokens_per_s": round(record["completion_tokens"] / generating, 1)
+        if record["completion_tokens"] and generating > 0 else None,
+    })
+    record_llm_call(record)
+    return "".join(parts)
+
+
+def _complete_or_summary(prompt: str, data: dict) -> str:
+    # data["degraded"] tells the caller the text is a fallback (not worth caching)
+    try:
+        # Inside the guard: a client that can't be built (no API key) is an unavailable LLM too
+        return _complete(_client(), prompt, label="itinerary")
+    except Exception as e:
+        print(f"[warning] itinerary LLM unavailable ({e}); using the template itinerary")
+        record_cut("itinerary", f"template itinerary instead of LLM itinerary ({type(e).__name__})")
+        data["degraded"] = True
+        return render_itinerary(data["budget"], data["day_plans"], data.get("places"))
+
+
+# -----------------------------
+# PER-DAY MODE
+# -----------------------------
+
+def _visit_line(visit: dict) -> str:
+    # build_itinerary visits carry times and travel legs; untimed ones just a name
+    line = f"- {visit['arrival_time'][11:16]} {visit['name']}" if visit.get("arrival_time") else f"- {visit['name']}"
+    if visit.get("travel_mode") and visit.get("travel_time_s"):
+        line += f" ({visit['travel_time_readable']} by {visit['travel_mode']})"
+    return line
+
+
+def _overview_prompt(data: dict) -> str:
+    breakdown = data["budget"]["breakdown"]
+    outline = "\n".join(
+        f"Day {d['day']} ({d['destination']}): {', '.join(v['name'] for v in d['visits']) or 'free day'}"
+        for d in data["day_plans"]
     )
+    return f"""
+You are an expert travel planner.
+
+Trip: {breakdown['destination']}, {breakdown['days']} days, {breakdown['persons']} traveller(s)
+Budget: ₹{breakdown['total_estimated']}
+
+Day outline:
+{outline}
+
+Write a short trip overview (max 120 words): the flow of the trip, what to pack
+for the weather, and a one-line budget usage summary. Do not write the daily plans.
+    """
+
+
+def _day_prompt(data: dict, day: dict) -> str:
+    visits = "\n".join(_visit_line(v) for v in day["visits"]) or "- no fixed visits: suggest a relaxed day nearby"
+    return f"""
+You are an expert travel planner.
+
+Write ONLY Day {day['day']} of a {data['budget']['breakdown']['days']}-day trip, in {day['destination']}.
+Start with the heading "## Day {day['day']} — {day['destination']}".
+Weather: {day['weather'] or 'no forecast'}
+Planned visits (keep this order and timing):
+{visits}
+Food suggestions: {day['food']}
+
+Give a Morning / Afternoon / Evening plan with food suggestions, max 200 words.
+    """
+
+
+def itinerary_agent_run_per_day(data: dict, timeout_s: float = CALL_TIMEOUT_S) -> str:
+    """
+    Per-day generation: data carries "budget" and "day_plans" (one dict per
+    day: day, destination, weather, visits, food). One bounded completion per
+    day plus an overview run concurrently, so generation time stays close to
+    that of a single day; they are paced by the shared Groq rate limit, so a
+    long trip queues for slots instead of drawing 429s. Days whose call fails
+    or times out fall back to the template rendering of the day plan
+    (src.tools.itinerary_template), and a plan with no LLM text at all to the
+    template itinerary; a missing overview is left out. Each sets
+    data["degraded"].
+    Calls still running after timeout_s are not awaited. They make no SDK
+    retries and stop streaming once their own timeout_s has passed, so an
+    abandoned call ends (and stops using Groq quota) at most one read
+    timeout later; its telemetry then only reaches llm_stats().
+    """
+    day_plans = data["day_plans"]
+    texts = {}
+    try:
+        # Bound the whole fan-out from here (each call also checks the deadline)
+        timeout_s = call_timeout(timeout_s)
+        client = _client(retries=False)
+    except DeadlineExceeded:
+        record_cut("itinerary", "plain day plans (no time left for the LLM)")
+        data["degraded"] = True
+        futures = {}
+    except Exception as e:
+        print(f"[warning] itinerary LLM unavailable ({e}); using plain day plans")
+        record_cut("itinerary", f"plain day plans instead of LLM days ({type(e).__name__})")
+        data["degraded"] = True
+        futures = {}
+    else:
+        jobs = {"overview": (_overview_prompt(data), OVERVIEW_MAX_TOKENS)}
+        for day in day_plans:
+            jobs[day["day"]] = (_day_prompt(data, day), DAY_MAX_TOKENS)
+
+        pool = ThreadPoolExecutor(max_workers=min(len(jobs), MAX_PARALLEL_CALLS))
+        # Each call runs in a copy of this context, so it is recorded with the plan's LLM calls
+        futures = {
+            key: pool.submit(contextvars.copy_context().run, _complete, client, prompt, max_tokens, timeout_s,
+                             "overview" if key == "overview" else f"day {key}")
+            for key, (prompt, max_tokens) in jobs.items()
+        }
+        # The calls run side by side, so timeout_s also bounds the whole fan-out:
+        # stragglers are abandoned, not awaited (each one bounds itself, see _complete)
+        wait(futures.values(), timeout=timeout_s)
+        pool.shutdown(wait=False, cancel_futures=True)
 
-    return response.choices[0].message.content
+    for key, fut in futures.items():
+        if fut.done() and not fut.cancelled() and fut.exception() is None:
+            texts[key] = fut.result()
+        else:
+            error = fut.exception() if fut.done() and not fut.cancelled() else "timed out"
+            label = "overview" if key == "overview" else f"day {key}"
+            print(f"[warning] itinerary {label} failed: {error}")
+            data["degraded"] = True
+            record_cut("itinerary", f"{label}: {'left out' if key == 'overview' else 'plain day plan'} ({error})")
 
+    if not texts:
+        return render_itinerary(data["budget"], day_plans, data.get("places"))
+    parts = [f"# {data['budget']['breakdown']['destination']} — {len(day_plans)} days"]
+    if texts.get("overview"):
+        parts.append(texts["overview"].strip())
+    for day in day_plans:
+        parts.append((texts.get(day["day"]) or render_days([day])).strip())
+    return "\n\n".join(parts)
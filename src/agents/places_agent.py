@@ -5,6 +5,8 @@ from src.tools.places import (
     get_beaches,
     get_food
 )
+from src.tools.poi import poi_to_dict
+from src.tools.poi_index import dedupe_categories
 
 
 def places_agent_run(place: str, radius: int = 15000, limit: int = 10) -> Dict:
@@ -12,7 +14,8 @@ def places_agent_run(place: str, radius: int = 15000, limit: int = 10) -> Dict:
     Places Agent:
     1. Geocodes the location
     2. Fetches attractions / beaches / food places
-    3. Returns clean structured data
+    3. Merges duplicates across categories
+    4. Returns clean structured data
     """
 
     geo = nominatim_geocode(place)
@@ -35,11 +38,15 @@ def places_agent_run(place: str, radius: int = 15000, limit: int = 10) -> Dict:
             return data
         return []
 
+    groups = dedupe_categories({
+        "attractions": normalize(attractions),
+        "beaches": normalize(beaches),
+        "food": normalize(food_places),
+    })
+
     return {
         "place": geo["display_name"],
         "lat": lat,
         "lon": lon,
-        "attractions": normalize(attractions),
-        "beaches": normalize(beaches),
-        "food": normalize(food_places),
+        **{group: [poi_to_dict(p) for p in pois] for group, pois in groups.items()},
     }
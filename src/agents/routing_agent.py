@@ -2,10 +2,11 @@ from typing import Dict, List
 from src.tools.routing_matrix import compute_matrix_from_places
 
 
-def routing_agent_run(places: List[Dict]) -> Dict:
+def routing_agent_run(places: List[Dict], method: str = "osrm") -> Dict:
     """
     Routing Agent:
     Input: list of places with lat/lon
+           method: "osrm" (road routing) or "approx" (instant straight-line estimate)
     Output:
         - durations
         - distances
@@ -15,7 +16,7 @@ def routing_agent_run(places: List[Dict]) -> Dict:
     if not places or len(places) < 2:
         return {"error": "Need at least 2 places for routing."}
 
-    matrix = compute_matrix_from_places(places)
+    matrix = compute_matrix_from_places(places, method=method)
 
     return {
         "places": places,
@@ -24,4 +25,5 @@ def routing_agent_run(places: List[Dict]) -> Dict:
         "duration_s": matrix.get("duration_s"),
         "distance_readable": matrix.get("distance_readable"),
         "duration_readable": matrix.get("duration_readable"),
+        "approximate": matrix.get("approximate", False),
     }
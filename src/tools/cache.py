@@ -0,0 +1,353 @@
+"""
+Small JSON-file backed key/value cache with optional TTL.
+
+Usage:
+    ROUTES = FileCache("route_cache.json", ttl_s=30 * 24 * 3600)
+    hit = ROUTES.get(key)
+    ROUTES.set(key, value)
+    ROUTES.flush()
+
+The file is loaded once per process and written back on flush() (and at
+interpreter exit), so hot loops don't rewrite the whole file per entry.
+flush() merges this process's changes into the file as it is on disk, under
+an flock on "<file>.lock": processes sharing a cache (batch workers) keep
+each other's entries, and the newer write of a key wins. Each entry is
+stored as {"v": value, "t": unix time written}. Files from before that
+format (plain {key: value}) are read as entries written at the file's
+modification time; they are only rewritten once something changes.
+
+Inside `with refresh_ahead(0.8):` entries older than 80% of their TTL count
+as misses, so a cache warmer re-fetches them before they actually expire.
+
+Metrics: every cache counts hits, misses, expired entries, stale serves
+(get(allow_stale=True) of an expired entry), writes and evictions, plus a
+lookup latency histogram; owners can add their own with count(event).
+Counters are added to a "<file>.stats.json"
+sidecar on flush (under the same lock), so stats() reports traffic across processes until
+reset_stats(). stats() also reports entry count, size in bytes and an entry
+age histogram. Admin operations (prune, compact, export, import) are on
+FileCache too; see src.tools.cache_admin for the command line.
+
+Functions:
+- refresh_ahead(fraction) -> context manager
+- cache_stats() -> {name: stats} for every FileCache in the process
+"""
+
+import atexit
+import bisect
+import contextvars
+import json
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional, Set, Tuple
+
+try:
+    import fcntl
+except ImportError:   # Windows: no cross-process lock, flushes just merge
+    fcntl = None
+
+# Fraction of the TTL after which get() reports a miss (see refresh_ahead)
+_ttl_fraction = contextvars.ContextVar("ttl_fraction", default=1.0)
+
+# Upper bounds of the lookup latency buckets (ms); the last bucket is open
+LATENCY_BUCKETS_MS = (0.01, 0.1, 1.0, 10.0, 100.0)
+
+# Entry age buckets (label, upper bound in seconds)
+AGE_BUCKETS = (("<1h", 3600), ("<1d", 86400), ("<7d", 7 * 86400),
+               ("<30d", 30 * 86400), (">=30d", float("inf")))
+
+# Every FileCache of the process by name (see cache_stats)
+CACHES: Dict[str, "FileCache"] = {}
+
+
+@contextmanager
+def refresh_ahead(fraction: float):
+    """Treat entries older than fraction * ttl as expired within the block."""
+    token = _ttl_fraction.set(fraction)
+    try:
+        yield
+    finally:
+        _ttl_fraction.reset(token)
+
+
+def cache_stats() -> Dict[str, Dict[str, Any]]:
+    """stats() of every FileCache created in this process."""
+    return {name: cache.stats() for name, cache in sorted(CACHES.items())}
+
+
+def _latency_label(i: int) -> str:
+    if i < len(LATENCY_BUCKETS_MS):
+        return f"<{LATENCY_BUCKETS_MS[i]:g}ms"
+    return f">={LATENCY_BUCKETS_MS[-1]:g}ms"
+
+
+def _is_entry(entry: Any) -> bool:
+    return isinstance(entry, dict) and entry.keys() == {"v", "t"}
+
+
+class FileCache:
+    def __init__(self, path: str, ttl_s: Optional[float] = None, name: Optional[str] = None):
+        self.path = Path(path)
+        self.ttl_s = ttl_s
+        self.name = name or self.path.stem.replace("_cache", "")
+        self._lock = threading.Lock()
+        self._data: Optional[Dict[str, Dict[str, Any]]] = None
+        self._dirty = False
+        # Keys written / evicted since the last flush (merged into the file)
+        self._changed: Set[str] = set()
+        self._deleted: Set[str] = set()
+        self._counts: Counter = Counter()
+        CACHES[self.name] = self
+        atexit.register(self.flush)
+
+    @property
+    def stats_path(self) -> Path:
+        return self.path.with_suffix(self.path.suffix + ".stats.json")
+
+    @property
+    def lock_path(self) -> Path:
+        return self.path.with_suffix(self.path.suffix + ".lock")
+
+    @contextmanager
+    def _file_lock(self):
+        """Exclusive lock shared by every process using this cache file."""
+        if fcntl is None:
+            yield
+            return
+        with open(self.lock_path, "a") as fh:
+            fcntl.flock(fh, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(fh, fcntl.LOCK_UN)
+
+    def _read_file(self) -> Dict[str, Dict[str, Any]]:
+        if not self.path.exists():
+            return {}
+        try:
+            data = json.loads(self.path.read_text())
+        except Exception:
+            return {}
+        legacy = [k for k, e in data.items() if not _is_entry(e)]
+        if legacy:
+            written = self.path.stat().st_mtime
+            for k in legacy:
+                data[k] = {"v": data[k], "t": written}
+        return data
+
+    def _entries(self) -> Dict[str, Dict[str, Any]]:
+        if self._data is None:
+            self._data = self._read_file()
+        return self._data
+
+    def _expired(self, entry: Dict[str, Any], now: float) -> bool:
+        return self.ttl_s is not None and now - entry["t"] > self.ttl_s * _ttl_fraction.get()
+
+    def get(self, key: str, allow_stale: bool = False) -> Any:
+        """Return the cached value, or None if missing (or expired, unless allow_stale)."""
+        start = time.perf_counter()
+        with self._lock:
+            entry = self._entries().get(key)
+        expired = entry is not None and self._expired(entry, time.time())
+        if allow_stale:
+            # Fallback lookup after a failed refresh: not part of the hit rate
+            outcome = "stale_served" if expired else None
+        else:
+            outcome = "misses" if entry is None else "expired" if expired else "hits"
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        with self._lock:
+            if outcome:
+                self._counts[outcome] += 1
+            self._counts[f"lookup_{bisect.bisect_left(LATENCY_BUCKETS_MS, elapsed_ms)}"] += 1
+            self._counts["lookup_ms_total"] += elapsed_ms
+        if entry is None or (expired and not allow_stale):
+            return None
+        return entry["v"]
+
+    def age(self, key: str) -> Optional[float]:
+        """Seconds since the entry was written (None if missing)."""
+        with self._lock:
+            entry = self._entries().get(key)
+        return None if entry is None else time.time() - entry["t"]
+
+    def items(self) -> Iterator[Tuple[str, Any]]:
+        """(key, value) of every fresh entry (a snapshot; lookups are not counted)."""
+        now = time.time()
+        with self._lock:
+            entries = list(self._entries().items())
+        return ((k, e["v"]) for k, e in entries if not self._expired(e, now))
+
+    def count(self, event: str, n: float = 1) -> None:
+        """Add to an owner-defined counter (reported under "events" in stats())."""
+        with self._lock:
+            self._counts[f"event_{event}"] += n
+
+    def set(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._entries()[key] = {"v": value, "t": time.time()}
+            self._changed.add(key)
+            self._deleted.discard(key)
+            self._counts["writes"] += 1
+            self._dirty = True
+
+    def flush(self) -> None:
+        """
+        Merge pending changes into the file and add this process's counters
+        to the stats sidecar, both under the cache's file lock.
+        """
+        with self._lock:
+            if not self._counts and not self._dirty:
+                return
+            with self._file_lock():
+                counts, self._counts = self._counts, Counter()
+                if counts:
+                    total = self._stored_counts() + counts
+                    self._write(self.stats_path, {k: total[k] for k in sorted(total)})
+                if not self._dirty:
+                    return
+                merged = self._read_file()
+                for key in self._deleted:
+                    merged.pop(key, None)
+                for key in self._changed:
+                    mine = self._data.get(key)
+                    if mine is not None and (key not in merged or merged[key]["t"] <= mine["t"]):
+                        merged[key] = mine
+                self._write(self.path, merged)
+                self._data = merged
+                self._changed, self._deleted = set(), set()
+                self._dirty = False
+
+    def _write(self, path: Path, data: Any) -> None:
+        tmp = path.with_suffix(path.suffix + ".tmp")
+        tmp.write_text(json.dumps(data))
+        tmp.replace(path)
+
+    def _stored_counts(self) -> Counter:
+        try:
+            return Counter(json.loads(self.stats_path.read_text()))
+        except Exception:
+            return Counter()
+
+    # -------------------------
+    # Metrics
+    # -------------------------
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Counters (this process plus earlier flushed ones), entry count,
+        serialized size, file size and entry age histogram.
+        """
+        now = time.time()
+        with self._lock:
+            counts = self._stored_counts() + self._counts
+            entries = dict(self._entries())
+        lookups = counts["hits"] + counts["misses"] + counts["expired"]
+        latency = {_latency_label(i): counts[f"lookup_{i}"] for i in range(len(LATENCY_BUCKETS_MS) + 1)}
+        timed = sum(latency.values())
+        ages = Counter()
+        expired_now = 0
+        for entry in entries.values():
+            age = now - entry["t"]
+            ages[next(label for label, bound in AGE_BUCKETS if age < bound)] += 1
+            expired_now += self.ttl_s is not None and age > self.ttl_s
+        return {
+            "path": str(self.path),
+            "ttl_s": self.ttl_s,
+            "entries": len(entries),
+            "expired_entries": expired_now,
+            "bytes": len(json.dumps(entries)),
+            "file_bytes": self.path.stat().st_size if self.path.exists() else 0,
+            "hits": counts["hits"],
+            "misses": counts["misses"],
+            "expired": counts["expired"],
+            "hit_rate": round(counts["hits"] / lookups, 4) if lookups else 0.0,
+            "stale_served": counts["stale_served"],
+            "writes": counts["writes"],
+            "evictions": counts["evictions"],
+            "lookup_ms_mean": round(counts["lookup_ms_total"] / timed, 4) if timed else 0.0,
+            "lookup_ms": latency,
+            "age": {label: ages[label] for label, _ in AGE_BUCKETS},
+            "events": {k[len("event_"):]: v for k, v in sorted(counts.items()) if k.startswith("event_")},
+        }
+
+    def reset_stats(self) -> None:
+        """Forget all counters, including the sidecar."""
+        with self._lock, self._file_lock():
+            self._counts = Counter()
+            self.stats_path.unlink(missing_ok=True)
+
+    # -------------------------
+    # Admin
+    # -------------------------
+
+    def prune(self, max_age_s: Optional[float] = None, max_bytes: Optional[int] = None) -> int:
+        """
+        Evict entries older than max_age_s, then the oldest ones until the
+        serialized size is at most max_bytes. Returns the number evicted.
+        """
+        now = time.time()
+        with self._lock:
+            data = self._entries()
+            doomed = {k for k, e in data.items() if max_age_s is not None and now - e["t"] > max_age_s}
+            if max_bytes is not None:
+                # Size of each entry as it appears in the file (approximately)
+                sizes = sorted((e["t"], len(json.dumps({k: e})), k) for k, e in data.items() if k not in doomed)
+                size = sum(s for _, s, _ in sizes)
+                for _, s, k in sizes:
+                    if size <= max_bytes:
+                        break
+                    doomed.add(k)
+                    size -= s
+            for k in doomed:
+                del data[k]
+            self._deleted |= doomed
+            self._changed -= doomed
+            self._counts["evictions"] += len(doomed)
+            self._dirty = self._dirty or bool(doomed)
+        return len(doomed)
+
+    def compact(self) -> Tuple[int, int]:
+        """
+        Evict expired entries and rewrite the file (in the current format).
+        Returns (bytes before, bytes after).
+        """
+        if not self.path.exists():
+            return 0, 0
+        before = self.path.stat().st_size
+        if self.ttl_s is not None:
+            self.prune(max_age_s=self.ttl_s)
+        with self._lock:
+            self._entries()
+            self._dirty = True
+        self.flush()
+        return before, self.path.stat().st_size
+
+    def export(self, path: str) -> int:
+        """Write all entries (with their timestamps) to path. Returns the entry count."""
+        with self._lock:
+            data = dict(self._entries())
+        Path(path).write_text(json.dumps(data))
+        return len(data)
+
+    def import_entries(self, path: str) -> int:
+        """
+        Merge entries exported from another cache file; an entry replaces an
+        existing one only if it is newer. Returns the number taken.
+        """
+        incoming = json.loads(Path(path).read_text())
+        taken = 0
+        with self._lock:
+            data = self._entries()
+            for key, entry in incoming.items():
+                if not _is_entry(entry):
+                    continue
+                if key not in data or data[key]["t"] < entry["t"]:
+                    data[key] = entry
+                    self._changed.add(key)
+                    self._deleted.discard(key)
+                    taken += 1
+            self._dirty = self._dirty or bool(taken)
+        return taken
@@ -0,0 +1,123 @@
+"""
+Inspect and maintain the caches (geocode, weather, places, route, itinerary).
+
+Functions:
+- load_caches(names=()) -> {name: FileCache}
+- format_stats(name, stats) -> str
+
+Every command works on all caches unless names are given (--cache NAME,
+repeatable). Hit/miss counters cover all processes since the last
+reset-stats (see src.tools.cache).
+
+    python -m src.tools.cache_admin stats [--json]
+    python -m src.tools.cache_admin prune --max-age-days 30 --max-mb 50
+    python -m src.tools.cache_admin compact --cache geocode
+    python -m src.tools.cache_admin export geocode geocode_backup.json
+    python -m src.tools.cache_admin import geocode geocode_backup.json
+    python -m src.tools.cache_admin reset-stats
+"""
+
+import argparse
+import importlib
+import json
+from typing import Any, Dict, Sequence
+
+from src.tools.cache import CACHES, FileCache
+
+# Cache name -> (module that owns it, attribute, file used if the module can't be imported)
+OWNERS = {
+    "geocode": ("src.tools.geocode_cache", "GEOCODE_CACHE", "geocode_cache.json"),
+    "weather": ("src.tools.weather", "WEATHER_CACHE", "weather_cache.json"),
+    "places": ("src.tools.places", "PLACES_CACHE", "places_cache.json"),
+    "route": ("src.tools.routing_matrix", "ROUTE_CACHE", "route_cache.json"),
+    "itinerary": ("src.tools.itinerary_cache", "ITINERARY_CACHE", "itinerary_cache.json"),
+}
+
+
+def load_caches(names: Sequence[str] = ()) -> Dict[str, FileCache]:
+    """
+    The named caches (all by default), as configured by their owning module
+    (path and TTL). A module that can't be imported here (e.g. missing API
+    key) is replaced by its file without a TTL.
+    """
+    caches = {}
+    for name in names or OWNERS:
+        if name not in OWNERS:
+            raise ValueError(f"unknown cache {name!r} (known: {', '.join(OWNERS)})")
+        module, attr, path = OWNERS[name]
+        try:
+            caches[name] = getattr(importlib.import_module(module), attr)
+        except Exception as e:
+            print(f"[warning] {module} unavailable ({e}); opening {path} without TTL")
+            caches[name] = CACHES.get(name) or FileCache(path, name=name)
+    return caches
+
+
+def _size(n: int) -> str:
+    return f"{n / 1e6:.2f} MB" if n >= 1e6 else f"{n / 1e3:.1f} KB"
+
+
+def format_stats(name: str, st: Dict[str, Any]) -> str:
+    ttl = f"{st['ttl_s'] / 3600:g}h" if st["ttl_s"] else "none"
+    ages = " ".join(f"{label}:{n}" for label, n in st["age"].items())
+    latency = " ".join(f"{label}:{n}" for label, n in st["lookup_ms"].items())
+    return "\n".join([
+        f"{name} ({st['path']}, ttl {ttl})",
+        f"  entries   {st['entries']} ({st['expired_entries']} expired), "
+        f"{_size(st['bytes'])} in memory, {_size(st['file_bytes'])} on disk",
+        f"  lookups   {st['hits']} hits, {st['misses']} misses, {st['expired']} expired "
+        f"(hit rate {st['hit_rate']:.1%}), {st['stale_served']} stale served",
+        f"  writes    {st['writes']}, evictions {st['evictions']}",
+        f"  age       {ages}",
+        f"  latency   mean {st['lookup_ms_mean']:.3f} ms; {latency}",
+    ] + ([f"  events    {' '.join(f'{k}:{v:g}' for k, v in st['events'].items())}"] if st["events"] else []))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect and maintain the provider caches")
+    parser.add_argument("command", choices=("stats", "prune", "compact", "export", "import", "reset-stats"))
+    parser.add_argument("args", nargs="*", help="export / import: CACHE FILE")
+    parser.add_argument("--cache", action="append", default=[], metavar="NAME",
+                        help=f"limit to these caches ({', '.join(OWNERS)})")
+    parser.add_argument("--json", action="store_true", help="stats as JSON")
+    parser.add_argument("--max-age-days", type=float, help="prune: evict entries older than this")
+    parser.add_argument("--max-mb", type=float, help="prune: evict the oldest entries beyond this size")
+    args = parser.parse_args()
+
+    if args.command in ("export", "import"):
+        if len(args.args) != 2:
+            parser.error(f"{args.command} takes CACHE FILE")
+        name, path = args.args
+        cache = load_caches([name])[name]
+        if args.command == "export":
+            print(f"[cache] {name}: exported {cache.export(path)} entries to {path}")
+        else:
+            print(f"[cache] {name}: imported {cache.import_entries(path)} entries from {path}")
+            cache.flush()
+        raise SystemExit(0)
+
+    caches = load_caches(args.cache)
+    if args.command == "stats":
+        stats = {name: cache.stats() for name, cache in caches.items()}
+        if args.json:
+            print(json.dumps(stats, indent=2))
+        else:
+            print("\n".join(format_stats(name, st) for name, st in stats.items()))
+    elif args.command == "prune":
+        if args.max_age_days is None and args.max_mb is None:
+            parser.error("prune needs --max-age-days and/or --max-mb")
+        for name, cache in caches.items():
+            evicted = cache.prune(
+                max_age_s=args.max_age_days * 86400 if args.max_age_days is not None else None,
+                max_bytes=int(args.max_mb * 1e6) if args.max_mb is not None else None,
+            )
+            cache.flush()
+            print(f"[cache] {name}: evicted {evicted} entries")
+    elif args.command == "compact":
+        for name, cache in caches.items():
+            before, after = cache.compact()
+            print(f"[cache] {name}: {_size(before)} -> {_size(after)}")
+    else:
+        for name, cache in caches.items():
+            cache.reset_stats()
+            print(f"[cache] {name}: counters reset")
@@ -0,0 +1,151 @@
+"""
+Per-provider circuit breakers.
+
+Classes / functions:
+- CircuitBreaker(name, failure_rate=0.5, window=20, min_calls=5, open_s=30)
+    .allow() -> bool
+    .record(success) -> None
+    .snapshot() -> dict
+- CircuitOpenError
+- get_breaker(provider) -> CircuitBreaker
+- provider_for(host) -> str
+- configure_breaker(provider, **settings) -> None
+- breaker_states() -> dict
+- breaker_events() -> list
+
+One breaker per provider (nominatim, geoapify, osrm, open-meteo, groq),
+shared by every tool and thread in the process. polite_get and the LLM
+client call allow() before a request and record() after it:
+
+    closed     requests flow; outcomes go into a rolling window
+    open       the window's error rate reached failure_rate (with at least
+               min_calls outcomes): requests fail fast with CircuitOpenError
+               and callers take their degraded path
+    half-open  open_s later, one probe request is let through; success
+               closes the breaker, failure re-opens it
+
+Every transition is printed and kept in breaker_events().
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, List
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half-open"
+
+PROVIDER_NAMES = {
+    "nominatim.openstreetmap.org": "nominatim",
+    "api.geoapify.com": "geoapify",
+    "router.project-osrm.org": "osrm",
+    "api.open-meteo.com": "open-meteo",
+}
+
+# Per-provider overrides of the CircuitBreaker defaults
+BREAKER_CONFIG: Dict[str, Dict[str, Any]] = {
+    "osrm": {"min_calls": 4, "open_s": 60},   # one call per matrix cell: trip early
+}
+
+MAX_EVENTS = 200
+
+_events: deque = deque(maxlen=MAX_EVENTS)
+_breakers: Dict[str, "CircuitBreaker"] = {}
+_registry_lock = threading.Lock()
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling a provider whose breaker is open."""
+
+
+class CircuitBreaker:
+    def __init__(self, name: str, failure_rate: float = 0.5, window: int = 20,
+                 min_calls: int = 5, open_s: float = 30.0):
+        self.name = name
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.open_s = open_s
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self._outcomes = deque(maxlen=window)
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def _transition(self, state: str, reason: str) -> None:
+        event = {"t": time.time(), "provider": self.name, "from": self.state, "to": state, "reason": reason}
+        self.state = state
+        _events.append(event)
+        print(f"[breaker] {self.name}: {event['from']} → {state} ({reason})")
+
+    def allow(self) -> bool:
+        """May a request go out now? In half-open state only one probe at a time."""
+        with self._lock:
+            if self.state == OPEN:
+                if time.time() - self.opened_at < self.open_s:
+                    return False
+                self._transition(HALF_OPEN, f"probing after {self.open_s:g}s")
+            if self.state == HALF_OPEN:
+                if self._probe_in_flight:
+                    return False
+                self._probe_in_flight = True
+            return True
+
+    def record(self, success: bool) -> None:
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._probe_in_flight = False
+                if success:
+                    self._outcomes.clear()
+                    self._transition(CLOSED, "probe succeeded")
+                else:
+                    self.opened_at = time.time()
+                    self._transition(OPEN, "probe failed")
+                return
+            self._outcomes.append(success)
+            failures = self._outcomes.count(False)
+            if (self.state == CLOSED and len(self._outcomes) >= self.min_calls
+                    and failures / len(self._outcomes) >= self.failure_rate):
+                self.opened_at = time.time()
+                self._transition(OPEN, f"{failures}/{len(self._outcomes)} recent calls failed")
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            n = len(self._outcomes)
+            return {
+                "state": self.state,
+                "calls": n,
+                "error_rate": round(self._outcomes.count(False) / n, 3) if n else 0.0,
+                "retry_in_s": max(0.0, round(self.opened_at + self.open_s - time.time(), 1))
+                if self.state == OPEN else 0.0,
+            }
+
+
+def provider_for(host: str) -> str:
+    return PROVIDER_NAMES.get(host.lower(), host.lower())
+
+
+def get_breaker(provider: str) -> CircuitBreaker:
+    with _registry_lock:
+        breaker = _breakers.get(provider)
+        if breaker is None:
+            breaker = CircuitBreaker(provider, **BREAKER_CONFIG.get(provider, {}))
+            _breakers[provider] = breaker
+        return breaker
+
+
+def configure_breaker(provider: str, **settings) -> None:
+    """Override settings (failure_rate, window, min_calls, open_s); resets the breaker."""
+    with _registry_lock:
+        BREAKER_CONFIG[provider] = {**BREAKER_CONFIG.get(provider, {}), **settings}
+        _breakers.pop(provider, None)
+
+
+def breaker_states() -> Dict[str, Dict[str, Any]]:
+    """Current state of every breaker that has seen traffic."""
+    with _registry_lock:
+        breakers = list(_breakers.values())
+    return {b.name: b.snapshot() for b in breakers}
+
+
+def breaker_events() -> List[Dict[str, Any]]:
+    """Recent state transitions, oldest first."""
+    return list(_events)
@@ -0,0 +1,149 @@
+"""
+Per-plan deadlines, propagated to every outbound call.
+
+Functions:
+- deadline(seconds) -> context manager
+- start_deadline(seconds, started_at=None) -> scope | None
+- within(scope) -> context manager
+- stage(keep_back_fraction) -> context manager yielding the stage's cut list
+- remaining() -> float | None
+- call_timeout(default) -> float | None
+- record_cut(stage, what) -> None
+- DeadlineExceeded
+
+A plan runs inside `with deadline(sla_s):`. The deadline lives in a
+contextvar, so it reaches every node and tool of the run without being
+passed around (LangGraph runs nodes in copies of the caller's context;
+thread pools that fan out further copy it explicitly or pass timeouts in).
+A graph invoked without one starts it from the state instead (see
+src.workflow.timing.deadline_node): started_at carries the plan's start
+from one node to the next.
+
+Tools ask call_timeout(default) for each request: the smaller of their usual
+timeout and the time left, or DeadlineExceeded when nothing is left. Outside
+a deadline every function is a no-op and call_timeout returns the default,
+so tools behave exactly as before.
+
+stage() narrows the deadline for one graph node: a share of the plan's
+budget is kept back for the nodes after it (the itinerary LLM call needs
+most of it). Degradations — a skipped stage, estimated routes, a plain
+itinerary instead of the LLM one — are recorded with record_cut() and end
+up in TravelState.cuts.
+"""
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional
+
+# Below this many seconds a request is not worth sending
+MIN_CALL_S = 0.05
+
+
+class DeadlineExceeded(TimeoutError):
+    """The plan's time budget is spent; the caller should degrade or give up."""
+
+
+class _Scope:
+    __slots__ = ("start", "end", "plan_end", "total", "cuts")
+
+    def __init__(self, start: float, end: float, total: float, plan_end: Optional[float] = None):
+        self.start = start
+        self.end = end
+        self.plan_end = end if plan_end is None else plan_end
+        self.total = total
+        self.cuts: List[Dict[str, Any]] = []
+
+
+_scope: ContextVar[Optional[_Scope]] = ContextVar("deadline_scope", default=None)
+
+
+def start_deadline(seconds: Optional[float], started_at: Optional[float] = None) -> Optional[_Scope]:
+    """
+    A deadline `seconds` from now (within any enclosing one), to be entered
+    with within(). started_at (time.time()) backdates it to a plan that
+    started earlier.
+    """
+    if seconds is None:
+        return None
+    now = time.monotonic()
+    if started_at is not None:
+        now -= max(0.0, time.time() - started_at)
+    outer = _scope.get()
+    end = now + seconds if outer is None else min(outer.end, now + seconds)
+    return _Scope(now, end, seconds)
+
+
+@contextmanager
+def within(scope: Optional[_Scope]) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Run the block under a deadline from start_deadline() (None: no deadline).
+    One deadline can be entered several times, e.g. around each step of a
+    streamed run. Yields the cut list.
+    """
+    if scope is None:
+        yield []
+        return
+    token = _scope.set(scope)
+    try:
+        yield scope.cuts
+    finally:
+        _scope.reset(token)
+
+
+@contextmanager
+def deadline(seconds: Optional[float]) -> Iterator[List[Dict[str, Any]]]:
+    """Run the block under a time budget of `seconds` (None: no deadline). Yields the cut list."""
+    with within(start_deadline(seconds)) as cuts:
+        yield cuts
+
+
+@contextmanager
+def stage(keep_back: float = 0.0) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Narrow the current deadline for one stage: keep_back (share of the
+    plan's total budget) is left for the stages after it. Stages nest (a
+    city's sub-pipeline inside the "city" stage); each is measured against
+    the plan's end. Yields the stage's own cut list.
+    """
+    outer = _scope.get()
+    if outer is None:
+        yield []
+        return
+    end = max(outer.start, min(outer.end, outer.plan_end - keep_back * outer.total))
+    scope = _Scope(outer.start, end, outer.total, outer.plan_end)
+    token = _scope.set(scope)
+    try:
+        yield scope.cuts
+    finally:
+        _scope.reset(token)
+
+
+def remaining() -> Optional[float]:
+    """Seconds left in the current scope (None when there is no deadline)."""
+    scope = _scope.get()
+    if scope is None:
+        return None
+    return max(0.0, scope.end - time.monotonic())
+
+
+def call_timeout(default: Optional[float]) -> Optional[float]:
+    """Timeout for one outbound call: min(default, time left). Raises DeadlineExceeded when none is left."""
+    left = remaining()
+    if left is None:
+        return default
+    if left < MIN_CALL_S:
+        raise DeadlineExceeded("plan deadline reached")
+    return left if default is None else min(default, left)
+
+
+def record_cut(stage_name: str, what: str) -> None:
+    """Note a degradation made to stay within the deadline (no-op without one)."""
+    scope = _scope.get()
+    if scope is None:
+        return
+    scope.cuts.append({
+        "stage": stage_name,
+        "cut": what,
+        "at_s": round(time.monotonic() - scope.start, 3),
+    })
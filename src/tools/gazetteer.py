@@ -0,0 +1,317 @@
+"""
+Offline gazetteer geocoder backed by a GeoNames dump.
+
+Functions:
+- normalize_name(text) -> str
+- build_index(dump_path, index_path, country_info=None, min_population=0) -> dict
+- Gazetteer(index_path).lookup(query) -> dict | None
+- Gazetteer(index_path).prefix(prefix, limit=10) -> list
+- gazetteer_geocode(place) -> dict | None
+
+build_index turns a GeoNames dump (cities500/cities15000.txt, or an
+allCountries extract with feature classes P and A) into one compact binary
+file that is memory-mapped at lookup time:
+
+  header   magic, record/key counts, section offsets
+  records  fixed-size structs: lat, lon, population, geonameid, display name ref, country, rank
+  keys     (name ref, record) pairs sorted by normalized name, most populous first
+  strings  utf-8 blob holding names and display names
+
+Exact and prefix lookups are binary searches over the sorted key table, so
+nothing is parsed or loaded into Python objects up front.
+
+gazetteer_geocode returns the same shape as nominatim_geocode and is used for
+cache misses when GAZETTEER_INDEX points at an index file.
+
+Benchmark:
+  python -m src.tools.gazetteer build cities15000.txt gazetteer.idx --country-info countryInfo.txt
+  python -m src.tools.gazetteer bench gazetteer.idx
+"""
+
+import mmap
+import os
+import random
+import re
+import struct
+import sys
+import time
+import unicodedata
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+MAGIC = b"GAZ1"
+HEADER = struct.Struct("<4sIIQQQ")          # magic, n_records, n_keys, records_off, keys_off, strings_off
+RECORD = struct.Struct("<ddQIIH2sB")       # lat, lon, population, geonameid, display_off, display_len, cc, rank
+KEY = struct.Struct("<IHI")                # name_off, name_len, record index
+
+# Feature codes that outrank plain populated places with similar population
+FEATURE_RANK = {"PPLC": 3, "ADM1": 3, "PCLI": 3, "PPLA": 2, "ADM2": 2, "PPLA2": 1, "PPL": 1}
+
+_non_alnum = re.compile(r"[^\w]+", re.UNICODE)
+
+
+def normalize_name(text: str) -> str:
+    """Lowercase, strip accents and punctuation, collapse whitespace."""
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return _non_alnum.sub(" ", text.casefold()).replace("_", " ").strip()
+
+
+def _load_country_names(path: Optional[str]) -> Dict[str, str]:
+    """ISO code -> country name from GeoNames countryInfo.txt."""
+    names: Dict[str, str] = {}
+    if not path:
+        return names
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.startswith("#"):
+                continue
+            cols = line.rstrip("\n").split("\t")
+            if len(cols) > 4:
+                names[cols[0]] = cols[4]
+    return names
+
+
+def _iter_dump(dump_path: str, feature_classes: Tuple[str, ...], min_population: int) -> Iterator[List[str]]:
+    with open(dump_path, encoding="utf-8") as f:
+        for line in f:
+            cols = line.rstrip("\n").split("\t")
+            if len(cols) < 15 or cols[6] not in feature_classes:
+                continue
+            if int(cols[14] or 0) < min_population:
+                continue
+            yield cols
+
+
+def build_index(
+    dump_path: str,
+    index_path: str,
+    country_info: Optional[str] = None,
+    min_population: int = 0,
+    feature_classes: Tuple[str, ...] = ("P", "A"),
+    alternate_names: bool = True,
+) -> Dict[str, Any]:
+    """
+    Build a gazetteer index file from a GeoNames dump.
+    Returns build stats: records, keys, bytes, seconds.
+    """
+    t0 = time.perf_counter()
+    countries = _load_country_names(country_info)
+
+    strings = bytearray()
+    interned: Dict[str, Tuple[int, int]] = {}
+
+    def intern(s: str) -> Tuple[int, int]:
+        ref = interned.get(s)
+        if ref is None:
+            b = s.encode("utf-8")[:0xFFFF]
+            ref = (len(strings), len(b))
+            strings.extend(b)
+            interned[s] = ref
+        return ref
+
+    records = bytearray()
+    populations: List[int] = []
+    keys: List[Tuple[str, int]] = []
+
+    for cols in _iter_dump(dump_path, feature_classes, min_population):
+        idx = len(populations)
+        population = int(cols[14] or 0)
+        cc = cols[8][:2]
+        display = f"{cols[1]}, {countries.get(cc, cc)}" if cc else cols[1]
+        d_off, d_len = intern(display)
+        rank = FEATURE_RANK.get(cols[7], 0)
+        records.extend(RECORD.pack(float(cols[4]), float(cols[5]), population, int(cols[0]),
+                                   d_off, d_len, cc.encode("ascii", "replace").ljust(2), rank))
+        populations.append(population)
+
+        names = {cols[1], cols[2]}
+        if alternate_names and cols[3]:
+            names.update(cols[3].split(","))
+        for key in {normalize_name(n) for n in names if n}:
+            if key:
+                keys.append((key, idx))
+
+    # exact matches come out most-important first
+    keys.sort(key=lambda k: (k[0].encode("utf-8"), -populations[k[1]]))
+
+    key_table = bytearray()
+    for key, idx in keys:
+        off, length = intern(key)
+        key_table.extend(KEY.pack(off, length, idx))
+
+    records_off = HEADER.size
+    keys_off = records_off + len(records)
+    strings_off = keys_off + len(key_table)
+    with open(index_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, len(populations), len(keys), records_off, keys_off, strings_off))
+        f.write(records)
+        f.write(key_table)
+        f.write(strings)
+
+    return {
+        "records": len(populations),
+        "keys": len(keys),
+        "bytes": os.path.getsize(index_path),
+        "seconds": round(time.perf_counter() - t0, 3),
+    }
+
+
+class Gazetteer:
+    """Read-only, memory-mapped view of an index built by build_index()."""
+
+    def __init__(self, index_path: str):
+        self._file = open(index_path, "rb")
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.n_records, self.n_keys, self._records_off, self._keys_off, self._strings_off = \
+            HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{index_path} is not a gazetteer index")
+
+    def close(self) -> None:
+        self._mm.close()
+        self._file.close()
+
+    def _string(self, off: int, length: int) -> bytes:
+        start = self._strings_off + off
+        return self._mm[start:start + length]
+
+    def _key(self, i: int) -> Tuple[bytes, int]:
+        off, length, idx = KEY.unpack_from(self._mm, self._keys_off + i * KEY.size)
+        return self._string(off, length), idx
+
+    def _lower_bound(self, target: bytes) -> int:
+        lo, hi = 0, self.n_keys
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._key(mid)[0] < target:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def _record(self, idx: int) -> Dict[str, Any]:
+        lat, lon, population, geonameid, d_off, d_len, cc, rank = \
+            RECORD.unpack_from(self._mm, self._records_off + idx * RECORD.size)
+        return {
+            "lat": lat,
+            "lon": lon,
+            "display_name": self._string(d_off, d_len).decode("utf-8"),
+            "population": population,
+            "geonameid": geonameid,
+            "country_code": cc.decode("ascii").strip(),
+            "rank": rank,
+        }
+
+    def candidates(self, name: str, limit: int = 50) -> List[Dict[str, Any]]:
+        """All records whose normalized name equals `name`, most populous first."""
+        target = normalize_name(name).encode("utf-8")
+        out = []
+        i = self._lower_bound(target)
+        while i < self.n_keys and len(out) < limit:
+            key, idx = self._key(i)
+            if key != target:
+                break
+            out.append(self._record(idx))
+            i += 1
+        return out
+
+    def prefix(self, prefix: str, limit: int = 10, scan: int = 2000) -> List[Dict[str, Any]]:
+        """Autocomplete-style lookup ranked by (rank, population)."""
+        target = normalize_name(prefix).encode("utf-8")
+        if not target:
+            return []
+        seen = {}
+        i = self._lower_bound(target)
+        while i < self.n_keys and len(seen) < scan:
+            key, idx = self._key(i)
+            if not key.startswith(target):
+                break
+            seen.setdefault(idx, None)
+            i += 1
+        ranked = sorted((self._record(idx) for idx in seen),
+                        key=lambda r: (r["rank"], r["population"]), reverse=True)
+        return ranked[:limit]
+
+    def lookup(self, query: str) -> Optional[Dict[str, Any]]:
+        """
+        Resolve "Name, Qualifier, ..." to the best record. Qualifiers (region or
+        country name / ISO code) must all appear in the record's display name or
+        country code; otherwise the lookup is a miss.
+        """
+        parts = [normalize_name(p) for p in query.split(",")]
+        parts = [p for p in parts if p]
+        if not parts:
+            return None
+        qualifiers = parts[1:]
+
+        best = None
+        for rec in self.candidates(parts[0]):
+            hay = normalize_name(rec["display_name"])
+            if all(q == rec["country_code"].lower() or q in hay for q in qualifiers):
+                if best is None or (rec["rank"], rec["population"]) > (best["rank"], best["population"]):
+                    best = rec
+        return best
+
+
+_default: Optional[Gazetteer] = None
+
+
+def _default_gazetteer() -> Optional[Gazetteer]:
+    global _default
+    if _default is None:
+        path = os.getenv("GAZETTEER_INDEX")
+        if path and Path(path).exists():
+            _default = Gazetteer(path)
+    return _default
+
+
+def gazetteer_geocode(place: str) -> Optional[Dict[str, Any]]:
+    """Offline geocode with the same result shape as nominatim_geocode, or None."""
+    gaz = _default_gazetteer()
+    if gaz is None:
+        return None
+    rec = gaz.lookup(place)
+    if rec is None:
+        return None
+    return {
+        "place": place,
+        "lat": rec["lat"],
+        "lon": rec["lon"],
+        "display_name": rec["display_name"],
+        "raw": {
+            "source": "geonames",
+            "geonameid": rec["geonameid"],
+            "population": rec["population"],
+            "country_code": rec["country_code"],
+        },
+    }
+
+
+def _bench(index_path: str, n: int = 10000) -> None:
+    gaz = Gazetteer(index_path)
+    sample = [gaz._key(random.randrange(gaz.n_keys))[0].decode("utf-8") for _ in range(n)]
+
+    def timed(fn) -> List[float]:
+        out = []
+        for q in sample:
+            t = time.perf_counter()
+            fn(q)
+            out.append((time.perf_counter() - t) * 1e6)
+        return sorted(out)
+
+    print(f"index: {gaz.n_records} records, {gaz.n_keys} keys, {os.path.getsize(index_path) / 1e6:.1f} MB")
+    for label, fn in (("lookup", gaz.lookup), ("prefix(3)", lambda q: gaz.prefix(q[:3]))):
+        lat = timed(fn)
+        print(f"{label:10} p50={lat[len(lat) // 2]:.1f}us p99={lat[int(len(lat) * 0.99)]:.1f}us")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) >= 4 and sys.argv[1] == "build":
+        info = sys.argv[sys.argv.index("--country-info") + 1] if "--country-info" in sys.argv else None
+        print(build_index(sys.argv[2], sys.argv[3], country_info=info))
+    elif len(sys.argv) >= 3 and sys.argv[1] == "bench":
+        _bench(sys.argv[2])
+    else:
+        print("Usage: python -m src.tools.gazetteer build DUMP INDEX [--country-info FILE] | bench INDEX")
+        sys.exit(1)
@@ -1,7 +1,10 @@
-import requests
-import time
-from urllib.parse import urlencode
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Sequence
+
 from src.tools.geocode_cache import get_from_cache, save_to_cache
+from src.tools.gazetteer import gazetteer_geocode, normalize_name
+from src.tools.rate_limit import polite_get
 
 # Polite usage for Nominatim
 USER_AGENT = "agentic-travel-planner/1.0 (Duggiralakirankmr@gmail.com)"
@@ -9,6 +12,7 @@ USER_AGENT = "agentic-travel-planner/1.0 (Duggiralakirankmr@gmail.com)"
 def nominatim_geocode(place: str, max_retries: int = 3, pause: float = 1.0):
     """
     Simple Nominatim geocode (OpenStreetMap). Returns top result dict or None.
+    Lookup order: cache -> offline gazetteer (if GAZETTEER_INDEX is set) -> Nominatim.
     """
 
     # 1️⃣ Check cache first
@@ -16,7 +20,13 @@ def nominatim_geocode(place: str, max_retries: int = 3, pause: float = 1.0):
     if cached:
         return cached
 
-    url = "https://nominatim.openstreetmap.org/search?"
+    # Offline gazetteer: no network, no rate limit
+    local = gazetteer_geocode(place)
+    if local:
+        save_to_cache(place, local)
+        return local
+
+    url = "https://nominatim.openstreetmap.org/search"
     params = {
         "q": place,
         "format": "json",
@@ -25,37 +35,74 @@ def nominatim_geocode(place: str, max_retries: int = 3, pause: float = 1.0):
     }
     headers = {"User-Agent": USER_AGENT}
 
-    last_err = None
-    for attempt in range(max_retries):
-        try:
-            full = url + urlencode(params)
-            r = requests.get(full, headers=headers, timeout=10)
-            r.raise_for_status()
-            data = r.json()
+    # Rate limiting (1 req/s), Retry-After and backoff are handled by polite_get;
+    # `pause` is the base of the jittered backoff between failed attempts.
+    r = polite_get(url, params=params, headers=headers, timeout=10,
+                   max_retries=max_retries, backoff_s=pause)
+    data = r.json()
 
-            if data:
-                top = data[0]
+    if not data:
+        return None
 
-                # 2️⃣ Build result object
-                result = {
-                    "place": place,
-                    "lat": float(top["lat"]),
-                    "lon": float(top["lon"]),
-                    "display_name": top.get("display_name"),
-                    "raw": top
-                }
+    top = data[0]
 
-                # 3️⃣ Save to cache
-                save_to_cache(place, result)
+    # 2️⃣ Build result object
+    result = {
+        "place": place,
+        "lat": float(top["lat"]),
+        "lon": float(top["lon"]),
+        "display_name": top.get("display_name"),
+        "raw": top
+    }
 
-                # 4️⃣ Return result
-                return result
+    # 3️⃣ Save to cache
+    save_to_cache(place, result)
+
+    # 4️⃣ Return result
+    return result
 
-            return None
 
+def geocode_many(places: Sequence[str], max_workers: int = 4) -> List[Optional[dict]]:
+    """
+    Geocode several place strings at once; results in input order (None on failure).
+    Inputs are normalized ("Goa, India", " goa,india" and "GOA INDIA" are one
+    query) and deduplicated, cache / gazetteer hits are served directly and
+    the remaining unique queries go to Nominatim through a small thread pool.
+    The pool is paced by the shared Nominatim rate limiter (1 req/s), so
+    requests overlap their latency but never exceed the limit.
+    """
+    groups: Dict[str, List[int]] = {}
+    for i, place in enumerate(places):
+        if place and place.strip():
+            groups.setdefault(normalize_name(place), []).append(i)
+
+    results: List[Optional[dict]] = [None] * len(places)
+    pending: Dict[str, str] = {}   # normalized key -> query text to send
+    for key, idxs in groups.items():
+        hit = next((c for c in (get_from_cache(places[i]) for i in idxs) if c), None)
+        if hit is None:
+            pending[key] = places[idxs[0]].strip()
+        else:
+            for i in idxs:
+                results[i] = {**hit, "place": places[i]}
+
+    def resolve(query: str) -> Optional[dict]:
+        try:
+            return nominatim_geocode(query)
         except Exception as e:
-            last_err = e
-            time.sleep(pause)
+            print(f"[warning] geocode failed for {query!r}: {e}")
+            return None
 
-    # 5️⃣ If all retries failed
-    raise last_err
+    if pending:
+        # Each lookup runs in a copy of the caller's context (plan deadline)
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(pending))) as pool:
+            futures = [pool.submit(contextvars.copy_context().run, resolve, q) for q in pending.values()]
+            resolved = dict(zip(pending, (f.result() for f in futures)))
+        for key, geo in resolved.items():
+            if geo is None:
+                continue
+            for i in groups[key]:
+                results[i] = {**geo, "place": places[i]}
+                if places[i].strip().lower() != pending[key].lower():
+                    save_to_cache(places[i], results[i])   # later single lookups hit too
+    return results
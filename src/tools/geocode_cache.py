@@ -1,24 +1,14 @@
-import json
-from pathlib import Path
+from src.tools.cache import FileCache
 
-CACHE_FILE = Path("geocode_cache.json")
-
-def load_cache():
-    if CACHE_FILE.exists():
-        try:
-            return json.loads(CACHE_FILE.read_text())
-        except Exception:
-            return {}
-    return {}
-
-def save_cache(cache: dict):
-    CACHE_FILE.write_text(json.dumps(cache, indent=2))
+# Geocodes don't go stale; entries are keyed by the lower-cased query.
+# Multi-city runs geocode from several threads; FileCache serializes access.
+# New geocodes are rare (Nominatim allows 1 req/s) and each one is written
+# through, so a crash loses none and parallel batch workers merge theirs.
+GEOCODE_CACHE = FileCache("geocode_cache.json")
 
 def get_from_cache(place: str):
-    cache = load_cache()
-    return cache.get(place.lower())
+    return GEOCODE_CACHE.get(place.lower())
 
 def save_to_cache(place: str, data: dict):
-    cache = load_cache()
-    cache[place.lower()] = data
-    save_cache(cache)
+    GEOCODE_CACHE.set(place.lower(), data)
+    GEOCODE_CACHE.flush()
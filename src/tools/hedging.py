@@ -0,0 +1,249 @@
+"""
+Hedged GETs: cut the latency tail of idempotent provider requests.
+
+Functions:
+- hedged_get(url, params=None, headers=None, timeout=10, may_hedge=None, unused_hedge=None) -> requests.Response
+- hedge_delay(host) -> float | None
+- hedge_stats() -> dict
+- reset_stats() -> None
+
+Every host keeps a window of recent request latencies. When a request has
+not answered within the host's HEDGE_PERCENTILE latency (p95 unless
+configured), a duplicate is sent and whichever answers first wins; the
+slower one finishes in the background and only feeds the latency window.
+
+Hedges stay inside the provider's rate budget: a duplicate is only sent
+when `may_hedge(max_wait_s)` grants it (polite_get passes the host's
+token-bucket take, see src.tools.rate_limit.try_acquire; a hedge waits for
+its token at most one hedge delay; if the primary answered meanwhile, no
+duplicate is sent and `unused_hedge()` gives the token back), and at most
+HEDGE_MAX_RATIO of a host's recent requests may be hedged. Hosts with fewer
+than MIN_SAMPLES observations are not hedged at all.
+
+Bench against a local latency-injecting stand-in:
+    python -m src.tools.hedging [--requests 400] [--stall-rate 0.03]
+"""
+
+import argparse
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Dict, Optional
+from urllib.parse import urlsplit
+
+import requests
+
+HEDGING_ENABLED = os.getenv("HEDGE_REQUESTS", "1") != "0"
+
+# Latency percentile after which a duplicate is sent, per host
+HEDGE_PERCENTILE: Dict[str, float] = {}
+DEFAULT_PERCENTILE = 0.95
+HEDGE_MAX_RATIO = 0.10     # share of recent requests that may be hedged
+WINDOW = 200               # latencies / requests remembered per host
+MIN_SAMPLES = 20
+MIN_DELAY_S = 0.05
+
+_pool = ThreadPoolExecutor(max_workers=64, thread_name_prefix="hedge")
+_lock = threading.Lock()
+
+
+class _HostStats:
+    def __init__(self):
+        self.latencies = deque(maxlen=WINDOW)
+        self.recent_hedged = deque(maxlen=WINDOW)
+        self.requests = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+
+
+_stats: Dict[str, _HostStats] = {}
+
+
+def _host_stats(host: str) -> _HostStats:
+    with _lock:
+        return _stats.setdefault(host, _HostStats())
+
+
+def reset_stats() -> None:
+    with _lock:
+        _stats.clear()
+
+
+def hedge_delay(host: str) -> Optional[float]:
+    """Seconds to wait before hedging a request to host (None: not enough data)."""
+    st = _host_stats(host)
+    with _lock:
+        if len(st.latencies) < MIN_SAMPLES:
+            return None
+        ordered = sorted(st.latencies)
+    q = HEDGE_PERCENTILE.get(host, DEFAULT_PERCENTILE)
+    return max(MIN_DELAY_S, ordered[min(len(ordered) - 1, int(q * len(ordered)))])
+
+
+def hedge_stats() -> Dict[str, Dict[str, float]]:
+    """Per host: requests, hedges, hedge_rate, hedge_wins and current hedge delay."""
+    with _lock:
+        hosts = {h: (st.requests, st.hedges, st.hedge_wins) for h, st in _stats.items()}
+    return {
+        host: {
+            "requests": n,
+            "hedges": hedges,
+            "hedge_rate": round(hedges / n, 4) if n else 0.0,
+            "hedge_wins": wins,
+            "hedge_delay_s": hedge_delay(host),
+        }
+        for host, (n, hedges, wins) in hosts.items()
+    }
+
+
+def _count(st: _HostStats, hedged: bool) -> None:
+    with _lock:
+        st.requests += 1
+        st.hedges += hedged
+        st.recent_hedged.append(hedged)
+
+
+def _budget_ok(st: _HostStats) -> bool:
+    with _lock:
+        return sum(st.recent_hedged) < HEDGE_MAX_RATIO * max(len(st.recent_hedged), 1 / HEDGE_MAX_RATIO)
+
+
+def _timed_get(st: _HostStats, url: str, kwargs: dict) -> requests.Response:
+    start = time.perf_counter()
+    try:
+        return requests.get(url, **kwargs)
+    finally:
+        # failures count too: a stall that hits the timeout is exactly the tail
+        with _lock:
+            st.latencies.append(time.perf_counter() - start)
+
+
+def hedged_get(
+    url: str,
+    params: Optional[Dict] = None,
+    headers: Optional[Dict] = None,
+    timeout: float = 10,
+    may_hedge: Optional[Callable[[float], bool]] = None,
+    unused_hedge: Optional[Callable[[], None]] = None,
+) -> requests.Response:
+    """
+    requests.get with a backup request after the host's hedge delay.
+    Returns the first response to arrive (any status; the caller decides on
+    retries). Raises only if every request that was sent failed.
+    """
+    st = _host_stats(urlsplit(url).netloc)
+    kwargs = {"params": params, "headers": headers, "timeout": timeout}
+
+    delay = hedge_delay(urlsplit(url).netloc) if HEDGING_ENABLED else None
+    if delay is None or delay >= timeout:
+        _count(st, False)
+        return _timed_get(st, url, kwargs)
+
+    primary = _pool.submit(_timed_get, st, url, kwargs)
+    done, _ = wait([primary], timeout=delay)
+    if done or not _budget_ok(st) or (may_hedge is not None and not may_hedge(delay)):
+        _count(st, False)
+        return primary.result()
+    if primary.done():
+        # Answered while the hedge waited for its token: don't send it
+        if unused_hedge is not None:
+            unused_hedge()
+        _count(st, False)
+        return primary.result()
+
+    _count(st, True)
+    backup = _pool.submit(_timed_get, st, url, kwargs)
+    pending, error = {primary, backup}, None
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for fut in done:
+            if fut.exception() is None:
+                if fut is backup:
+                    with _lock:
+                        st.hedge_wins += 1
+                return fut.result()
+            error = fut.exception()
+    raise error
+
+
+# -------------------------
+# Bench (local stand-in)
+# -------------------------
+
+def _serve_stand_in(median_s: float, stall_rate: float, stall_s: float):
+    import math
+    import random
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if random.random() < stall_rate:
+                time.sleep(stall_s)
+            else:
+                time.sleep(random.lognormvariate(math.log(median_s), 0.35))
+            body = b'{"ok": true}'
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def _percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+if __name__ == "__main__":
+    # polite_get uses the imported module, not this __main__ copy
+    from src.tools import hedging
+    from src.tools.rate_limit import configure, polite_get
+
+    parser = argparse.ArgumentParser(description="Hedged request bench (local stand-in provider)")
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--clients", type=int, default=4)
+    parser.add_argument("--median-ms", type=float, default=80)
+    parser.add_argument("--stall-rate", type=float, default=0.03)
+    parser.add_argument("--stall-s", type=float, default=3.0)
+    parser.add_argument("--rate", type=float, default=50.0, help="provider rate limit (req/s)")
+    args = parser.parse_args()
+
+    server = _serve_stand_in(args.median_ms / 1000, args.stall_rate, args.stall_s)
+    host = f"127.0.0.1:{server.server_port}"
+    url = f"http://{host}/search"
+
+    for enabled in (False, True):
+        hedging.HEDGING_ENABLED = enabled
+        hedging.reset_stats()
+        configure(host, args.rate, burst=2)
+        latencies = []
+
+        def client(n):
+            for _ in range(n):
+                t = time.perf_counter()
+                polite_get(url, timeout=10, max_retries=1)
+                latencies.append(time.perf_counter() - t)
+
+        start = time.perf_counter()
+        threads = [threading.Thread(target=client, args=(args.requests // args.clients,)) for _ in range(args.clients)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        wall = time.perf_counter() - start
+        st = hedging.hedge_stats().get(host, {})
+        print(f"hedging {'on ' if enabled else 'off'}: p50 {_percentile(latencies, 0.5) * 1000:6.0f} ms"
+              f"  p99 {_percentile(latencies, 0.99) * 1000:6.0f} ms"
+              f"  hedge rate {st.get('hedge_rate', 0):.1%}  wins {st.get('hedge_wins', 0)}"
+              f"  sent {st.get('requests', 0) + st.get('hedges', 0)} in {wall:.1f}s (limit {args.rate:g}/s)")
+    server.shutdown()
@@ -2,7 +2,8 @@
 Naive itinerary builder (greedy nearest-next).
 
 Inputs:
- - places: list of {"name","lat","lon"} (order doesn't matter)
+ - places: list of POI records (src.tools.poi) or {"name","lat","lon"} dicts,
+   in the matrix's row order
  - matrix: output from compute_matrix_from_places(...) with keys:
      "names", "duration_s", "duration_readable"
  - start_index: index in places to start each day from (default 0)
@@ -10,6 +11,10 @@ Inputs:
  - start_time_str: "09:00" default start time for each day
  - dwell_time_min: minutes spent at each place (default 60)
  - max_drive_time_per_day_s: maximum driving seconds per day (default 4 hours)
+ - choose_mode: if the matrix has extra "modes" (e.g. walking), use the fastest
+   mode for each leg; the chosen mode is recorded as "travel_mode"
+ - mode_overhead_s: fixed per-leg cost added when comparing modes (parking,
+   waiting for a cab), so a short walk beats a slightly "faster" drive
 
 Returns:
  - itinerary: list of day dicts. Each day dict contains ordered visits with timing info
@@ -19,6 +24,13 @@ from datetime import datetime, timedelta
 from typing import List, Dict, Any, Optional
 import math
 
+from src.tools.poi import POI
+
+DEFAULT_MODE_OVERHEAD_S = {"driving": 600, "cycling": 120, "walking": 0}
+
+def _place_name(place) -> Optional[str]:
+    return place.name if isinstance(place, POI) else place.get("name")
+
 def _parse_time_str(t: str) -> (int, int):
     hh, mm = t.split(":")
     return int(hh), int(mm)
@@ -30,7 +42,9 @@ def build_itinerary(
     places_per_day: int = 4,
     start_time_str: str = "09:00",
     dwell_time_min: int = 60,
-    max_drive_time_per_day_s: int = 4 * 3600
+    max_drive_time_per_day_s: int = 4 * 3600,
+    choose_mode: bool = True,
+    mode_overhead_s: Optional[Dict[str, float]] = None
 ) -> List[Dict[str, Any]]:
     n = len(places)
     if n == 0:
@@ -43,6 +57,33 @@ def build_itinerary(
     durations = matrix["duration_s"]  # matrix: list of lists
     names = matrix["names"]
 
+    # (mode, durations) candidates per leg; the top-level matrix is driving
+    mode_durations = [("driving", durations)]
+    if choose_mode:
+        for mode, m in (matrix.get("modes") or {}).items():
+            mode_durations.append((mode, m["duration_s"]))
+
+    overhead = mode_overhead_s if mode_overhead_s is not None else DEFAULT_MODE_OVERHEAD_S
+    if len(mode_durations) == 1:
+        overhead = {}
+
+    def leg(i: int, j: int):
+        """Fastest (seconds, mode) from i to j, compared with per-mode overhead."""
+        if i == j:
+            return 0, None
+        best, best_cost = (math.inf, "driving"), math.inf
+        for mode, durs in mode_durations:
+            try:
+                dur = durs[i][j]
+            except Exception:
+                continue
+            if dur is None:
+                continue
+            cost = dur + overhead.get(mode, 0)
+            if cost < best_cost:
+                best, best_cost = (dur, mode), cost
+        return best
+
     # Map place names -> index for safe lookup (defensive)
     name_to_index = {names[i]: i for i in range(len(names))}
 
@@ -81,21 +122,14 @@ def build_itinerary(
             # Find nearest unvisited
             best = None
             best_dur = math.inf
+            best_mode = None
             for cand in remaining:
-                if cand == current_idx:
-                    # if candidate is same as current, treat travel time = 0
-                    dur = 0
-                else:
-                    try:
-                        dur = durations[current_idx][cand]
-                        # if duration is inf or very large, skip
-                        if dur is None:
-                            dur = math.inf
-                    except Exception:
-                        dur = math.inf
+                # same place → 0; missing/None durations come back as inf
+                dur, mode = leg(current_idx, cand)
                 if dur < best_dur:
                     best_dur = dur
                     best = cand
+                    best_mode = mode
 
             if best is None or best_dur == math.inf:
                 # No reachable remaining places
@@ -117,11 +151,12 @@ def build_itinerary(
             # Record visit
             visit = {
                 "place_index": best,
-                "name": places[best].get("name"),
+                "name": _place_name(places[best]),
                 "arrival_time": arrival.isoformat(),
                 "travel_from_index": current_idx,
                 "travel_time_s": int(travel_sec),
-                "travel_time_readable": _sec_to_readable(travel_sec)
+                "travel_time_readable": _sec_to_readable(travel_sec),
+                "travel_mode": best_mode
             }
 
             # Spend dwell time
@@ -144,18 +179,19 @@ def build_itinerary(
         if places_count == 0:
             # pick one remaining (lowest index) and force it onto day regardless of budget
             forced = min(remaining)
-            travel_sec = durations[current_idx][forced] if current_idx != forced else 0
+            travel_sec, forced_mode = leg(current_idx, forced)
             day_clock += timedelta(seconds=travel_sec)
             arrival = day_clock
             day_clock += dwell_td
             visit = {
                 "place_index": forced,
-                "name": places[forced].get("name"),
+                "name": _place_name(places[forced]),
                 "arrival_time": arrival.isoformat(),
                 "departure_time": day_clock.isoformat(),
                 "travel_from_index": current_idx,
                 "travel_time_s": int(travel_sec),
-                "travel_time_readable": _sec_to_readable(travel_sec)
+                "travel_time_readable": _sec_to_readable(travel_sec),
+                "travel_mode": forced_mode
             }
             day["visits"].append(visit)
             remaining.discard(forced)
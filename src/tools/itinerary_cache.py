@@ -0,0 +1,331 @@
+"""
+Similarity cache for LLM itineraries: near-duplicate requests reuse one.
+
+Functions:
+- signature(destinations, geocodes, places, days, budget_tier, forecasts, persons, mode) -> dict
+- lookup(sig, budget, extra_day_plans=()) -> dict | None
+- store(sig, itinerary, budget) -> None
+- similarity(a, b) -> float
+- itinerary_cache_stats() -> dict
+
+"Goa 5 days mid" and "Goa 6 days mid" produce different prompts but nearly
+the same itinerary. Requests are described by a feature signature:
+
+- cluster: the destination's normalized name and ~50 km grid cell (just
+  the name without a geocode); one per stop for multi-city trips. The
+  name keeps nearby cities that share a cell (Mumbai, Pune) apart
+- pois: the normalized names of the places offered to the LLM
+- days, bucketed (1-3, 4-7, 8-14, 15+)
+- budget_tier
+- weather band: mean daily max temperature band plus wet/dry
+- persons and mode (single / per_day completion): never reused across a
+  difference, the text is written for them
+
+Signatures with the same cluster, tier, day bucket, persons and mode share
+an index bucket; within it the best entry is picked by
+    0.6 * POI Jaccard overlap + 0.25 * day-count closeness + 0.15 * same weather band
+and reused when that is at least SIMILARITY_THRESHOLD. A reused itinerary
+is lightly adapted: budget figures (total, per person and every breakdown
+line) are replaced on the budget lines (the budget section, lines quoting
+rupees or a total), day count and destination on those and the title
+lines; the day plans themselves are left alone ("open 3 days a week").
+Days beyond the request are dropped and missing days are appended from the
+template renderer (src.tools.itinerary_template). An entry whose figures
+can't be told apart (two of them equal but changing differently) is not
+reused.
+
+Entries live in a FileCache ("itinerary"), so hit/miss counters, sizes and
+ages show up in `python -m src.tools.cache_admin stats`, next to the hit
+quality events: exact / similar hits, misses, adapted day counts, rejected
+candidates and a histogram of the best candidate's similarity.
+Everything runs locally; ITINERARY_CACHE=0 disables the cache.
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from src.tools.cache import FileCache
+from src.tools.gazetteer import normalize_name
+from src.tools.itinerary_template import render_days
+
+ITINERARY_CACHE_ENABLED = os.getenv("ITINERARY_CACHE", "1") != "0"
+ITINERARY_TTL_S = 30 * 24 * 3600
+ITINERARY_CACHE = FileCache("itinerary_cache.json", ttl_s=ITINERARY_TTL_S)
+
+SIMILARITY_THRESHOLD = 0.8
+WEIGHTS = {"pois": 0.6, "days": 0.25, "weather": 0.15}
+
+# Destination cluster cell size (degrees, ~50 km)
+CLUSTER_DEG = 0.5
+DAY_BUCKETS = (3, 7, 14)
+# Weather bands: mean daily max °C upper bounds; wet from this mean rain (mm)
+TEMP_BANDS = ((10, "cold"), (20, "mild"), (28, "warm"), (float("inf"), "hot"))
+WET_MM = 5.0
+# Similarity histogram bounds (of the best candidate per lookup)
+SIMILARITY_BUCKETS = (0.5, 0.7, 0.8, 0.9)
+# Budget breakdown amounts replaced in a reused itinerary (plus per_person)
+FIGURES = ("flight", "hotel", "meals", "sightseeing", "local_transport", "contingency", "total_estimated")
+
+# Lines that start a day section: "## Day 3", "**Day 3:**", "Day 3 -", ...
+_DAY_HEADING = re.compile(r"^\W*day\s+(\d+)\b", re.IGNORECASE)
+# Closing sections after the last day ("## Budget", "**Budget usage summary**", ...)
+_CLOSING = re.compile(r"^\s*(#+|\*\*)\s*(budget|summary|tips|notes|total|more to explore)\b", re.IGNORECASE)
+# Lines whose figures, day count and destination are rewritten on reuse:
+# headings before the first day, a budget section, lines quoting money
+_HEADING = re.compile(r"^\s*(#+|\*\*)")
+_BUDGET_HEADING = re.compile(r"^\s*(#+|\*\*)[^\w]*(budget|total|cost)", re.IGNORECASE)
+_MONEY = re.compile(r"₹|\bINR\b|\bRs\b|rupees|\btotal\b|\bbudget\b|per person", re.IGNORECASE)
+
+_lock = threading.Lock()
+_index: Optional[Dict[Tuple, Dict[str, Dict[str, Any]]]] = None
+
+
+def _cluster(destination: str, geocode: Optional[Dict[str, Any]]) -> str:
+    name = normalize_name(destination or "")
+    if geocode and geocode.get("lat") is not None:
+        lat, lon = (round(geocode[k] / CLUSTER_DEG) * CLUSTER_DEG for k in ("lat", "lon"))
+        return f"{name}@{lat:g},{lon:g}"
+    return name
+
+
+def _day_bucket(days: int) -> int:
+    return next((i for i, bound in enumerate(DAY_BUCKETS) if days <= bound), len(DAY_BUCKETS))
+
+
+def _weather_band(forecasts: Sequence[Dict[str, Any]], days: int) -> str:
+    highs = [t for f in forecasts for t in (f.get("temperature_2m_max") or [])[:days] if t is not None]
+    rains = [r for f in forecasts for r in (f.get("precipitation_sum") or [])[:days] if r is not None]
+    if not highs:
+        return "unknown"
+    temp = next(name for bound, name in TEMP_BANDS if sum(highs) / len(highs) < bound)
+    wet = "wet" if rains and sum(rains) / len(rains) >= WET_MM else "dry"
+    return f"{temp}-{wet}"
+
+
+def signature(destinations: Sequence[str], geocodes: Sequence[Optional[Dict[str, Any]]],
+              places: Sequence[Dict[str, Any]], days: int, budget_tier: str,
+              forecasts: Sequence[Dict[str, Any]], persons: int = 1, mode: str = "single") -> Dict[str, Any]:
+    """Feature signature of an itinerary request (one entry per stop in the sequences)."""
+    pois = sorted({
+        f"{i}:{normalize_name(p['name'])}"
+        for i, city_places in enumerate(places)
+        for group in ("attractions", "beaches", "food")
+        for p in (city_places or {}).get(group) or [] if p.get("name")
+    })
+    return {
+        "cluster": "|".join(_cluster(d, g) for d, g in zip(destinations, geocodes)),
+        "destination": " → ".join(destinations),
+        "pois": pois,
+        "days": days,
+        "budget_tier": budget_tier,
+        "weather": _weather_band(forecasts, days),
+        "persons": persons,
+        "mode": mode,
+    }
+
+
+def _key(sig: Dict[str, Any]) -> str:
+    exact = {k: sig[k] for k in ("cluster", "pois", "days", "budget_tier", "weather", "persons", "mode")}
+    return hashlib.sha1(json.dumps(exact, sort_keys=True).encode()).hexdigest()
+
+
+def _bucket(sig: Dict[str, Any]) -> Tuple:
+    # .get: entries stored before persons / mode were signed never match
+    return sig["cluster"], sig["budget_tier"], _day_bucket(sig["days"]), sig.get("persons"), sig.get("mode")
+
+
+def similarity(a: Dict[str, Any], b: Dict[str, Any]) -> float:
+    """Weighted similarity of two signatures in the same bucket (0..1)."""
+    pa, pb = set(a["pois"]), set(b["pois"])
+    pois = len(pa & pb) / len(pa | pb) if pa | pb else 1.0
+    days = 1 - abs(a["days"] - b["days"]) / max(a["days"], b["days"], 1)
+    weather = float(a["weather"] == b["weather"])
+    return WEIGHTS["pois"] * pois + WEIGHTS["days"] * days + WEIGHTS["weather"] * weather
+
+
+def _buckets() -> Dict[Tuple, Dict[str, Dict[str, Any]]]:
+    """Index: bucket -> {entry key: signature}, built from the cache file on first use."""
+    global _index
+    with _lock:
+        if _index is None:
+            _index = {}
+            for key, entry in ITINERARY_CACHE.items():
+                _index.setdefault(_bucket(entry["sig"]), {})[key] = entry["sig"]
+        return _index
+
+
+def _similarity_label(score: float) -> str:
+    bound = next((b for b in SIMILARITY_BUCKETS if score < b), None)
+    return f"similarity_lt_{bound:g}" if bound is not None else f"similarity_ge_{SIMILARITY_BUCKETS[-1]:g}"
+
+
+def _split_days(text: str) -> Optional[Tuple[List[str], Dict[int, List[str]], List[str]]]:
+    """(preamble lines, {day: lines}, closing lines) or None if the text has no day sections."""
+    head: List[str] = []
+    days: Dict[int, List[str]] = {}
+    tail: List[str] = []
+    current = None
+    for line in text.splitlines():
+        if tail:
+            tail.append(line)
+            continue
+        match = _DAY_HEADING.match(line)
+        if match:
+            current = int(match.group(1))
+            days.setdefault(current, [])
+        elif current is not None and _CLOSING.match(line):
+            tail.append(line)
+            continue
+        (days[current] if current is not None else head).append(line)
+    return (head, days, tail) if days else None
+
+
+def _figures(budget: Dict[str, Any]) -> Dict[str, Any]:
+    breakdown = (budget or {}).get("breakdown") or {}
+    figures = {k: breakdown.get(k) for k in ("destination", "days", "persons") + FIGURES}
+    total, persons = figures["total_estimated"], figures["persons"]
+    if isinstance(total, (int, float)) and isinstance(persons, int) and persons > 0:
+        figures["per_person"] = round(total / persons)
+    return figures
+
+
+def _adapt(entry: Dict[str, Any], sig: Dict[str, Any], budget: Dict[str, Any],
+           extra_day_plans: Sequence[Dict[str, Any]]) -> Optional[str]:
+    """The cached text fitted to the request, or None if it can't be."""
+    text = entry["itinerary"]
+    old, new = entry["figures"], _figures(budget)
+    cached_days = entry["sig"]["days"]
+    if cached_days != sig["days"]:
+        parts = _split_days(text)
+        if parts is None:
+            return None
+        head, days, tail = parts
+        keep = [n for n in sorted(days) if n <= sig["days"]]
+        missing = [p for p in extra_day_plans if max(keep, default=0) < p["day"] <= sig["days"]]
+        if len(keep) + len(missing) < sig["days"]:
+            return None
+        lines = head + [line for n in keep for line in days[n]]
+        if missing:
+            lines += ["", render_days(missing), ""]
+        text = "\n".join(lines + tail)
+    words = {
+        f"{cached_days} days": f"{sig['days']} days",
+        f"{cached_days}-day": f"{sig['days']}-day",
+    }
+    if old.get("destination") and new.get("destination"):
+        words[old["destination"]] = new["destination"]
+    figures: Dict[str, str] = {}
+    for k in FIGURES + ("per_person",):
+        before, after = old.get(k), new.get(k)
+        if not isinstance(before, (int, float)) or not isinstance(after, (int, float)):
+            continue
+        for fmt in ("{:,}", "{}"):
+            b, a = fmt.format(before), fmt.format(after)
+            if figures.setdefault(b, a) != a:
+                return None   # same amount, different new values: ambiguous
+    return _rewrite(text, _replacer(words), _replacer({**words, **figures}))
+
+
+def _replacer(replacements: Dict[str, str]):
+    """line -> line with every replacement applied in one pass (None if there is nothing to replace)."""
+    replacements = {b: a for b, a in replacements.items() if b != a}
+    if not replacements:
+        return None
+    # One pass, so a new figure is never replaced again; whole numbers /
+    # words only: "5 days" must not touch "15 days", "1,500" not "1,500,000"
+    pattern = "|".join(re.escape(b) for b in sorted(replacements, key=len, reverse=True))
+    regex = re.compile(rf"(?<!\w)(?<!\d,)(?:{pattern})(?!\w|,\d)")
+    return lambda line: regex.sub(lambda m: replacements[m.group(0)], line)
+
+
+def _rewrite(text: str, title, budget) -> str:
+    """Apply title to the headings before the first day and budget to the budget lines."""
+    lines = text.split("\n")
+    in_days = in_budget = False
+    for i, line in enumerate(lines):
+        if _DAY_HEADING.match(line):
+            in_days, in_budget = True, False
+        elif _HEADING.match(line):
+            in_budget = bool(_BUDGET_HEADING.match(line))
+        if budget and (in_budget or _MONEY.search(line)):
+            lines[i] = budget(line)
+        elif title and not in_days and _HEADING.match(line):
+            lines[i] = title(line)
+    return "\n".join(lines)
+
+
+def lookup(sig: Dict[str, Any], budget: Dict[str, Any],
+           extra_day_plans: Sequence[Dict[str, Any]] = ()) -> Optional[Dict[str, Any]]:
+    """
+    Cached itinerary for the signature: the exact entry, else the most
+    similar one in its bucket if at least SIMILARITY_THRESHOLD and
+    adaptable. extra_day_plans (template day structures) fill days the
+    cached itinerary doesn't have. Returns {"itinerary", "similarity",
+    "exact"} or None.
+    """
+    if not ITINERARY_CACHE_ENABLED:
+        return None
+    key = _key(sig)
+    entry = ITINERARY_CACHE.get(key)
+    if entry is not None:
+        text = _adapt(entry, sig, budget, ())
+        if text is not None:
+            ITINERARY_CACHE.count("exact_hits")
+            ITINERARY_CACHE.count("similarity_served_total", 1.0)
+            return {"itinerary": text, "similarity": 1.0, "exact": True}
+        ITINERARY_CACHE.count("unadaptable")
+
+    candidates = sorted(
+        ((similarity(sig, other), other_key) for other_key, other in _buckets().get(_bucket(sig), {}).items()
+         if other_key != key),
+        reverse=True,
+    )
+    if candidates:
+        ITINERARY_CACHE.count(_similarity_label(candidates[0][0]))
+    for score, other_key in candidates:
+        if score < SIMILARITY_THRESHOLD:
+            break
+        other = ITINERARY_CACHE.get(other_key)
+        if other is None:
+            continue
+        text = _adapt(other, sig, budget, extra_day_plans)
+        if text is None:
+            ITINERARY_CACHE.count("unadaptable")
+            continue
+        ITINERARY_CACHE.count("similar_hits")
+        ITINERARY_CACHE.count("similarity_served_total", score)
+        if other["sig"]["days"] != sig["days"]:
+            ITINERARY_CACHE.count("adapted_days")
+        return {"itinerary": text, "similarity": round(score, 3), "exact": False}
+    ITINERARY_CACHE.count("misses")
+    return None
+
+
+def store(sig: Dict[str, Any], itinerary: str, budget: Dict[str, Any]) -> None:
+    """Remember an LLM itinerary for the signature (only complete, non-degraded ones belong here)."""
+    if not ITINERARY_CACHE_ENABLED or not itinerary:
+        return
+    key = _key(sig)
+    ITINERARY_CACHE.set(key, {"sig": sig, "itinerary": itinerary, "figures": _figures(budget)})
+    ITINERARY_CACHE.count("stores")
+    index = _buckets()
+    with _lock:
+        index.setdefault(_bucket(sig), {})[key] = sig
+
+
+def itinerary_cache_stats() -> Dict[str, Any]:
+    """Cache stats plus hit quality: hit rate over all lookups and mean similarity of served hits."""
+    st = ITINERARY_CACHE.stats()
+    events = st["events"]
+    hits = events.get("exact_hits", 0) + events.get("similar_hits", 0)
+    lookups = hits + events.get("misses", 0)
+    return {
+        **st,
+        "lookups": lookups,
+        "itinerary_hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+        "mean_similarity": round(events.get("similarity_served_total", 0) / hits, 4) if hits else 0.0,
+    }
@@ -0,0 +1,132 @@
+"""
+Template itinerary renderer: a full day-by-day markdown plan without the LLM.
+
+Functions:
+- render_itinerary(budget, day_plans, places=None) -> str
+- render_days(day_plans) -> str
+
+Inputs are the same structures the per-day LLM mode uses: the budget node's
+{"breakdown", "assessment"} and one dict per day (day, destination, weather,
+visits, food) from itinerary_node's day planner, whose visits come from
+build_itinerary. Visits are split into morning / afternoon / evening by
+arrival time, food places become lunch and dinner, and the day's compressed
+forecast adds a short weather note.
+
+The templates are compiled once at import and rendering is plain string
+substitution: no network, a few milliseconds per plan. Used for
+itinerary_mode="template" (budget previews, batch runs) and as the fast
+path when the LLM is unavailable or the plan deadline is near.
+"""
+
+from string import Template
+from typing import Any, Dict, List, Optional
+
+TRIP = Template("# $destination — $days days\n\n$persons traveller(s) · estimated ₹$total ($verdict)")
+DAY = Template("## Day $day — $destination\n$weather\n\n"
+               "**Morning**\n$morning\n\n**Afternoon**\n$afternoon\n\n**Evening**\n$evening")
+VISIT = Template("- $time$name$leg")
+WEATHER = Template("_Weather: $low–$high°C, $rain mm rain.${advice}_")
+BUDGET = Template("## Budget\n\n| Item | ₹ |\n|---|---:|\n$rows\n| **Total** | **$total** |\n\n$advice")
+EXTRAS = Template("## More to explore\n\n$items")
+
+BUDGET_ITEMS = (("flight", "Travel"), ("hotel", "Stay"), ("meals", "Meals"), ("sightseeing", "Sightseeing"),
+                ("local_transport", "Local transport"), ("contingency", "Contingency"))
+
+# Weather notes: rain (mm) and heat (°C) thresholds
+RAINY_MM = 5.0
+HOT_C = 33.0
+
+# Arrival hour at which a visit moves to the afternoon / evening slot
+AFTERNOON_FROM = 12
+EVENING_FROM = 17
+
+
+def _amount(value: Any) -> str:
+    return f"{value:,.0f}" if isinstance(value, (int, float)) else "?"
+
+
+def _weather_line(weather: Optional[Dict[str, Any]]) -> str:
+    if not weather or weather.get("max") is None or weather.get("min") is None:
+        return "_Weather: no forecast for this date._"
+    rain = weather.get("rain") or 0
+    advice = ""
+    if rain >= RAINY_MM:
+        advice = " Rain likely: keep an indoor option and an umbrella handy."
+    elif weather["max"] >= HOT_C:
+        advice = " Hot: do the outdoor visits early and rest at midday."
+    return WEATHER.substitute(low=f"{weather['min']:.0f}", high=f"{weather['max']:.0f}",
+                              rain=f"{rain:.0f}", advice=advice)
+
+
+def _visit_line(visit: Dict[str, Any]) -> str:
+    arrival = visit.get("arrival_time")
+    leg = ""
+    if visit.get("travel_time_s"):
+        leg = f" ({visit['travel_time_readable']} by {visit.get('travel_mode') or 'driving'})"
+    return VISIT.substitute(time=f"{arrival[11:16]} " if arrival else "", name=visit["name"], leg=leg)
+
+
+def _slots(visits: List[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+    """Morning / afternoon / evening visits: by arrival hour, untimed ones half and half."""
+    if not all(v.get("arrival_time") for v in visits):
+        half = -(-len(visits) // 2)
+        return [visits[:half], visits[half:], []]
+    slots = [[], [], []]
+    for v in visits:
+        hour = int(v["arrival_time"][11:13])
+        slots[0 if hour < AFTERNOON_FROM else 1 if hour < EVENING_FROM else 2].append(v)
+    return slots
+
+
+def _day(day: Dict[str, Any]) -> str:
+    morning, afternoon, evening = ([_visit_line(v) for v in slot] for slot in _slots(day["visits"]))
+    food = day.get("food") or []
+    if food:
+        afternoon.append(f"- Lunch at {food[0]}")
+        evening.append(f"- Dinner at {food[-1]}")
+    return DAY.substitute(
+        day=day["day"],
+        destination=day["destination"],
+        weather=_weather_line(day.get("weather")),
+        morning="\n".join(morning) or "- Slow start: explore the neighbourhood",
+        afternoon="\n".join(afternoon) or "- Free time",
+        evening="\n".join(evening) or "- Free evening",
+    )
+
+
+def _budget(budget: Dict[str, Any]) -> str:
+    breakdown = budget.get("breakdown") or {}
+    rows = "\n".join(f"| {label} | {_amount(breakdown[key])} |" for key, label in BUDGET_ITEMS if key in breakdown)
+    advice = (budget.get("assessment") or {}).get("advice") or []
+    if isinstance(advice, str):
+        advice = [advice]
+    return BUDGET.substitute(rows=rows, total=_amount(breakdown.get("total_estimated")),
+                             advice="\n".join(f"- {a}" for a in advice))
+
+
+def _extras(places: Dict[str, Any], day_plans: List[Dict[str, Any]]) -> str:
+    scheduled = {v["name"] for d in day_plans for v in d["visits"]}
+    names = [p["name"] for group in ("attractions", "beaches", "nature") for p in places.get(group) or []
+             if p.get("name") and p["name"] not in scheduled]
+    return EXTRAS.substitute(items="\n".join(f"- {n}" for n in dict.fromkeys(names))) if names else ""
+
+
+def render_days(day_plans: List[Dict[str, Any]]) -> str:
+    """Just the day sections (e.g. to extend an itinerary by a few days)."""
+    return "\n\n".join(_day(day) for day in day_plans)
+
+
+def render_itinerary(budget: Dict[str, Any], day_plans: List[Dict[str, Any]],
+                     places: Optional[Dict[str, Any]] = None) -> str:
+    """Markdown itinerary for the day plans; places (optional) adds the unscheduled sights."""
+    breakdown = budget.get("breakdown") or {}
+    assessment = budget.get("assessment") or {}
+    verdict = "within budget" if assessment.get("fits") else "over budget" if assessment else "no budget given"
+    parts = [TRIP.substitute(destination=breakdown.get("destination", ""), days=len(day_plans),
+                             persons=breakdown.get("persons", 1),
+                             total=_amount(breakdown.get("total_estimated")), verdict=verdict)]
+    parts.append(render_days(day_plans))
+    if places:
+        parts.append(_extras(places, day_plans))
+    parts.append(_budget(budget))
+    return "\n\n".join(p for p in parts if p).strip()
@@ -0,0 +1,110 @@
+"""
+Telemetry for LLM calls: tokens, time to first token, latency, throughput.
+
+Functions:
+- record_llm_call(record) -> None
+- collect_llm_calls() -> context manager yielding the calls made in the block
+- summarize_calls(calls) -> dict
+- llm_stats() -> {model: summary} for this process
+- format_summary(summary) -> str
+
+One record per completion (see src.agents.itinerary_agent._complete):
+
+    {"label": "day 3", "model": "llama-3.1-8b-instant", "ok": True,
+     "prompt_tokens": 412, "completion_tokens": 298, "ttft_s": 0.21,
+     "latency_s": 1.37, "tokens_per_s": 256.9, "truncated": False,
+     "max_tokens": 450, "prompt_chars": 1630, "error": None}
+
+Token counts come from the provider's usage block; they are None when the
+response carries none. tokens_per_s is the completion tokens over the
+generation time (latency minus time to first token). A call is truncated
+when it stopped at max_tokens (finish_reason "length").
+
+Records go to a per-process window (llm_stats) and to the innermost
+collect_llm_calls() block, which itinerary_node uses to attach the plan's
+calls to TravelState.llm_calls. The collector lives in a contextvar; pool
+threads see it when their work is submitted with contextvars.copy_context().
+"""
+
+import threading
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+# Calls remembered per process for llm_stats()
+WINDOW = 1000
+
+_lock = threading.Lock()
+_recent: deque = deque(maxlen=WINDOW)
+_collector: ContextVar[Optional[List[Dict[str, Any]]]] = ContextVar("llm_calls", default=None)
+
+
+def record_llm_call(record: Dict[str, Any]) -> None:
+    calls = _collector.get()
+    with _lock:
+        _recent.append(record)
+        if calls is not None:
+            calls.append(record)
+
+
+@contextmanager
+def collect_llm_calls() -> Iterator[List[Dict[str, Any]]]:
+    """Collect the records of every LLM call made within the block."""
+    calls: List[Dict[str, Any]] = []
+    token = _collector.set(calls)
+    try:
+        yield calls
+    finally:
+        _collector.reset(token)
+
+
+def _percentile(values: List[float], q: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))], 3)
+
+
+def summarize_calls(calls: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    """Totals and latency percentiles over call records."""
+    calls = list(calls)
+    ok = [c for c in calls if c.get("ok")]
+    ttft = [c["ttft_s"] for c in ok if c.get("ttft_s") is not None]
+    latency = [c["latency_s"] for c in ok if c.get("latency_s") is not None]
+    rates = [c["tokens_per_s"] for c in ok if c.get("tokens_per_s")]
+    return {
+        "calls": len(calls),
+        "errors": len(calls) - len(ok),
+        "truncated": sum(1 for c in ok if c.get("truncated")),
+        "prompt_tokens": sum(c.get("prompt_tokens") or 0 for c in calls),
+        "completion_tokens": sum(c.get("completion_tokens") or 0 for c in calls),
+        "ttft_p50_s": _percentile(ttft, 0.5),
+        "ttft_p95_s": _percentile(ttft, 0.95),
+        "latency_p50_s": _percentile(latency, 0.5),
+        "latency_p95_s": _percentile(latency, 0.95),
+        "tokens_per_s_mean": round(sum(rates) / len(rates), 1) if rates else None,
+    }
+
+
+def llm_stats() -> Dict[str, Dict[str, Any]]:
+    """Per model: summarize_calls() over this process's recent calls."""
+    with _lock:
+        calls = list(_recent)
+    models: Dict[str, List[Dict[str, Any]]] = {}
+    for c in calls:
+        models.setdefault(c.get("model") or "?", []).append(c)
+    return {model: summarize_calls(cs) for model, cs in models.items()}
+
+
+def _s(value: Optional[float]) -> str:
+    return f"{value:.2f}s" if value is not None else "-"
+
+
+def format_summary(summary: Dict[str, Any]) -> str:
+    """One line for summarize_calls() output."""
+    rate = f"{summary['tokens_per_s_mean']:.0f} tok/s" if summary["tokens_per_s_mean"] else "- tok/s"
+    return (f"{summary['calls']} calls ({summary['errors']} failed, {summary['truncated']} truncated), "
+            f"{summary['prompt_tokens']} prompt + {summary['completion_tokens']} completion tokens, "
+            f"TTFT p50 {_s(summary['ttft_p50_s'])} p95 {_s(summary['ttft_p95_s'])}, "
+            f"latency p50 {_s(summary['latency_p50_s'])} p95 {_s(summary['latency_p95_s'])}, {rate}")
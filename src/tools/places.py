@@ -1,8 +1,13 @@
+import contextvars
 import os
-import requests
-from urllib.parse import urlencode
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
 from dotenv import load_dotenv
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterator, Optional
+from src.tools.cache import FileCache
+from src.tools.deadline import DeadlineExceeded, record_cut
+from src.tools.poi import POI, poi_from_feature
+from src.tools.rate_limit import polite_get
 
 load_dotenv()
 
@@ -12,10 +17,27 @@ BASE_URL = "https://api.geoapify.com/v2/places"
 if not API_KEY:
     raise ValueError("GEOAPIFY_API_KEY missing in .env")
 
+# Responses per query: fresh for PLACES_TTL_S, older ones are only served
+# when Geoapify is unavailable
+PLACES_TTL_S = 7 * 24 * 3600
+PLACES_CACHE = FileCache("places_cache.json", ttl_s=PLACES_TTL_S)
 
-def _fetch_places(lat: float, lon: float, category: str, radius: int = 5000, limit: int = 20) -> Dict[str, Any]:
+# Category filters of the public getters
+ATTRACTIONS = "tourism.attraction"
+BEACHES = "natural.water.sea,natural.water.ocean"
+NATURE = "natural"
+FOOD = "catering.restaurant,catering.fast_food,catering.cafe"
+
+# Page fetches for iter_places (first pages of several streams overlap)
+_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="places")
+
+
+def _fetch_places(lat: float, lon: float, category: str, radius: int = 5000, limit: int = 20,
+                  offset: int = 0) -> Dict[str, Any]:
     """
-    Low-level Geoapify request.
+    Low-level Geoapify request (one page), cached per query for PLACES_TTL_S.
+    Falls back to the last good response for the same query when Geoapify
+    fails or its circuit breaker is open.
     """
     params = {
         "categories": category,
@@ -23,37 +45,112 @@ def _fetch_places(lat: float, lon: float, category: str, radius: int = 5000, lim
         "limit": limit,
         "apiKey": API_KEY
     }
-    url = BASE_URL + "?" + urlencode(params)
+    key = f"{category}|{lat:.3f},{lon:.3f}|{radius}|{limit}"
+    if offset:
+        params["offset"] = offset
+        key += f"|{offset}"
+    cached = PLACES_CACHE.get(key)
+    if cached is not None:
+        return cached
+
+    try:
+        resp = polite_get(BASE_URL, params=params, timeout=15)
+    except Exception as e:
+        cached = PLACES_CACHE.get(key, allow_stale=True)
+        if cached is None:
+            raise
+        print(f"[warning] Geoapify unavailable ({e}); using cached {category} results")
+        return cached
 
-    resp = requests.get(url, timeout=15)
-    resp.raise_for_status()
-    return resp.json()
+    data = resp.json()
+    PLACES_CACHE.set(key, data)
+    return data
 
 
-def _simplify_feature(feat: Dict[str, Any]) -> Dict[str, Any]:
+def _simplify(features: List[Dict[str, Any]]) -> List[POI]:
     """
-    Convert raw Geoapify feature into a small, clean dict.
+    Convert raw Geoapify features into compact POI records (src.tools.poi);
+    features without coordinates are dropped.
     """
-    p = feat.get("properties", {})
-    geom = feat.get("geometry", {})
-    coords = geom.get("coordinates", [None, None])
-
-    return {
-        "name": p.get("name") or p.get("formatted"),
-        "lat": p.get("lat") or coords[1],
-        "lon": p.get("lon") or coords[0],
-        "formatted": p.get("formatted"),
-        "categories": p.get("categories", []),
-        "place_id": p.get("place_id"),
-    }
+    return [poi for poi in map(poi_from_feature, features) if poi is not None]
+
+
+def _submit_page(*args):
+    # Run in the caller's context, so e.g. cache refresh_ahead applies to the fetch
+    return _pool.submit(contextvars.copy_context().run, _fetch_places, *args)
+
+
+def _page_stream(first, lat, lon, category, radius, page_size, max_pois, deadline) -> Iterator[POI]:
+    page, offset, sent = first, 0, 0
+    try:
+        while page is not None:
+            if deadline is not None:
+                done, _ = wait([page], timeout=max(0.0, deadline - time.monotonic()))
+                if not done:
+                    print(f"[warning] places time budget spent; stopping {category} after {sent} POIs")
+                    record_cut("places", f"{category}: stopped after {sent} POIs (time budget)")
+                    return
+            try:
+                feats = page.result().get("features", [])
+            except Exception as e:
+                if offset == 0:
+                    raise
+                if isinstance(e, DeadlineExceeded):
+                    record_cut("places", f"{category}: stopped after {sent} POIs (deadline)")
+                else:
+                    print(f"[warning] Geoapify page at offset {offset} failed ({e}); keeping {sent} {category} POIs")
+                return
+
+            # Only a full page can have a successor; it is requested once the
+            # consumer is halfway through this one (consumers that stop early
+            # never pay for it)
+            more = len(feats) >= page_size and (max_pois is None or offset + page_size < max_pois)
+            page = None
+            for i, feat in enumerate(feats):
+                if more and page is None and i >= len(feats) // 2:
+                    offset += page_size
+                    page = _submit_page(lat, lon, category, radius, page_size, offset)
+                poi = poi_from_feature(feat)
+                if poi is None:
+                    continue
+                yield poi
+                sent += 1
+                if max_pois is not None and sent >= max_pois:
+                    return
+            if more and page is None:
+                offset += page_size
+                page = _submit_page(lat, lon, category, radius, page_size, offset)
+    finally:
+        if page is not None:
+            page.cancel()
+
+
+def iter_places(lat: float, lon: float, category: str, radius: int = 5000, page_size: int = 20,
+                max_pois: Optional[int] = 60, time_budget_s: Optional[float] = None) -> Iterator[POI]:
+    """
+    Stream POI records for one category, paging through Geoapify with
+    offsets (each page cached like _fetch_places).
+    - The first page is requested right away, so several streams created
+      back to back fetch their first pages concurrently.
+    - Each following page is prefetched while the consumer works through the
+      current one, so dedup/routing can start on page one.
+    - Stops at the end of the results, after max_pois POIs, or when
+      time_budget_s has passed (a page still in flight is then dropped).
+    A failing first page raises; a failing later page ends the stream.
+    """
+    deadline = time.monotonic() + time_budget_s if time_budget_s is not None else None
+    if max_pois is not None:
+        page_size = min(page_size, max_pois)
+    first = _submit_page(lat, lon, category, radius, page_size)
+    return _page_stream(first, lat, lon, category, radius, page_size, max_pois, deadline)
 
 
 # ------------------ FINAL PUBLIC FUNCTIONS ---------------------- #
 
 def get_attractions(lat: float, lon: float, radius=10000, limit=20):
     """Tourist attractions only."""
-    raw = _fetch_places(lat, lon, "tourism.attraction", radius, limit)
-    return [_simplify_feature(f) for f in raw.get("features", [])]
+    raw = _fetch_places(lat, lon, ATTRACTIONS, radius, limit)
+    return _simplify(raw.get("features", []))
 
 
 def get_beaches(lat: float, lon: float, radius=30000, limit=20):
@@ -64,26 +161,45 @@ def get_beaches(lat: float, lon: float, radius=30000, limit=20):
     We also fallback to general 'natural' if nothing found.
     """
     try:
-        raw = _fetch_places(
-            lat, lon,
-            "natural.water.sea,natural.water.ocean",
-            radius, limit
-        )
+        raw = _fetch_places(lat, lon, BEACHES, radius, limit)
         feats = raw.get("features", [])
         if feats:
-            return [_simplify_feature(f) for f in feats]
+            return _simplify(feats)
     except:
         pass  # fallback below
 
     # fallback (general nature)
-    raw = _fetch_places(lat, lon, "natural", radius, limit)
-    return [_simplify_feature(f) for f in raw.get("features", [])]
+    raw = _fetch_places(lat, lon, NATURE, radius, limit)
+    return _simplify(raw.get("features", []))
+
+
+def iter_beaches(lat: float, lon: float, radius=30000, **stream_args) -> Iterator[POI]:
+    """
+    Streaming get_beaches; see iter_places. Falls back to general nature
+    only when the sea query finds nothing: its errors (DeadlineExceeded,
+    CircuitOpenError, a failing first page) are raised like any stream's,
+    not answered with a second stream.
+    """
+    sea = iter_places(lat, lon, BEACHES, radius, **stream_args)
+
+    def stream():
+        found = False
+        try:
+            for poi in sea:
+                found = True
+                yield poi
+        finally:
+            sea.close()
+        if not found:
+            yield from iter_places(lat, lon, NATURE, radius, **stream_args)
+
+    return stream()
 
 
 def get_nature(lat: float, lon: float, radius=15000, limit=20):
     """Natural features — waterfalls, hills, lakes, etc."""
-    raw = _fetch_places(lat, lon, "natural", radius, limit)
-    return [_simplify_feature(f) for f in raw.get("features", [])]
+    raw = _fetch_places(lat, lon, NATURE, radius, limit)
+    return _simplify(raw.get("features", []))
 
 
 def get_food(lat: float, lon: float, radius=8000, limit=20):
@@ -93,18 +209,14 @@ def get_food(lat: float, lon: float, radius=8000, limit=20):
     - catering.fast_food
     - catering.cafe
     """
-    raw = _fetch_places(
-        lat, lon,
-        "catering.restaurant,catering.fast_food,catering.cafe",
-        radius, limit
-    )
-    return [_simplify_feature(f) for f in raw.get("features", [])]
+    raw = _fetch_places(lat, lon, FOOD, radius, limit)
+    return _simplify(raw.get("features", []))
 
 
 def get_entertainment(lat: float, lon: float, radius=12000, limit=20):
     """Entertainment spots."""
     raw = _fetch_places(lat, lon, "entertainment,leisure", radius, limit)
-    return [_simplify_feature(f) for f in raw.get("features", [])]
+    return _simplify(raw.get("features", []))
 
 
 def get_place_by_id(place_id: str):
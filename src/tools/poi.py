@@ -0,0 +1,134 @@
+"""
+Compact, typed POI records used from ingestion to routing and itinerary.
+
+Classes / functions:
+- POI(id, name, lat, lon, categories=(), groups=(), formatted=None)
+- poi_from_feature(feature) -> POI | None     Geoapify GeoJSON feature
+- poi_from_dict(d) -> POI | None              state dicts, user POIs, raw features
+- poi_to_dict(poi) -> dict                    the form stored in TravelState.places
+- coords_array(pois) -> np.ndarray            (n, 2) float64 [lat, lon]
+- category_code(name) -> int / category_name(code) -> str
+- poi_id(name, lat, lon, place_id=None) -> str
+
+A POI is a NamedTuple: no per-instance __dict__, float coordinates and
+categories as a tuple of small interned integer codes (the same few dozen
+Geoapify category strings repeat across thousands of POIs). Codes are
+process-local; poi_to_dict() spells them out, so stored state is portable.
+
+Ids are stable across runs and providers' pagination: the Geoapify
+place_id when there is one, otherwise a hash of the normalized name and
+the coordinates rounded to ~1 m.
+
+TravelState keeps the dict form (it is validated and checkpointed as
+JSON); nodes convert with poi_from_dict / poi_to_dict at the boundary.
+"""
+
+import hashlib
+import re
+import threading
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+_non_alnum = re.compile(r"[^0-9a-z]+")
+
+# Name of a POI the provider gave neither a name nor an address
+UNNAMED = "POI"
+
+_codes: Dict[str, int] = {}
+_names: List[str] = []
+_codes_lock = threading.Lock()
+
+
+class POI(NamedTuple):
+    id: str
+    name: str
+    lat: float
+    lon: float
+    categories: Tuple[int, ...] = ()
+    groups: Tuple[str, ...] = ()
+    formatted: Optional[str] = None
+
+    @property
+    def category_names(self) -> List[str]:
+        return [category_name(c) for c in self.categories]
+
+
+def category_code(name: str) -> int:
+    """Small integer code for a category string (assigned on first use)."""
+    code = _codes.get(name)
+    if code is None:
+        with _codes_lock:
+            code = _codes.get(name)
+            if code is None:
+                code = _codes[name] = len(_names)
+                _names.append(name)
+    return code
+
+
+def category_name(code: int) -> str:
+    return _names[code]
+
+
+def _codes_for(categories: Iterable[Any]) -> Tuple[int, ...]:
+    return tuple(c if isinstance(c, int) else category_code(c) for c in categories or ())
+
+
+def poi_id(name: Optional[str], lat: float, lon: float, place_id: Optional[str] = None) -> str:
+    if place_id:
+        return str(place_id)
+    norm = _non_alnum.sub(" ", (name or "").lower()).strip()
+    digest = hashlib.sha1(f"{norm}|{lat:.5f}|{lon:.5f}".encode("utf-8")).hexdigest()[:16]
+    return f"h:{digest}"
+
+
+def _make(name, lat, lon, place_id=None, categories=(), groups=(), formatted=None) -> Optional[POI]:
+    if lat is None or lon is None:
+        return None
+    lat, lon = float(lat), float(lon)
+    name = name or formatted or UNNAMED
+    return POI(poi_id(name, lat, lon, place_id), name, lat, lon,
+               _codes_for(categories), tuple(groups or ()), formatted)
+
+
+def poi_from_feature(feature: Dict[str, Any]) -> Optional[POI]:
+    """POI from a raw Geoapify feature (None without coordinates)."""
+    p = feature.get("properties", {})
+    coords = (feature.get("geometry") or {}).get("coordinates") or [None, None]
+    return _make(
+        p.get("name") or p.get("address_line1"),
+        p.get("lat") if p.get("lat") is not None else coords[1],
+        p.get("lon") if p.get("lon") is not None else coords[0],
+        p.get("place_id"), p.get("categories"), (), p.get("formatted"),
+    )
+
+
+def poi_from_dict(d: Any) -> Optional[POI]:
+    """
+    POI from its dict form (poi_to_dict, user-added {"name","lat","lon"}),
+    a raw feature, or a POI (returned as is). None without coordinates.
+    """
+    if isinstance(d, POI):
+        return d
+    if "properties" in d:
+        return poi_from_feature(d)
+    return _make(d.get("name"), d.get("lat"), d.get("lon"), d.get("id") or d.get("place_id"),
+                 d.get("categories"), d.get("groups"), d.get("formatted"))
+
+
+def poi_to_dict(poi: POI) -> Dict[str, Any]:
+    return {
+        "id": poi.id,
+        "name": poi.name,
+        "lat": poi.lat,
+        "lon": poi.lon,
+        "categories": poi.category_names,
+        "groups": list(poi.groups),
+        "formatted": poi.formatted,
+    }
+
+
+def coords_array(pois: Iterable[Any]) -> np.ndarray:
+    """(n, 2) float64 array of [lat, lon] for POIs (or {"lat","lon"} dicts)."""
+    rows = [(p.lat, p.lon) if isinstance(p, POI) else (p["lat"], p["lon"]) for p in pois]
+    return np.asarray(rows, dtype=np.float64).reshape(len(rows), 2)
@@ -0,0 +1,190 @@
+"""
+Spatial index over POIs with near-duplicate merging.
+
+Classes / functions:
+- POIIndex(cell_deg=0.01, merge_radius_m=75, name_similarity=0.8)
+    .add(poi, group=None) -> (kept_poi, merged)
+    .nearest(lat, lon, k=5) -> list
+    .within(lat, lon, radius_m) -> list
+- dedupe_categories(groups, index=None, limit=None) -> dict
+- haversine_m(lat1, lon1, lat2, lon2) -> float
+
+POIs are the records from src.tools.places (src.tools.poi.POI); dicts are
+converted on add. Two POIs are the same place when they share an id, or
+when they are within merge_radius_m of each other and their names are
+the same words (in any order), or share a word and are similar overall
+(SequenceMatcher ratio >= name_similarity), or one of them is unnamed
+(src.tools.poi.UNNAMED). Merged POIs keep the first copy and collect the
+other copy's category codes and groups (and its name, if the first copy is
+unnamed); records are immutable, so the merged POI replaces the kept one in
+the index.
+
+The index is a uniform lat/lon grid (dict of cells), so add/within/nearest
+only look at neighbouring cells instead of every POI.
+"""
+
+import math
+import re
+from difflib import SequenceMatcher
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from src.tools.poi import POI, UNNAMED, poi_from_dict
+
+EARTH_RADIUS_M = 6371008.8
+M_PER_DEG_LAT = 111320.0
+
+_non_alnum = re.compile(r"[^0-9a-z]+")
+
+
+def haversine_m(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dp, dl = p2 - p1, math.radians(lon2 - lon1)
+    a = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(min(1.0, a)))
+
+
+def _norm_name(name: Optional[str]) -> str:
+    if name == UNNAMED:
+        return ""
+    return _non_alnum.sub(" ", (name or "").lower()).strip()
+
+
+class POIIndex:
+    def __init__(self, cell_deg: float = 0.01, merge_radius_m: float = 75.0, name_similarity: float = 0.8):
+        self.cell_deg = cell_deg
+        self.merge_radius_m = merge_radius_m
+        self.name_similarity = name_similarity
+        self.pois: List[POI] = []
+        self.merged = 0
+        self._cells: Dict[Tuple[int, int], List[int]] = {}
+        self._by_id: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.pois)
+
+    def _cell(self, lat: float, lon: float) -> Tuple[int, int]:
+        return int(math.floor(lat / self.cell_deg)), int(math.floor(lon / self.cell_deg))
+
+    def _cells_around(self, lat: float, lon: float, radius_m: float):
+        dlat = radius_m / M_PER_DEG_LAT
+        dlon = radius_m / (M_PER_DEG_LAT * max(0.01, math.cos(math.radians(lat))))
+        i0, j0 = self._cell(lat - dlat, lon - dlon)
+        i1, j1 = self._cell(lat + dlat, lon + dlon)
+        for i in range(i0, i1 + 1):
+            for j in range(j0, j1 + 1):
+                yield from self._cells.get((i, j), ())
+
+    def _same_name(self, a: Optional[str], b: Optional[str]) -> bool:
+        # No substring shortcut: "Goa" and "Goa State Museum" are different places
+        a, b = _norm_name(a), _norm_name(b)
+        if not a or not b or a == b:
+            return True
+        ta, tb = set(a.split()), set(b.split())
+        if ta == tb:
+            return True
+        return bool(ta & tb) and SequenceMatcher(None, a, b).ratio() >= self.name_similarity
+
+    def _find_duplicate(self, poi: POI) -> Optional[int]:
+        if poi.id in self._by_id:
+            return self._by_id[poi.id]
+        for idx in self._cells_around(poi.lat, poi.lon, self.merge_radius_m):
+            other = self.pois[idx]
+            if (haversine_m(poi.lat, poi.lon, other.lat, other.lon) <= self.merge_radius_m
+                    and self._same_name(poi.name, other.name)):
+                return idx
+        return None
+
+    def _add(self, poi: POI, group: Optional[str]) -> Tuple[int, bool]:
+        dup = self._find_duplicate(poi)
+        if dup is not None:
+            kept = self.pois[dup]
+            categories = kept.categories + tuple(c for c in poi.categories if c not in kept.categories)
+            groups = kept.groups + ((group,) if group and group not in kept.groups else ())
+            name = poi.name if kept.name == UNNAMED else kept.name
+            if categories != kept.categories or groups != kept.groups or name != kept.name:
+                self.pois[dup] = kept._replace(name=name, categories=categories, groups=groups)
+            self._by_id.setdefault(poi.id, dup)
+            self.merged += 1
+            return dup, True
+
+        idx = len(self.pois)
+        self.pois.append(poi._replace(groups=(group,) if group else ()))
+        self._by_id[poi.id] = idx
+        self._cells.setdefault(self._cell(poi.lat, poi.lon), []).append(idx)
+        return idx, False
+
+    def add(self, poi: Any, group: Optional[str] = None) -> Tuple[Optional[POI], bool]:
+        """
+        Insert a POI (or its dict form), or merge it into an existing
+        duplicate. Returns (kept_poi, merged); (None, False) for a POI
+        without coordinates. `group` (e.g. "beaches") is recorded in the
+        kept POI's groups.
+        """
+        poi = poi_from_dict(poi)
+        if poi is None:
+            return None, False
+        idx, merged = self._add(poi, group)
+        return self.pois[idx], merged
+
+    def within(self, lat: float, lon: float, radius_m: float) -> List[POI]:
+        """POIs within radius_m of (lat, lon), nearest first."""
+        hits = []
+        for idx in self._cells_around(lat, lon, radius_m):
+            p = self.pois[idx]
+            d = haversine_m(lat, lon, p.lat, p.lon)
+            if d <= radius_m:
+                hits.append((d, idx))
+        return [self.pois[idx] for _, idx in sorted(hits)]
+
+    def nearest(self, lat: float, lon: float, k: int = 5) -> List[POI]:
+        """k nearest POIs to (lat, lon), searched in growing grid rings."""
+        if not self._cells:
+            return []
+        ci, cj = self._cell(lat, lon)
+        max_ring = max(max(abs(i - ci), abs(j - cj)) for i, j in self._cells)
+        found: List[Tuple[float, int]] = []
+        for ring in range(max_ring + 1):
+            for i in range(ci - ring, ci + ring + 1):
+                for j in range(cj - ring, cj + ring + 1):
+                    if max(abs(i - ci), abs(j - cj)) != ring:
+                        continue
+                    for idx in self._cells.get((i, j), ()):
+                        p = self.pois[idx]
+                        found.append((haversine_m(lat, lon, p.lat, p.lon), idx))
+            # anything outside this ring is at least `ring` cells away
+            if len(found) >= k:
+                found.sort()
+                ring_m = ring * self.cell_deg * M_PER_DEG_LAT * math.cos(math.radians(lat))
+                if found[k - 1][0] <= ring_m:
+                    break
+        found.sort()
+        return [self.pois[idx] for _, idx in found[:k]]
+
+
+def dedupe_categories(groups: Dict[str, Iterable[Any]], index: Optional[POIIndex] = None,
+                      limit: Optional[int] = None) -> Dict[str, List[POI]]:
+    """
+    Remove duplicates within and across category lists, e.g.
+        {"attractions": [...], "beaches": [...], "food": [...]}
+    A place that appears in several lists is kept only in the first one
+    (dict order), with the other lists recorded in its groups.
+    Groups may be streams (src.tools.places.iter_places); with `limit`, a
+    group stops being read once it has that many distinct POIs.
+    """
+    index = index or POIIndex()
+    kept: Dict[str, List[int]] = {}
+    for group, pois in groups.items():
+        kept[group] = []
+        for poi in pois:
+            poi = poi_from_dict(poi)
+            if poi is None:
+                continue
+            idx, merged = index._add(poi, group)
+            if not merged:
+                kept[group].append(idx)
+                if limit is not None and len(kept[group]) >= limit:
+                    break
+        if hasattr(pois, "close"):
+            pois.close()
+    # Read the records back at the end: later merges replace them in the index
+    return {group: [index.pois[i] for i in idxs] for group, idxs in kept.items()}
@@ -0,0 +1,303 @@
+"""
+Per-provider rate limiting for outbound HTTP calls.
+
+Functions:
+- get_bucket(host) -> TokenBucket
+- acquire(host) -> float
+- try_acquire(host, max_wait_s=0.0) -> bool
+- release(host) -> None
+- penalize(host, delay_s) -> None
+- polite_get(url, params=None, headers=None, timeout=10, max_retries=3, backoff_s=1.0) -> requests.Response
+
+Every provider host gets one token bucket (rate per second + burst), shared by
+all threads of the process. Callers are paced to exactly the allowed rate:
+a token is reserved up front and the caller sleeps only for the time until
+that token becomes available.
+
+HTTP 429/503 responses carrying `Retry-After` block the whole host for the
+requested delay. Other transient failures are retried with jittered
+exponential backoff.
+
+Slow requests are hedged (src.tools.hedging): a duplicate is sent only when
+the host's bucket can grant it a token within a short wait, so hedges are
+paced like every other request and never push a provider over its limit.
+
+Every attempt goes through the provider's circuit breaker
+(src.tools.circuit_breaker): while it is open, polite_get raises
+CircuitOpenError at once instead of waiting on an unhealthy provider.
+
+Inside a plan deadline (src.tools.deadline) each attempt's timeout is cut
+to the time left, and polite_get raises DeadlineExceeded instead of
+waiting for a token or a backoff that would end past the deadline.
+
+Set RATE_LIMIT_DIR to a shared directory to coordinate buckets across worker
+processes (state lives in one small file per host, guarded by flock).
+"""
+
+import json
+import os
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlparse
+
+import requests
+
+from src.tools.circuit_breaker import CircuitOpenError, get_breaker, provider_for
+from src.tools.deadline import DeadlineExceeded, call_timeout, remaining
+from src.tools.hedging import hedged_get
+
+try:
+    import fcntl
+except ImportError:  # non-POSIX: buckets stay per-process
+    fcntl = None
+
+# (requests per second, burst) per provider host
+PROVIDER_LIMITS: Dict[str, Tuple[float, int]] = {
+    "nominatim.openstreetmap.org": (1.0, 1),   # Nominatim usage policy: max 1 req/s
+    "api.geoapify.com": (5.0, 5),              # free tier: 5 req/s
+    "router.project-osrm.org": (5.0, 1),
+    "api.open-meteo.com": (10.0, 10),
+    "api.groq.com": (0.5, 4),                  # free tier: 30 req/min (LLM calls, not polite_get)
+}
+DEFAULT_LIMIT = (5.0, 5)
+
+# Statuses worth retrying; anything else >= 400 is raised immediately
+RETRY_STATUS = (429, 500, 502, 503, 504)
+MAX_BACKOFF_S = 30.0
+
+
+class TokenBucket:
+    """
+    Token bucket implemented as GCRA (virtual scheduling). reserve() always
+    books the next free slot and returns how long the caller must wait for
+    it, so concurrent callers are spaced exactly 1/rate apart once the burst
+    allowance is used up.
+    """
+
+    def __init__(self, rate: float, burst: int = 1, path: Optional[Path] = None):
+        self.interval = 1.0 / float(rate)
+        self.tolerance = (max(1, int(burst)) - 1) * self.interval
+        self.path = path
+        self._lock = threading.Lock()
+        self._state = {"tat": 0.0, "blocked_until": 0.0}
+
+    def _load(self, fh) -> Dict[str, float]:
+        fh.seek(0)
+        try:
+            return json.loads(fh.read() or "null") or {"tat": 0.0, "blocked_until": 0.0}
+        except ValueError:
+            return {"tat": 0.0, "blocked_until": 0.0}
+
+    def _store(self, fh, state: Dict[str, float]) -> None:
+        fh.seek(0)
+        fh.truncate()
+        fh.write(json.dumps(state))
+        fh.flush()
+
+    def _update(self, fn):
+        """Apply fn(state, now) under the thread lock (and the file lock, if shared)."""
+        with self._lock:
+            if self.path is None or fcntl is None:
+                return fn(self._state, time.time())
+            with open(self.path, "a+") as fh:
+                fcntl.flock(fh, fcntl.LOCK_EX)
+                try:
+                    state = self._load(fh)
+                    result = fn(state, time.time())
+                    self._store(fh, state)
+                    return result
+                finally:
+                    fcntl.flock(fh, fcntl.LOCK_UN)
+
+    def reserve(self) -> float:
+        """Take one token; return seconds to wait before it may be used."""
+        def _take(state, now):
+            tat = max(state["tat"], now)
+            start = max(now, tat - self.tolerance, state["blocked_until"])
+            state["tat"] = max(tat, start) + self.interval
+            return start - now
+        return self._update(_take)
+
+    def try_reserve(self, max_wait_s: float = 0.0) -> Optional[float]:
+        """Take one token only if it is usable within max_wait_s; returns the wait or None."""
+        def _try(state, now):
+            tat = max(state["tat"], now)
+            start = max(now, tat - self.tolerance, state["blocked_until"])
+            if start - now > max_wait_s:
+                return None
+            state["tat"] = max(tat, start) + self.interval
+            return start - now
+        return self._update(_try)
+
+    def release(self) -> None:
+        """Give back a token that was taken but not used."""
+        def _release(state, now):
+            state["tat"] = max(state["tat"] - self.interval, now)
+        self._update(_release)
+
+    def block(self, delay_s: float) -> None:
+        """Refuse tokens for the next delay_s seconds (e.g. after Retry-After)."""
+        def _block(state, now):
+            until = now + max(0.0, delay_s)
+            state["blocked_until"] = max(state["blocked_until"], until)
+            # no burst right after the block lifts
+            state["tat"] = max(state["tat"], until + self.tolerance)
+        self._update(_block)
+
+
+_buckets: Dict[str, TokenBucket] = {}
+_registry_lock = threading.Lock()
+
+
+def get_bucket(host: str) -> TokenBucket:
+    """Return the shared bucket for a provider host, creating it on first use."""
+    host = host.lower()
+    with _registry_lock:
+        bucket = _buckets.get(host)
+        if bucket is None:
+            rate, burst = PROVIDER_LIMITS.get(host, DEFAULT_LIMIT)
+            path = None
+            shared_dir = os.getenv("RATE_LIMIT_DIR")
+            if shared_dir:
+                Path(shared_dir).mkdir(parents=True, exist_ok=True)
+                path = Path(shared_dir) / f"{host}.bucket"
+            bucket = TokenBucket(rate, burst, path)
+            _buckets[host] = bucket
+        return bucket
+
+
+def configure(host: str, rate: float, burst: int = 1) -> None:
+    """Override the limit for a host (drops any existing in-process bucket)."""
+    host = host.lower()
+    PROVIDER_LIMITS[host] = (rate, burst)
+    with _registry_lock:
+        _buckets.pop(host, None)
+
+
+def acquire(host: str) -> float:
+    """Block until the host's bucket grants a token. Returns seconds waited."""
+    wait = get_bucket(host).reserve()
+    if wait > 0:
+        time.sleep(wait)
+    return wait
+
+
+def try_acquire(host: str, max_wait_s: float = 0.0) -> bool:
+    """Take a token only if one is free within max_wait_s (waiting for it); else False."""
+    wait = get_bucket(host).try_reserve(max_wait_s)
+    if wait is None:
+        return False
+    if wait > 0:
+        time.sleep(wait)
+    return True
+
+
+def release(host: str) -> None:
+    """Give back a token from acquire/try_acquire that ended up unused."""
+    get_bucket(host).release()
+
+
+def penalize(host: str, delay_s: float) -> None:
+    """Pause all callers of a host for delay_s seconds."""
+    get_bucket(host).block(delay_s)
+
+
+def _parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Retry-After is either delta-seconds or an HTTP date."""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt: int, base_s: float = 1.0) -> float:
+    """Full-jitter exponential backoff: uniform(0, base * 2^attempt), capped."""
+    return random.uniform(0, min(MAX_BACKOFF_S, base_s * (2 ** attempt)))
+
+
+def polite_get(
+    url: str,
+    params: Optional[Dict] = None,
+    headers: Optional[Dict] = None,
+    timeout: float = 10,
+    max_retries: int = 3,
+    backoff_s: float = 1.0,
+    hedge: bool = True,
+) -> requests.Response:
+    """
+    Rate-limited GET with retries.
+    - waits for the provider's token bucket before every attempt
+    - hedges attempts that run past the host's learned latency percentile
+    - honours Retry-After on 429/503 (blocks the host for everyone)
+    - retries connection errors and 5xx with jittered exponential backoff
+    - raises immediately on other 4xx responses
+    - raises CircuitOpenError without sending anything while the provider's
+      circuit breaker is open
+    - within a plan deadline, bounds every attempt (and the waits between
+      them) by the time left; raises DeadlineExceeded when it runs out
+    Raises the last error once max_retries attempts are exhausted.
+    """
+    host = urlparse(url).netloc
+    breaker = get_breaker(provider_for(host))
+    last_err: Optional[Exception] = None
+
+    for attempt in range(max_retries):
+        if not breaker.allow():
+            raise CircuitOpenError(f"{breaker.name} circuit open; not calling {host}") from last_err
+        left = remaining()
+        if left is None:
+            acquire(host)
+        elif not try_acquire(host, left):
+            raise DeadlineExceeded(f"no {host} slot before the deadline") from last_err
+        attempt_timeout = call_timeout(timeout)
+        try:
+            if hedge:
+                resp = hedged_get(url, params=params, headers=headers, timeout=attempt_timeout,
+                                  may_hedge=lambda wait_s: try_acquire(host, wait_s),
+                                  unused_hedge=lambda: release(host))
+            else:
+                resp = requests.get(url, params=params, headers=headers, timeout=attempt_timeout)
+        except requests.Timeout as e:
+            # A timeout shortened by the deadline says nothing about the provider
+            if attempt_timeout < timeout:
+                raise DeadlineExceeded(f"{host} did not answer before the deadline") from e
+            breaker.record(False)
+            last_err = e
+        except requests.RequestException as e:
+            breaker.record(False)
+            last_err = e
+        except Exception:
+            breaker.record(False)
+            raise
+        else:
+            # 429 means "slow down", not "unhealthy": it doesn't count against the breaker
+            breaker.record(resp.status_code not in RETRY_STATUS or resp.status_code == 429)
+            if resp.status_code not in RETRY_STATUS:
+                resp.raise_for_status()
+                return resp
+
+            last_err = requests.HTTPError(f"{resp.status_code} from {host}", response=resp)
+            retry_after = _parse_retry_after(resp.headers.get("Retry-After"))
+            if retry_after is not None:
+                penalize(host, min(retry_after, MAX_BACKOFF_S))
+                continue
+
+        if attempt < max_retries - 1:
+            delay = backoff_delay(attempt, backoff_s)
+            left = remaining()
+            if left is not None and delay >= left:
+                raise DeadlineExceeded(f"no time left to retry {host}") from last_err
+            time.sleep(delay)
+
+    raise last_err
@@ -8,8 +8,8 @@ Functions:
 
 """
 
-import requests
 from typing import Dict
+from src.tools.rate_limit import polite_get
 
 OSRM_BASE = "https://router.project-osrm.org/route/v1"
 
@@ -43,8 +43,7 @@ def osrm_route(lat_from: float, lon_from: float, lat_to: float, lon_to: float, m
         "steps": "false"
     }
 
-    resp = requests.get(url, params=params, timeout=15)
-    resp.raise_for_status()
+    resp = polite_get(url, params=params, timeout=15, max_retries=2)
     payload = resp.json()
 
     # Basic validation
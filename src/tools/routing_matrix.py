@@ -2,10 +2,13 @@
 Pairwise driving-time/distance matrix helper using OSRM.
 
 Functions:
-- compute_matrix_from_places(places, pause_s=0.2) -> dict
+- compute_matrix_from_places(places, method="osrm", approx_fallback=True, modes=("walking",)) -> dict
+- compute_approx_matrix(places, mode="driving", profile=None) -> dict
+- update_matrix(matrix, add=(), remove=(), approx_fallback=True) -> dict
+- calibrate_profile(places, mode="driving", sample_size=10) -> dict
 - pretty_print_matrix(matrix_dict) -> None
 
-`places` should be an iterable of dicts with keys:
+`places` is an iterable of POI records (src.tools.poi) or dicts with keys:
   - "name" (str)
   - "lat"  (float)
   - "lon"  (float)
@@ -13,44 +16,296 @@ Functions:
 Example place item:
   {"name": "Fort Aguada", "lat": 15.470, "lon": 73.765}
 
+Dicts are converted to POIs once on entry; coordinates then go to NumPy in
+one coords_array() call. The "places" stored in a matrix stay plain dicts,
+since matrices are kept in the artifact store.
+
 This module calls src.tools.routing.osrm_route(...) for pairwise routing.
+Request pacing is left to the shared OSRM rate limiter (src.tools.rate_limit).
+
+The approximate mode needs no network: great-circle distances for all pairs
+are computed in one vectorized NumPy pass, then scaled by a circuity factor
+(road km per straight-line km) and divided by a per-mode average speed.
+It has the same keys as the OSRM matrix, so build_itinerary can use it as a
+fast first pass; it also fills individual cells where OSRM failed.
+Matrices containing estimated cells carry "approximate": True.
+
+Walking/cycling matrices are produced in the same pass without extra
+provider calls: the public OSRM server only routes cars, so each pair is
+routed once (driving) and the slower modes reuse that road distance
+(capped by the mode's own circuity) at the mode's speed. Pairs farther apart
+than MODE_MAX_M are not offered for that mode. Every routed (driving) pair
+is cached in ROUTE_CACHE, so repeat plans for the same POIs make no OSRM
+calls; the derived modes are recomputed from it, never cached.
+When OSRM is down (its circuit breaker is open) or the plan deadline
+(src.tools.deadline) has run out, the remaining pairs come from expired
+cache entries or the estimate, without waiting on OSRM.
+
+Matrices carry their "places", so update_matrix() can apply a POI delta to
+an existing matrix in place: removed POIs are deleted from every row, and
+each added POI costs its new row and column (2N cells) instead of a full
+N² recomputation. Cells an earlier pass had to estimate are routed again
+on every update, so a replan doesn't carry estimates forward once OSRM is
+back.
 """
-import time
-from typing import List, Dict, Any
-from src.tools.routing import osrm_route
+import random
+from typing import List, Dict, Any, Optional
+
+import numpy as np
+
+from src.tools.cache import FileCache
+from src.tools.circuit_breaker import CircuitOpenError
+from src.tools.deadline import DeadlineExceeded, record_cut
+from src.tools.poi import POI, coords_array, poi_from_dict
+from src.tools.routing import osrm_route, format_distance, format_duration
+
+EARTH_RADIUS_M = 6371008.8
+
+# Road distance ≈ great-circle distance × circuity; duration = road distance / speed
+SPEED_PROFILES = {
+    "driving": {"circuity": 1.35, "speed_kmh": 32.0},
+    "walking": {"circuity": 1.25, "speed_kmh": 4.8},
+    "cycling": {"circuity": 1.30, "speed_kmh": 14.0},
+}
+
+# Great-circle distance (m) beyond which a mode is not considered for a leg
+MODE_MAX_M = {"walking": 2000.0, "cycling": 8000.0}
+
+ROUTE_CACHE = FileCache("route_cache.json", ttl_s=30 * 24 * 3600)
+
+def _route_key(mode: str, a: POI, b: POI) -> str:
+    return f"{mode}:{a.lat:.5f},{a.lon:.5f};{b.lat:.5f},{b.lon:.5f}"
+
+def _as_pois(places) -> List[POI]:
+    pois = []
+    for place in places:
+        if not isinstance(place, POI) and not all(place.get(k) is not None for k in ("name","lat","lon")):
+            raise ValueError("Each place must have 'name','lat','lon' keys")
+        pois.append(poi_from_dict(place))
+    return pois
+
+def _place_record(place: POI) -> Dict[str,Any]:
+    return {"name": place.name, "lat": place.lat, "lon": place.lon}
+
+def _gc_matrix(places: List[POI]) -> np.ndarray:
+    coords = coords_array(places)
+    return haversine_matrix_m(coords[:, 0], coords[:, 1])
+
+def haversine_matrix_m(lats, lons) -> np.ndarray:
+    """All-pairs great-circle distance (metres) for coordinate arrays in degrees."""
+    lat = np.radians(np.asarray(lats, dtype=np.float64))
+    lon = np.radians(np.asarray(lons, dtype=np.float64))
+    dlat = lat[:, None] - lat[None, :]
+    dlon = lon[:, None] - lon[None, :]
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat)[:, None] * np.cos(lat)[None, :] * np.sin(dlon / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+def _approx_arrays(places: List[POI], mode: str, profile: Optional[Dict[str,float]]):
+    prof = profile or SPEED_PROFILES[mode]
+    gc = _gc_matrix(places)
+    dist = gc * prof["circuity"]
+    dur = dist / (prof["speed_kmh"] / 3.6)
+    return dist, dur
+
+def _haversine_row_m(p: POI, places: List[POI]) -> np.ndarray:
+    """Great-circle distance (metres) from p to each of places."""
+    lat0, lon0 = np.radians(p.lat), np.radians(p.lon)
+    coords = np.radians(coords_array(places))
+    lat, lon = coords[:, 0], coords[:, 1]
+    a = np.sin((lat - lat0) / 2) ** 2 + np.cos(lat0) * np.cos(lat) * np.sin((lon - lon0) / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+def _mode_cell(mode: str, gc_m: float, road_m: float):
+    """
+    One (distance, duration) cell of a slower mode, derived from the driving
+    road distance. Plain arithmetic, so it is never cached: it follows the
+    current SPEED_PROFILES (e.g. after calibrate_profile).
+    """
+    prof = SPEED_PROFILES[mode]
+    if gc_m > MODE_MAX_M.get(mode, float("inf")):
+        return float("inf"), float("inf")
+    d = min(road_m, gc_m * prof["circuity"])
+    return d, d / (prof["speed_kmh"] / 3.6)
+
+def _mode_matrices(places: List[POI], gc: np.ndarray, road_m: List[List[float]],
+                   modes) -> Dict[str, Dict[str, List[List[float]]]]:
+    """
+    Derive slower-mode matrices from the driving road distances.
+    Cells beyond MODE_MAX_M[mode] are inf.
+    """
+    n = len(places)
+    out = {}
+    for mode in modes:
+        if mode == "driving":
+            continue
+        dist = [[0.0]*n for _ in range(n)]
+        dur = [[0.0]*n for _ in range(n)]
+        for i in range(n):
+            for j in range(n):
+                if i == j:
+                    continue
+                dist[i][j], dur[i][j] = _mode_cell(mode, float(gc[i, j]), road_m[i][j])
+        out[mode] = {"distance_m": dist, "duration_s": dur}
+    return out
+
+def compute_approx_matrix(places: List[Dict[str,Any]], mode: str = "driving",
+                          profile: Optional[Dict[str,float]] = None, modes=()) -> Dict[str, Any]:
+    """
+    Estimated matrix from straight-line distances (no provider calls).
+    - mode: key of SPEED_PROFILES
+    - profile: {"circuity", "speed_kmh"} override, e.g. from calibrate_profile()
+    - modes: extra modes to estimate alongside (see compute_matrix_from_places)
+    Same shape as compute_matrix_from_places, plus "approximate": True.
+    """
+    places = _as_pois(places)
+    n = len(places)
+    if n == 0:
+        return {}
+
+    dist, dur = _approx_arrays(places, mode, profile)
+    extra = {}
+    if modes:
+        gc = _gc_matrix(places)
+        for m in modes:
+            if m == mode:
+                continue
+            prof = SPEED_PROFILES[m]
+            d = gc * prof["circuity"]
+            t = d / (prof["speed_kmh"] / 3.6)
+            far = gc > MODE_MAX_M.get(m, np.inf)
+            d[far] = np.inf
+            t[far] = np.inf
+            extra[m] = {"distance_m": d.tolist(), "duration_s": t.tolist()}
+    return {
+        "names": [p.name for p in places],
+        "places": [_place_record(p) for p in places],
+        "distance_m": dist.tolist(),
+        "duration_s": dur.tolist(),
+        "distance_readable": [["~" + format_distance(d) for d in row] for row in dist.tolist()],
+        "duration_readable": [["~" + format_duration(t) for t in row] for row in dur.tolist()],
+        "approximate": True,
+        "mode": mode,
+        "modes": extra,
+    }
+
+def calibrate_profile(places: List[Dict[str,Any]], mode: str = "driving",
+                      sample_size: int = 10, seed: int = 0) -> Dict[str, float]:
+    """
+    Fit circuity and average speed for `mode` from a random sample of real
+    OSRM routes between the given places (medians, so outliers don't skew it).
+    Updates SPEED_PROFILES[mode] and returns the fitted profile.
+    """
+    places = _as_pois(places)
+    n = len(places)
+    pairs = [(i, j) for i in range(n) for j in range(n) if i != j]
+    random.Random(seed).shuffle(pairs)
 
-def _ensure_place_fields(place: Dict[str,Any]):
-    if not all(k in place for k in ("name","lat","lon")):
-        raise ValueError("Each place must have 'name','lat','lon' keys")
+    gc = _gc_matrix(places)
+    circuity, speed = [], []
+    for i, j in pairs[:sample_size]:
+        if gc[i, j] < 50:
+            continue
+        a, b = places[i], places[j]
+        try:
+            res = osrm_route(a.lat, a.lon, b.lat, b.lon, mode=mode)
+        except Exception as e:
+            print(f"[warning] calibration route failed for {a.name} -> {b.name}: {e}")
+            continue
+        if res["duration_s"] > 0:
+            circuity.append(res["distance_m"] / gc[i, j])
+            speed.append(res["distance_m"] / res["duration_s"] * 3.6)
 
-def compute_matrix_from_places(places: List[Dict[str,Any]], pause_s: float = 0.2) -> Dict[str, Any]:
+    if not circuity:
+        return dict(SPEED_PROFILES[mode])
+
+    profile = {"circuity": float(np.median(circuity)), "speed_kmh": float(np.median(speed))}
+    SPEED_PROFILES[mode] = profile
+    return profile
+
+def _driving_cell(a: POI, b: POI, ctx: Dict[str,Any], estimate=None):
+    """
+    One driving cell a -> b: cached route, else OSRM. If OSRM fails, fall back
+    to an expired cached route, then `estimate()` (if given), else an inf
+    sentinel, so planning continues rather than crashes. An open circuit or
+    a spent deadline fails instantly for every pair, so it is only warned
+    about once per ctx (ctx["deadline"] counts the pairs it cost).
+    Returns (distance_m, duration_s, distance_str, duration_str, estimated).
+    """
+    key = _route_key("driving", a, b)
+    cached = ROUTE_CACHE.get(key)
+    if cached is not None:
+        return cached[0], cached[1], format_distance(cached[0]), format_duration(cached[1]), False
+
+    try:
+        res = osrm_route(a.lat, a.lon, b.lat, b.lon, mode="driving")
+    except Exception as e:
+        if isinstance(e, DeadlineExceeded):
+            ctx["deadline"] = ctx.get("deadline", 0) + 1
+        elif not isinstance(e, CircuitOpenError):
+            print(f"[warning] OSRM route failed for {a.name} -> {b.name}: {e}")
+        elif not ctx["circuit_open"]:
+            ctx["circuit_open"] = True
+            print(f"[warning] {e}; using cached routes / estimates for the remaining pairs")
+        stale = ROUTE_CACHE.get(key, allow_stale=True)
+        if stale is not None:
+            return stale[0], stale[1], format_distance(stale[0]), format_duration(stale[1]), False
+        if estimate is not None:
+            d, t = estimate()
+            return d, t, "~" + format_distance(d), "~" + format_duration(t), True
+        return float("inf"), float("inf"), "∞", "∞", False
+
+    d, t = res.get("distance_m", 0.0), res.get("duration_s", 0.0)
+    ROUTE_CACHE.set(key, [d, t])
+    return d, t, res.get("distance", ""), res.get("duration", ""), False
+
+def compute_matrix_from_places(places: List[Dict[str,Any]], method: str = "osrm",
+                               approx_fallback: bool = True, modes=("walking",)) -> Dict[str, Any]:
     """
     Compute pairwise driving matrix for given places.
-    - places: list of {"name", "lat", "lon"}
-    - pause_s: pause between OSRM requests (politeness)
+    - places: list of POIs or {"name", "lat", "lon"} dicts
+    - method: "osrm" (one route request per pair) or "approx" (compute_approx_matrix)
+    - approx_fallback: fill pairs where OSRM failed with the approximate value
+      instead of an inf sentinel (an expired cached route is preferred)
+    - modes: extra travel modes ("walking", "cycling") derived in the same pass
     Returns a dict:
     {
       "names": [name1,...],
+      "places": [{"name", "lat", "lon"}, ...],   # row/column order
       "distance_m": [[0, d12, ...], [...], ...],
       "duration_s": [[0, t12, ...], [...], ...],
       "distance_readable": [[...], ...],
-      "duration_readable": [[...], ...]
+      "duration_readable": [[...], ...],
+      "approximate": bool,          # True if any cell is an estimate
+      "approx_cells": [[i, j], ...] # estimated cells (OSRM mode only)
+      "modes": {"walking": {"distance_m": [[...]], "duration_s": [[...]]}, ...}
     }
+    Top-level distance/duration keys are the driving matrix.
     """
+    if method == "approx":
+        return compute_approx_matrix(places, modes=modes)
+    if method != "osrm":
+        raise ValueError("method must be 'osrm' or 'approx'")
+
+    places = _as_pois(places)
     n = len(places)
     if n == 0:
         return {}
 
-    # Validate
-    for p in places:
-        _ensure_place_fields(p)
-
-    names = [p["name"] for p in places]
+    names = [p.name for p in places]
     # initialize matrices
     distance_m = [[0.0]*n for _ in range(n)]
     duration_s = [[0.0]*n for _ in range(n)]
     distance_str = [["-"]*n for _ in range(n)]
     duration_str = [["-"]*n for _ in range(n)]
+    approx_cells = []
+    approx = None   # computed lazily on the first failure
+    ctx = {"circuit_open": False}
+
+    def estimate(i, j):
+        nonlocal approx
+        if approx is None:
+            approx = _approx_arrays(places, "driving", None)
+        return float(approx[0][i, j]), float(approx[1][i, j])
 
     # compute pairwise (i -> j) for i != j
     for i in range(n):
@@ -62,44 +317,158 @@ def compute_matrix_from_places(places: List[Dict[str,Any]], pause_s: float = 0.2
                 duration_str[i][j] = "0s"
                 continue
 
-            a = places[i]
-            b = places[j]
-
-            # polite pause
-            time.sleep(pause_s)
-
-            try:
-                res = osrm_route(a["lat"], a["lon"], b["lat"], b["lon"], mode="driving")
-            except Exception as e:
-                # If OSRM fails for this pair, store large sentinel and continue
-                # This allows planning to continue rather than crash.
-                print(f"[warning] OSRM route failed for {a['name']} -> {b['name']}: {e}")
-                distance_m[i][j] = float("inf")
-                duration_s[i][j] = float("inf")
-                distance_str[i][j] = "∞"
-                duration_str[i][j] = "∞"
-                continue
+            (distance_m[i][j], duration_s[i][j], distance_str[i][j], duration_str[i][j],
+             estimated) = _driving_cell(places[i], places[j], ctx,
+                                        (lambda: estimate(i, j)) if approx_fallback else None)
+            if estimated:
+                approx_cells.append([i, j])
+
+    if ctx.get("deadline"):
+        record_cut("routing", f"{ctx['deadline']} of {n * (n - 1)} routes estimated (deadline)")
 
-            distance_m[i][j] = res.get("distance_m", 0.0)
-            duration_s[i][j] = res.get("duration_s", 0.0)
-            distance_str[i][j] = res.get("distance", "")
-            duration_str[i][j] = res.get("duration", "")
+    # Slower modes reuse the driving road distances: no extra provider calls
+    extra = _mode_matrices(places, _gc_matrix(places), distance_m, modes)
+    ROUTE_CACHE.flush()
 
     return {
         "names": names,
+        "places": [_place_record(p) for p in places],
         "distance_m": distance_m,
         "duration_s": duration_s,
         "distance_readable": distance_str,
         "duration_readable": duration_str,
+        "approximate": bool(approx_cells),
+        "approx_cells": approx_cells,
+        "modes": extra,
     }
 
 
+def _square_lists(matrix: Dict[str,Any]) -> List[List[List[Any]]]:
+    squares = [matrix[k] for k in ("distance_m", "duration_s", "distance_readable", "duration_readable")]
+    for mode in (matrix.get("modes") or {}).values():
+        squares += [mode["distance_m"], mode["duration_s"]]
+    return squares
+
+def update_matrix(matrix: Dict[str,Any], add: List[Dict[str,Any]] = (), remove=(),
+                  approx_fallback: bool = True) -> Dict[str, Any]:
+    """
+    Apply a POI delta to a matrix from compute_matrix_from_places or
+    compute_approx_matrix, in place (the matrix is returned for convenience).
+    - remove: names or indices of POIs to drop; their rows and columns are
+      deleted from every list, nothing else is copied or recomputed
+    - add: new POIs or {"name", "lat", "lon"} places, appended in order; each one is
+      routed against the current POIs only (2N cells, cache first)
+    Cells of an OSRM matrix that were estimated (approx_cells) are routed
+    again; those that still fail (OSRM down, no time left) keep their
+    estimate.
+    "names", "places", "approx_cells", "approximate" and the mode matrices
+    stay consistent with the new row/column order.
+    """
+    if "places" not in matrix:
+        raise ValueError("matrix has no 'places' (computed by an older version); recompute it")
+    add = _as_pois(add)
+
+    names, records = matrix["names"], matrix["places"]
+    squares = _square_lists(matrix)
+
+    # Drop removed POIs, highest index first so the others stay valid
+    drop = sorted({r if isinstance(r, int) else names.index(r) for r in remove}, reverse=True)
+    for k in drop:
+        del names[k]
+        del records[k]
+        for sq in squares:
+            del sq[k]
+            for row in sq:
+                del row[k]
+    if drop and matrix.get("approx_cells"):
+        def shift(i):
+            return i - sum(1 for k in drop if k < i)
+        matrix["approx_cells"] = [[shift(i), shift(j)] for i, j in matrix["approx_cells"]
+                                  if i not in drop and j not in drop]
+
+    # Fully estimated matrices stay estimated; OSRM matrices route the new cells
+    estimate_only = bool(matrix.get("approximate")) and "approx_cells" not in matrix
+    mode = matrix.get("mode", "driving")
+    modes = matrix.get("modes") or {}
+    ctx = {"circuit_open": False}
+    places = _as_pois(records)
+
+    if not estimate_only and matrix.get("approx_cells"):
+        still = []
+        for i, j in matrix["approx_cells"]:
+            kept = (matrix["distance_m"][i][j], matrix["duration_s"][i][j])
+            d, t, ds, ts, estimated = _driving_cell(places[i], places[j], ctx, lambda: kept)
+            if estimated:
+                still.append([i, j])
+                continue
+            for key, value in (("distance_m", d), ("duration_s", t), ("distance_readable", ds),
+                               ("duration_readable", ts)):
+                matrix[key][i][j] = value
+            gc_ij = float(_haversine_row_m(places[i], [places[j]])[0])
+            for m, sub in modes.items():
+                sub["distance_m"][i][j], sub["duration_s"][i][j] = _mode_cell(m, gc_ij, d)
+        matrix["approx_cells"] = still
+
+    def cell(a, b):
+        if estimate_only:
+            dist, dur = _approx_arrays([a, b], mode, None)
+            d, t = float(dist[0, 1]), float(dur[0, 1])
+            return d, t, "~" + format_distance(d), "~" + format_duration(t), False
+        def estimate():
+            dist, dur = _approx_arrays([a, b], "driving", None)
+            return float(dist[0, 1]), float(dur[0, 1])
+        return _driving_cell(a, b, ctx, estimate if approx_fallback else None)
+
+    for p in add:
+        n = len(places)
+        gc = _haversine_row_m(p, places) if n else []
+        col = [cell(places[i], p) for i in range(n)]     # existing -> new
+        row = [cell(p, places[j]) for j in range(n)]     # new -> existing
+        places.append(p)
+        records.append(_place_record(p))
+        names.append(p.name)
+
+        values = {"distance_m": 0, "duration_s": 1, "distance_readable": 2, "duration_readable": 3}
+        diagonal = {"distance_m": 0.0, "duration_s": 0.0, "distance_readable": "0 m", "duration_readable": "0s"}
+        if estimate_only:
+            diagonal.update(distance_readable="~" + format_distance(0.0), duration_readable="~" + format_duration(0.0))
+        for key, v in values.items():
+            sq = matrix[key]
+            for i in range(n):
+                sq[i].append(col[i][v])
+            sq.append([row[j][v] for j in range(n)] + [diagonal[key]])
+        if not estimate_only:
+            matrix.setdefault("approx_cells", [])
+            matrix["approx_cells"] += [[i, n] for i in range(n) if col[i][4]]
+            matrix["approx_cells"] += [[n, j] for j in range(n) if row[j][4]]
+
+        for m, sub in modes.items():
+            dist, dur = sub["distance_m"], sub["duration_s"]
+            new_col = [_mode_cell(m, float(gc[i]), col[i][0]) for i in range(n)]
+            new_row = [_mode_cell(m, float(gc[j]), row[j][0]) for j in range(n)]
+            for i in range(n):
+                dist[i].append(new_col[i][0])
+                dur[i].append(new_col[i][1])
+            dist.append([c[0] for c in new_row] + [0.0])
+            dur.append([c[1] for c in new_row] + [0.0])
+
+    if ctx.get("deadline"):
+        record_cut("routing", f"{ctx['deadline']} routes estimated (deadline)")
+    if not estimate_only:
+        matrix["approximate"] = bool(matrix.get("approx_cells"))
+    ROUTE_CACHE.flush()
+    return matrix
+
+
 def pretty_print_matrix(matrix: Dict[str,Any]) -> None:
     """Prints a readable matrix to console (names + durations)."""
     names = matrix["names"]
     dur = matrix["duration_readable"]
     n = len(names)
 
+    if matrix.get("approximate"):
+        print("(~ = approximate, estimated from straight-line distance)")
+
     # header
     header = ["From \\ To"] + names
     row_fmt = "{:20}" + ("{:>12}" * n)
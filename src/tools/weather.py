@@ -1,20 +1,80 @@
-import requests
-from urllib.parse import urlencode
+from typing import List, Optional, Sequence, Tuple
+
+from src.tools.cache import FileCache
+from src.tools.rate_limit import polite_get
+
+URL = "https://api.open-meteo.com/v1/forecast"
+DAILY = "temperature_2m_max,temperature_2m_min,precipitation_sum"
+
+# Forecasts per location: fresh for WEATHER_TTL_S, older ones are only
+# served when Open-Meteo is unavailable
+WEATHER_TTL_S = 3 * 3600
+WEATHER_CACHE = FileCache("weather_cache.json", ttl_s=WEATHER_TTL_S)
+
+# Locations per multi-location request (keeps the URL well under 8 KB)
+BATCH_SIZE = 100
+
+def _cache_key(lat: float, lon: float) -> str:
+    return f"{lat:.3f},{lon:.3f}"
 
 def get_weather_forecast(lat: float, lon: float):
     """
     Get the 7-day daily weather forecast using Open-Meteo (no API key required).
-    Always fetch fresh data (no caching).
+    Forecasts are cached per location for WEATHER_TTL_S. If Open-Meteo fails
+    (or its circuit breaker is open), the last good forecast is returned with
+    "stale": True; without one the error is raised.
+    A one-location get_weather_forecasts(..., strict=True).
     """
-    url = "https://api.open-meteo.com/v1/forecast?"
-    params = {
-        "latitude": lat,
-        "longitude": lon,
-        "daily": "temperature_2m_max,temperature_2m_min,precipitation_sum",
-        "timezone": "auto"
-    }
-
-    full_url = url + urlencode(params)
-    r = requests.get(full_url, timeout=10)
-    r.raise_for_status()
-    return r.json()
+    return get_weather_forecasts([(lat, lon)], strict=True)[0]
+
+def get_weather_forecasts(coords: Sequence[Tuple[float, float]], batch_size: int = BATCH_SIZE,
+                          strict: bool = False) -> List[Optional[dict]]:
+    """
+    Batched get_weather_forecast for many (lat, lon) pairs, results in input order.
+    Cached locations are served directly; the remaining unique locations are
+    fetched batch_size at a time with Open-Meteo's comma-separated
+    latitude/longitude lists (one request per chunk) and the multi-location
+    response is split back per place and cached. A failed chunk falls back to
+    stale cached forecasts; locations without one come back as None, or with
+    strict=True the chunk's error is raised (e.g. DeadlineExceeded, for the
+    node's fallback).
+    """
+    keys = [_cache_key(lat, lon) for lat, lon in coords]
+    found = {}
+    pending = {}
+    for key, (lat, lon) in zip(keys, coords):
+        if key in found or key in pending:
+            continue
+        cached = WEATHER_CACHE.get(key)
+        if cached is not None:
+            found[key] = cached
+        else:
+            pending[key] = (lat, lon)
+
+    todo = list(pending.items())
+    for start in range(0, len(todo), batch_size):
+        chunk = todo[start:start + batch_size]
+        params = {
+            "latitude": ",".join(f"{lat:.4f}" for _, (lat, _) in chunk),
+            "longitude": ",".join(f"{lon:.4f}" for _, (_, lon) in chunk),
+            "daily": DAILY,
+            "timezone": "auto",
+        }
+        try:
+            data = polite_get(URL, params=params, timeout=20).json()
+        except Exception as e:
+            for key, _ in chunk:
+                stale = WEATHER_CACHE.get(key, allow_stale=True)
+                if stale is not None:
+                    found[key] = {**stale, "stale": True}
+                elif strict:
+                    raise
+            print(f"[warning] Open-Meteo batch of {len(chunk)} failed ({e}); using cached forecasts")
+            continue
+        # A single location comes back as an object, several as a list (request order)
+        results = data if isinstance(data, list) else [data]
+        for (key, _), forecast in zip(chunk, results):
+            WEATHER_CACHE.set(key, forecast)
+            found[key] = forecast
+
+    return [found.get(key) for key in keys]
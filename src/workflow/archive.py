@@ -0,0 +1,335 @@
+"""
+Columnar archive of finished plans, for batch analytics.
+
+Functions:
+- plan_record(result, run_id=None) -> dict
+- append_plan(result, run_id=None, path=PLAN_ARCHIVE) -> None
+- seal(path=PLAN_ARCHIVE) -> int
+- scan(columns=None, destination=None, since=None, until=None, path=PLAN_ARCHIVE) -> iterator
+- list_columns(path=PLAN_ARCHIVE) -> list
+
+Every finished plan becomes one flat row: parameters, budget breakdown,
+assessment, routing matrix summary stats, node timings, the number of
+deadline cuts, LLM call totals and the itinerary text. Layout on disk:
+
+    plan_archive/
+      manifest.json            sealed chunks: rows, date range, destinations, columns
+      tail.jsonl               rows appended since the last sealed chunk
+      tail.rows                number of rows in tail.jsonl
+      c000001/<column>.json.gz one gzip'd JSON array per column
+
+append_plan() writes a single line to tail.jsonl and bumps the row count
+in tail.rows (both under the writer lock, so the tail is never re-read to
+count it); once the tail holds CHUNK_ROWS rows it is sealed into a chunk,
+pivoted to one compressed file per column. The tail stays the source of
+truth until the manifest lists its chunk: a chunk directory the manifest
+doesn't know (a seal that crashed before recording it) is replaced. scan() reads only the columns it needs, one chunk at a time:
+the filter columns (destination, date) first, then the requested columns of
+chunks with matching rows. Chunks whose manifest date range or destination
+set cannot match are skipped without being opened. The itinerary text is a
+column of its own and is only decompressed when asked for.
+
+Query from the shell:
+    python -m src.workflow.archive query --destination goa --since 2026-10-01 \\
+        --columns run_id destination budget.total_estimated
+"""
+
+import argparse
+import datetime as dt
+import gzip
+import json
+import os
+import shutil
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+from src.tools.llm_telemetry import summarize_calls
+from src.workflow.state import routing_matrix
+
+try:
+    import fcntl
+except ImportError:  # non-POSIX: appends are only serialized within the process
+    fcntl = None
+
+PLAN_ARCHIVE = os.getenv("PLAN_ARCHIVE", "plan_archive")
+CHUNK_ROWS = 256
+
+# Columns returned by scan() when none are requested (the blob is opt-in)
+BLOB_COLUMNS = ("itinerary",)
+
+_lock = threading.Lock()
+
+
+# -------------------------
+# Row construction
+# -------------------------
+
+def _matrix_stats(routings: Sequence[Optional[dict]]) -> Dict[str, Any]:
+    """Summary of one or more routing matrices (multi-city: all cities pooled)."""
+    n_places, approximate = 0, False
+    durations, total_km = [], 0.0
+    for routing in routings:
+        matrix = routing_matrix(routing)
+        if not matrix:
+            continue
+        n_places += len(matrix.get("names", []))
+        approximate = approximate or bool(matrix.get("approximate"))
+        for i, row in enumerate(matrix.get("duration_s") or []):
+            durations += [d for j, d in enumerate(row) if j != i and d is not None]
+        for i, row in enumerate(matrix.get("distance_m") or []):
+            total_km += sum(d for d in row[i + 1:] if d is not None) / 1000.0
+    return {
+        "matrix.n_places": n_places,
+        "matrix.mean_duration_s": round(sum(durations) / len(durations), 1) if durations else None,
+        "matrix.max_duration_s": max(durations) if durations else None,
+        "matrix.total_km": round(total_km, 2),
+        "matrix.approximate": approximate,
+    }
+
+
+def plan_record(result: Dict[str, Any], run_id: Optional[str] = None) -> Dict[str, Any]:
+    """Flatten a finished TravelState (dict form) into one archive row."""
+    now = time.time()
+    cities = sorted(result.get("cities") or [], key=lambda c: c["index"])
+    budget = result.get("budget") or {}
+    breakdown = budget.get("breakdown") or {}
+    assessment = budget.get("assessment") or {}
+
+    row: Dict[str, Any] = {
+        "run_id": run_id,
+        "created_at": round(now, 3),
+        "date": dt.date.fromtimestamp(now).isoformat(),
+        "destination": breakdown.get("destination") or result.get("destination"),
+        "n_cities": len(cities) or 1,
+        "days": result.get("days"),
+        "persons": result.get("persons"),
+        "budget_inr": result.get("budget_inr"),
+        "budget_tier": result.get("budget_tier"),
+    }
+    for key, value in breakdown.items():
+        if isinstance(value, (int, float)) and key not in ("days", "persons"):
+            row[f"budget.{key}"] = value
+    for key in ("fits", "estimated_total", "difference"):
+        row[f"assessment.{key}"] = assessment.get(key)
+    row.update(_matrix_stats([c["routing"] for c in cities] if cities else [result.get("routing")]))
+    # Multi-city timings ("Hanoi:places") are summed per node to keep the schema fixed
+    for node, seconds in (result.get("node_timings") or {}).items():
+        col = f"timing.{node.rsplit(':', 1)[-1]}"
+        row[col] = round(row.get(col, 0.0) + seconds, 4)
+    row["cuts"] = len(result.get("cuts") or [])
+    llm = summarize_calls(result.get("llm_calls") or [])
+    for key in ("calls", "prompt_tokens", "completion_tokens", "truncated", "ttft_p50_s", "latency_p50_s"):
+        row[f"llm.{key}"] = llm[key]
+    row["itinerary"] = result.get("itinerary")
+    return row
+
+
+# -------------------------
+# Writing
+# -------------------------
+
+@contextmanager
+def _locked(root: Path):
+    """Serialize writers (threads, and processes via flock where available)."""
+    root.mkdir(parents=True, exist_ok=True)
+    with _lock:
+        if fcntl is None:
+            yield
+            return
+        with open(root / ".lock", "a") as fh:
+            fcntl.flock(fh, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(fh, fcntl.LOCK_UN)
+
+
+def _load_manifest(root: Path) -> Dict[str, Any]:
+    path = root / "manifest.json"
+    if not path.exists():
+        return {"chunks": []}
+    return json.loads(path.read_text())
+
+
+def _store_manifest(root: Path, manifest: Dict[str, Any]) -> None:
+    tmp = root / "manifest.json.tmp"
+    tmp.write_text(json.dumps(manifest, indent=1))
+    tmp.replace(root / "manifest.json")
+
+
+def _read_tail(root: Path) -> List[Dict[str, Any]]:
+    path = root / "tail.jsonl"
+    if not path.exists():
+        return []
+    with open(path, encoding="utf-8") as fh:
+        return [json.loads(line) for line in fh if line.strip()]
+
+
+def _tail_rows(root: Path) -> int:
+    try:
+        return int((root / "tail.rows").read_text())
+    except (FileNotFoundError, ValueError):
+        # Archives from before the counter, or a write cut short: count once
+        return len(_read_tail(root))
+
+
+def _store_tail_rows(root: Path, rows: int) -> None:
+    (root / "tail.rows").write_text(str(rows))
+
+
+def _seal_locked(root: Path) -> int:
+    rows = _read_tail(root)
+    if not rows:
+        return 0
+    manifest = _load_manifest(root)
+    seq = max((c["seq"] for c in manifest["chunks"]), default=0) + 1
+    name = f"c{seq:06d}"
+
+    columns: List[str] = []
+    for row in rows:
+        columns += [k for k in row if k not in columns]
+
+    tmp_dir = root / f"{name}.tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    tmp_dir.mkdir()
+    for col in columns:
+        blob = json.dumps([row.get(col) for row in rows], separators=(",", ":")).encode("utf-8")
+        (tmp_dir / f"{col}.json.gz").write_bytes(gzip.compress(blob, compresslevel=6))
+    if (root / name).exists():
+        # Left by a seal that crashed before the manifest listed it; its rows are still in the tail
+        shutil.rmtree(root / name)
+    tmp_dir.rename(root / name)
+
+    dates = [row["date"] for row in rows]
+    manifest["chunks"].append({
+        "seq": seq,
+        "dir": name,
+        "rows": len(rows),
+        "min_date": min(dates),
+        "max_date": max(dates),
+        "destinations": sorted({(row.get("destination") or "").casefold() for row in rows}),
+        "columns": columns,
+    })
+    _store_manifest(root, manifest)
+    (root / "tail.jsonl").write_text("")
+    _store_tail_rows(root, 0)
+    return len(rows)
+
+
+def append_plan(result: Dict[str, Any], run_id: Optional[str] = None, path: str = PLAN_ARCHIVE) -> None:
+    """Append one finished plan; seals a chunk every CHUNK_ROWS plans."""
+    root = Path(path)
+    line = json.dumps(plan_record(result, run_id), separators=(",", ":")) + "\n"
+    with _locked(root):
+        rows = _tail_rows(root) + 1
+        with open(root / "tail.jsonl", "ab") as fh:
+            fh.write(line.encode("utf-8"))
+        _store_tail_rows(root, rows)
+        if rows >= CHUNK_ROWS:
+            _seal_locked(root)
+
+
+def seal(path: str = PLAN_ARCHIVE) -> int:
+    """Seal the current tail into a chunk now. Returns rows sealed."""
+    with _locked(Path(path)):
+        return _seal_locked(Path(path))
+
+
+# -------------------------
+# Reading
+# -------------------------
+
+def _read_column(chunk_dir: Path, col: str, chunk: Dict[str, Any]) -> List[Any]:
+    if col not in chunk["columns"]:
+        return [None] * chunk["rows"]
+    return json.loads(gzip.decompress((chunk_dir / f"{col}.json.gz").read_bytes()))
+
+
+def _as_date(value) -> Optional[str]:
+    if value is None:
+        return None
+    if isinstance(value, (dt.date, dt.datetime)):
+        return value.isoformat()[:10]
+    return str(value)[:10]
+
+
+def list_columns(path: str = PLAN_ARCHIVE) -> List[str]:
+    """Every column present in the archive."""
+    root = Path(path)
+    columns: List[str] = []
+    for chunk in _load_manifest(root)["chunks"]:
+        columns += [c for c in chunk["columns"] if c not in columns]
+    for row in _read_tail(root):
+        columns += [c for c in row if c not in columns]
+    return columns
+
+
+def scan(
+    columns: Optional[Sequence[str]] = None,
+    destination: Optional[str] = None,
+    since=None,
+    until=None,
+    path: str = PLAN_ARCHIVE,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Yield matching plans as {column: value} dicts, oldest first.
+    - columns: columns to return (default: everything except the itinerary text)
+    - destination: case-insensitive substring of the destination label
+    - since / until: inclusive date bounds ("YYYY-MM-DD" or date)
+    Only one chunk is held in memory at a time.
+    """
+    root = Path(path)
+    needle = destination.casefold() if destination else None
+    lo, hi = _as_date(since), _as_date(until)
+
+    def keep(dest: Optional[str], date: str) -> bool:
+        if needle and needle not in (dest or "").casefold():
+            return False
+        return (lo is None or date >= lo) and (hi is None or date <= hi)
+
+    manifest = _load_manifest(root)
+    for chunk in manifest["chunks"]:
+        if (lo and chunk["max_date"] < lo) or (hi and chunk["min_date"] > hi):
+            continue
+        if needle and not any(needle in d for d in chunk["destinations"]):
+            continue
+        chunk_dir = root / chunk["dir"]
+        dests = _read_column(chunk_dir, "destination", chunk)
+        dates = _read_column(chunk_dir, "date", chunk)
+        hits = [i for i in range(chunk["rows"]) if keep(dests[i], dates[i])]
+        if not hits:
+            continue
+        wanted = columns or [c for c in chunk["columns"] if c not in BLOB_COLUMNS]
+        data = {col: _read_column(chunk_dir, col, chunk) for col in wanted}
+        for i in hits:
+            yield {col: data[col][i] for col in wanted}
+
+    for row in _read_tail(root):
+        if keep(row.get("destination"), row["date"]):
+            wanted = columns or [c for c in row if c not in BLOB_COLUMNS]
+            yield {col: row.get(col) for col in wanted}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Plan archive")
+    parser.add_argument("--path", default=PLAN_ARCHIVE)
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    q = sub.add_parser("query", help="print matching plans as JSON lines")
+    q.add_argument("--destination")
+    q.add_argument("--since")
+    q.add_argument("--until")
+    q.add_argument("--columns", nargs="+")
+    sub.add_parser("columns", help="list archived columns")
+    sub.add_parser("seal", help="seal pending rows into a chunk")
+    args = parser.parse_args()
+
+    if args.cmd == "query":
+        for row in scan(args.columns, args.destination, args.since, args.until, path=args.path):
+            print(json.dumps(row, ensure_ascii=False))
+    elif args.cmd == "columns":
+        print("\n".join(list_columns(args.path)))
+    else:
+        print(f"sealed {seal(args.path)} rows")
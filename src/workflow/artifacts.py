@@ -0,0 +1,124 @@
+"""
+Content-addressed store for large node outputs.
+
+Functions:
+- put_artifact(obj) -> ref
+- get_artifact(ref) -> obj
+- artifact_refs(obj) -> set of references found in obj (e.g. a state dict)
+- touch_artifacts(refs) -> int
+- prune_artifacts(max_age_s) -> int
+
+Large payloads (routing matrices, raw forecasts) are kept out of TravelState:
+nodes store them here and put only the returned reference ("sha256:<hex>")
+in state. LangGraph then copies/validates a short string per transition
+instead of N×N matrices, identical payloads are stored once, and checkpoints
+and memo keys stay small. Consumers resolve references lazily, only when
+they actually need the data.
+
+Artifacts are gzip'd JSON files under ARTIFACT_DIR (default "artifacts/"),
+so references in checkpoints remain valid when a run is resumed in another
+process. Recently used artifacts are kept decoded in an in-process LRU.
+Pruning is by file age, so whoever keeps a reference alive (a checkpointed
+run that is resumed or shown again) touches its artifacts with
+touch_artifacts(artifact_refs(state)).
+"""
+
+import copy
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Iterable, Set
+
+ARTIFACT_DIR = Path(os.getenv("ARTIFACT_DIR", "artifacts"))
+LRU_ENTRIES = 64
+
+_lru: "OrderedDict[str, Any]" = OrderedDict()
+_lock = threading.Lock()
+
+
+def _path(ref: str) -> Path:
+    digest = ref.split(":", 1)[1]
+    return ARTIFACT_DIR / digest[:2] / f"{digest}.json.gz"
+
+
+def _remember(ref: str, obj: Any) -> None:
+    with _lock:
+        _lru[ref] = obj
+        _lru.move_to_end(ref)
+        while len(_lru) > LRU_ENTRIES:
+            _lru.popitem(last=False)
+
+
+def put_artifact(obj: Any) -> str:
+    """Store a JSON-serializable object; returns its content reference."""
+    blob = json.dumps(obj, sort_keys=True, separators=(",", ":")).encode("utf-8")
+    ref = "sha256:" + hashlib.sha256(blob).hexdigest()[:32]
+    path = _path(ref)
+    if not path.exists():
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp.write_bytes(gzip.compress(blob, compresslevel=5))
+        tmp.replace(path)
+    else:
+        os.utime(path)   # keep it alive for prune_artifacts
+    _remember(ref, obj)
+    return ref
+
+
+def get_artifact(ref: str) -> Any:
+    """
+    Resolve a reference. Returns a private copy, so callers may modify it
+    without affecting other readers.
+    """
+    with _lock:
+        obj = _lru.get(ref)
+        if obj is not None:
+            _lru.move_to_end(ref)
+    if obj is None:
+        path = _path(ref)
+        if not path.exists():
+            raise KeyError(f"artifact {ref} not found in {ARTIFACT_DIR}")
+        obj = json.loads(gzip.decompress(path.read_bytes()))
+        _remember(ref, obj)
+    return copy.deepcopy(obj)
+
+
+def artifact_refs(obj: Any) -> Set[str]:
+    """Every artifact reference in a nested structure of dicts/lists/strings."""
+    if isinstance(obj, str):
+        return {obj} if obj.startswith("sha256:") else set()
+    if isinstance(obj, dict):
+        obj = obj.values()
+    elif not isinstance(obj, (list, tuple)):
+        return set()
+    return set().union(*(artifact_refs(v) for v in obj))
+
+
+def touch_artifacts(refs: Iterable[str]) -> int:
+    """Mark artifacts as used now (prune_artifacts keeps them). Returns files touched."""
+    touched = 0
+    for ref in refs:
+        try:
+            os.utime(_path(ref))
+            touched += 1
+        except FileNotFoundError:
+            pass
+    return touched
+
+
+def prune_artifacts(max_age_s: float) -> int:
+    """Delete artifacts not stored within max_age_s. Returns files removed."""
+    if not ARTIFACT_DIR.exists():
+        return 0
+    cutoff = time.time() - max_age_s
+    removed = 0
+    for path in ARTIFACT_DIR.glob("*/*.json.gz"):
+        if path.stat().st_mtime < cutoff:
+            path.unlink(missing_ok=True)
+            removed += 1
+    return removed
@@ -0,0 +1,256 @@
+"""
+Benchmark: inline ("fat") vs reference-based ("slim") planning state.
+
+Runs a 6-node linear LangGraph (the shape of the travel graph) over
+synthetic node outputs in the shapes the nodes actually produce:
+
+- fat: the pre-artifact TravelState — the Nominatim top result as `raw`
+  (addressdetails=1, the fields the geocoder requested), the Open-Meteo
+  `daily` block, simplified Geoapify features and the routing matrix
+  (names plus four N×N matrices) inline.
+- slim: the current TravelState — GeoRecord, poi_to_dict places, and the
+  forecast and a compute_matrix_from_places matrix in the artifact store.
+
+Nodes build fresh payloads per run (as if just decoded from a provider
+response; each destination's differ, so every artifact is a new write) and
+the slim ones pay for the artifact store inside the transition, like the
+real nodes: put_artifact (sha256, gzip, file write) in weather and routing,
+get_artifact in budget and itinerary. "slim_cold" resolves every reference
+from disk (a resumed run, another process) instead of the in-process LRU.
+Artifacts go to a temporary directory. The graph is checkpointed, like the
+CLI's SqliteSaver runs. Reports per-transition overhead and retained memory
+of the final states.
+
+    python -m src.workflow.bench_state [--runs 200] [--pois 5]
+
+Functions:
+- fake_outputs(n_pois) -> dict
+- build_bench_graph(shape, outputs) -> compiled graph
+- bench(runs=200, n_pois=5) -> dict
+"""
+
+import argparse
+import copy
+import random
+import tempfile
+import time
+import tracemalloc
+import zlib
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from langgraph.checkpoint.memory import MemorySaver
+from langgraph.graph import StateGraph, END
+from pydantic import BaseModel
+
+from src.agents.budget_agent import budget_agent_run
+from src.tools.poi import POI, poi_to_dict
+from src.tools.routing_matrix import compute_matrix_from_places
+from src.workflow import artifacts
+from src.workflow.artifacts import put_artifact
+from src.workflow.state import TravelState, routing_matrix, weather_forecast
+
+NODES = ("geocode", "weather", "places", "routing", "budget", "itinerary")
+GROUPS = ("attractions", "beaches", "food")
+
+
+class FatState(BaseModel):
+    # The pre-artifact TravelState: every payload inline, untyped
+    destination: Optional[str] = None
+    days: int = 5
+    persons: int = 1
+    budget_inr: int = 30000
+    budget_tier: str = "mid"
+    geocode: Optional[dict] = None
+    weather: Optional[dict] = None
+    places: Optional[dict] = None
+    routing: Optional[dict] = None
+    budget: Optional[dict] = None
+    itinerary: Optional[dict] = None
+
+
+def fake_outputs(n_pois: int = 5) -> Dict[str, Any]:
+    """Node outputs of one plan in the fat and slim shapes (n_pois: routed POIs, 5 by default)."""
+    rnd = random.Random(0)
+    daily = {
+        "time": [f"2026-01-{d:02d}" for d in range(1, 8)],
+        **{k: [round(rnd.uniform(0, 40), 1) for _ in range(7)]
+           for k in ("temperature_2m_max", "temperature_2m_min", "precipitation_sum")},
+    }
+    raw = {
+        "place_id": 123456, "licence": "Data © OpenStreetMap contributors, ODbL 1.0. http://osm.org/copyright",
+        "osm_type": "relation", "osm_id": 987654, "lat": "15.3", "lon": "74.1",
+        "class": "boundary", "type": "administrative", "place_rank": 8, "importance": 0.71,
+        "addresstype": "state", "name": "Goa", "display_name": "Goa, India",
+        "address": {"state": "Goa", "ISO3166-2-lvl4": "IN-GA", "country": "India", "country_code": "in"},
+        "boundingbox": ["14.9", "15.8", "73.6", "74.3"],
+    }
+    pois = [
+        POI(f"{g}-{i}", f"{g.title()} place {i}", 15.3 + rnd.random() / 10, 74.1 + rnd.random() / 10,
+            groups=(g,), formatted=f"{g.title()} place {i}, Road {i}, Goa 403001, India")
+        for g in GROUPS for i in range(3)
+    ]
+    features = {g: [{"name": p.name, "lat": p.lat, "lon": p.lon, "formatted": p.formatted,
+                     "categories": ["tourism.sights", "building.historic"], "place_id": p.id}
+                    for p in pois if p.groups == (g,)] for g in GROUPS}
+    routed = (pois * 2)[:n_pois]
+    matrix = compute_matrix_from_places(routed, method="approx")
+    budget = budget_agent_run({"destination": "Goa", "days": 5, "budget_inr": 30000, "transport_total_km": 42.0})
+    geo = {"place": "Goa", "lat": 15.3, "lon": 74.1, "display_name": "Goa, India"}
+    return {
+        "fat": {
+            "geocode": {**geo, "raw": raw},
+            "weather": {"place": "Goa", "lat": 15.3, "lon": 74.1, "forecast": daily},
+            "places": features,
+            "routing": {k: matrix[k] for k in ("names", "distance_m", "duration_s",
+                                               "distance_readable", "duration_readable")},
+        },
+        "slim": {
+            "geocode": geo,
+            "weather": {"place": "Goa", "lat": 15.3, "lon": 74.1, "forecast": daily},
+            "places": {g: [poi_to_dict(p) for p in pois if p.groups == (g,)] for g in GROUPS},
+            "routing": matrix,
+        },
+        "budget": budget,
+        "itinerary": "## Day 1 — Goa\n" + "Morning: fort walk, afternoon: beach, evening: dinner.\n" * 60,
+    }
+
+
+def _fresh(obj: Any, destination: str) -> Any:
+    """A new copy of a payload, numerically different per destination."""
+    obj = copy.deepcopy(obj)
+    salt = zlib.crc32(destination.encode()) % 997 / 1000
+    if "temperature_2m_max" in obj:
+        obj["temperature_2m_max"][0] += salt
+    if "duration_s" in obj and len(obj["duration_s"]) > 1:
+        obj["duration_s"][0][1] += salt
+    return obj
+
+
+def _fat_nodes(out: Dict[str, Any]):
+    fat = out["fat"]
+
+    def weather(state):
+        return {"weather": {**fat["weather"], "forecast": _fresh(fat["weather"]["forecast"], state.destination)}}
+
+    def budget(state):
+        dist = state.routing["distance_m"]
+        km = sum(dist[i][j] for i in range(len(dist)) for j in range(i + 1, len(dist))) / 1000
+        return {"budget": {**copy.deepcopy(out["budget"]), "transport_km": km}}
+
+    def itinerary(state):
+        hints = (state.weather["forecast"]["temperature_2m_max"][:2], state.routing["duration_readable"][:3])
+        return {"itinerary": {"text": out["itinerary"] + str(hints)}}
+
+    return {
+        "geocode": lambda state: {"geocode": copy.deepcopy(fat["geocode"])},
+        "weather": weather,
+        "places": lambda state: {"places": copy.deepcopy(fat["places"])},
+        "routing": lambda state: {"routing": _fresh(fat["routing"], state.destination)},
+        "budget": budget,
+        "itinerary": itinerary,
+    }
+
+
+def _slim_nodes(out: Dict[str, Any], cold: bool = False):
+    slim = out["slim"]
+
+    def resolve(resolver, record):
+        if cold:
+            artifacts._lru.clear()
+        return resolver(record)
+
+    def weather(state):
+        record = {k: v for k, v in slim["weather"].items() if k != "forecast"}
+        return {"weather": {**record, "forecast_ref": put_artifact(_fresh(slim["weather"]["forecast"], state.destination))}}
+
+    def routing(state):
+        matrix = _fresh(slim["routing"], state.destination)
+        return {"routing": {"names": matrix["names"], "approximate": matrix["approximate"],
+                            "matrix_ref": put_artifact(matrix)}}
+
+    def budget(state):
+        dist = resolve(routing_matrix, state.routing)["distance_m"]
+        km = sum(dist[i][j] for i in range(len(dist)) for j in range(i + 1, len(dist))) / 1000
+        return {"budget": {**copy.deepcopy(out["budget"]), "transport_km": km}}
+
+    def itinerary(state):
+        hints = (resolve(weather_forecast, state.weather)["temperature_2m_max"][:2],
+                 resolve(routing_matrix, state.routing)["duration_readable"][:3])
+        return {"itinerary": out["itinerary"] + str(hints)}
+
+    return {
+        "geocode": lambda state: {"geocode": copy.deepcopy(slim["geocode"])},
+        "weather": weather,
+        "places": lambda state: {"places": copy.deepcopy(slim["places"])},
+        "routing": routing,
+        "budget": budget,
+        "itinerary": itinerary,
+    }
+
+
+def build_bench_graph(shape: str, outputs: Dict[str, Any]):
+    """Linear graph over the fat ("fat") or slim ("slim", "slim_cold") node outputs."""
+    state_cls = FatState if shape == "fat" else TravelState
+    nodes = _fat_nodes(outputs) if shape == "fat" else _slim_nodes(outputs, cold=shape == "slim_cold")
+    graph = StateGraph(state_cls)
+    for name in NODES:
+        graph.add_node(name, nodes[name])
+    graph.set_entry_point(NODES[0])
+    for a, b in zip(NODES, NODES[1:]):
+        graph.add_edge(a, b)
+    graph.add_edge(NODES[-1], END)
+    return graph.compile(checkpointer=MemorySaver())
+
+
+def _invoke(app, state_cls, run_id: str):
+    return app.invoke(state_cls(destination=f"Goa {run_id}"), {"configurable": {"thread_id": run_id}})
+
+
+def _run(app, state_cls, runs: int):
+    start = time.perf_counter()
+    for i in range(runs):
+        _invoke(app, state_cls, f"t{i}")
+    per_transition = (time.perf_counter() - start) / (runs * len(NODES))
+
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    finals = [_invoke(app, state_cls, f"m{i}") for i in range(runs)]
+    retained = tracemalloc.get_traced_memory()[0] - base
+    tracemalloc.stop()
+    del finals
+    return per_transition, retained / runs
+
+
+def bench(runs: int = 200, n_pois: int = 5) -> Dict[str, Any]:
+    results = {}
+    saved_dir = artifacts.ARTIFACT_DIR
+    with tempfile.TemporaryDirectory(prefix="bench-artifacts-") as tmp:
+        artifacts.ARTIFACT_DIR = Path(tmp)
+        try:
+            out = fake_outputs(n_pois)
+            for shape in ("fat", "slim", "slim_cold"):
+                state_cls = FatState if shape == "fat" else TravelState
+                app = build_bench_graph(shape, out)
+                _invoke(app, state_cls, "warmup")
+                per_transition, per_state = _run(app, state_cls, runs)
+                results[shape] = {"transition_us": per_transition * 1e6, "state_kb": per_state / 1024}
+        finally:
+            artifacts.ARTIFACT_DIR = saved_dir
+            artifacts._lru.clear()
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fat vs slim TravelState benchmark")
+    parser.add_argument("--runs", type=int, default=200)
+    parser.add_argument("--pois", type=int, default=5, help="routing matrix size N (the graph routes 5 POIs)")
+    args = parser.parse_args()
+
+    res = bench(args.runs, args.pois)
+    for label in ("fat", "slim", "slim_cold"):
+        r = res[label]
+        print(f"{label:9s}  {r['transition_us']:8.1f} µs/transition  {r['state_kb']:8.1f} KiB/final state")
+    for label in ("slim", "slim_cold"):
+        print(f"{label} vs fat: transitions x{res['fat']['transition_us'] / res[label]['transition_us']:.2f} "
+              f"as fast, final state x{res['fat']['state_kb'] / max(res[label]['state_kb'], 1e-9):.2f} as small")
@@ -0,0 +1,125 @@
+"""
+Persistent per-run checkpoints for the travel graph.
+
+Functions:
+- open_checkpointer(path=CHECKPOINT_DB, retention_s=RETENTION_S) -> SqliteSaver
+- new_run_id() -> str
+- run_config(run_id) -> dict
+- invoke_resumable(app, state, run_id, saver) -> dict
+- prune_checkpoints(saver, retention_s=RETENTION_S) -> int
+
+Uses LangGraph's checkpointer interface with the local SQLite backend. The
+run id is the LangGraph thread id: TravelState is checkpointed after every
+node, so re-invoking a failed or interrupted run only executes the nodes that
+had not completed yet (e.g. just `itinerary` after a Groq timeout).
+
+Runs older than the retention window are deleted when the checkpointer is
+opened, together with artifacts (src.workflow.artifacts) that no run has
+stored or used within the same window: invoking a run touches it and the
+artifacts its checkpoint references, so a run kept alive by being shown
+again or resumed keeps its forecast and matrix too. Finished runs are
+compacted down to their final checkpoint.
+"""
+
+import os
+import sqlite3
+import time
+import uuid
+from typing import Any, Dict
+
+from langgraph.checkpoint.sqlite import SqliteSaver
+
+from src.tools.deadline import deadline
+from src.workflow.artifacts import artifact_refs, prune_artifacts, touch_artifacts
+
+CHECKPOINT_DB = os.getenv("CHECKPOINT_DB", "checkpoints.sqlite")
+RETENTION_S = 7 * 24 * 3600
+
+
+def open_checkpointer(path: str = CHECKPOINT_DB, retention_s: float = RETENTION_S) -> SqliteSaver:
+    """Open (or create) the checkpoint database and prune expired runs."""
+    conn = sqlite3.connect(path, check_same_thread=False)
+    saver = SqliteSaver(conn)
+    saver.setup()
+    with saver.lock, conn:
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS runs (thread_id TEXT PRIMARY KEY, updated_at REAL NOT NULL)"
+        )
+    prune_checkpoints(saver, retention_s)
+    return saver
+
+
+def new_run_id() -> str:
+    return uuid.uuid4().hex[:12]
+
+
+def run_config(run_id: str) -> Dict[str, Any]:
+    return {"configurable": {"thread_id": run_id}}
+
+
+def _touch_run(saver: SqliteSaver, run_id: str) -> None:
+    with saver.lock, saver.conn:
+        saver.conn.execute(
+            "INSERT INTO runs (thread_id, updated_at) VALUES (?, ?) "
+            "ON CONFLICT(thread_id) DO UPDATE SET updated_at = excluded.updated_at",
+            (run_id, time.time()),
+        )
+
+
+def prune_checkpoints(saver: SqliteSaver, retention_s: float = RETENTION_S) -> int:
+    """Delete every run not touched within retention_s. Returns runs removed."""
+    cutoff = time.time() - retention_s
+    with saver.lock:
+        rows = saver.conn.execute(
+            "SELECT thread_id FROM runs WHERE updated_at < ?", (cutoff,)
+        ).fetchall()
+    for (thread_id,) in rows:
+        saver.delete_thread(thread_id)
+        with saver.lock, saver.conn:
+            saver.conn.execute("DELETE FROM runs WHERE thread_id = ?", (thread_id,))
+    prune_artifacts(retention_s)
+    return len(rows)
+
+
+def _compact_run(saver: SqliteSaver, run_id: str) -> None:
+    """Keep only the latest checkpoint of a finished run."""
+    latest = saver.get_tuple(run_config(run_id))
+    if latest is None:
+        return
+    keep = latest.config["configurable"]["checkpoint_id"]
+    with saver.lock, saver.conn:
+        saver.conn.execute(
+            "DELETE FROM checkpoints WHERE thread_id = ? AND checkpoint_id != ?", (run_id, keep)
+        )
+        saver.conn.execute(
+            "DELETE FROM writes WHERE thread_id = ? AND checkpoint_id != ?", (run_id, keep)
+        )
+
+
+def invoke_resumable(app, state, run_id: str, saver: SqliteSaver) -> Dict[str, Any]:
+    """
+    Run the graph under a run id.
+    - new run: start from `state`
+    - interrupted/failed run: resume from the last completed node (state is ignored)
+    - finished run: return the stored result without re-executing anything
+    The run gets the plan's sla_s as its deadline (a resumed run starts a
+    fresh one).
+    """
+    config = run_config(run_id)
+    _touch_run(saver, run_id)
+
+    snapshot = app.get_state(config)
+    touch_artifacts(artifact_refs(snapshot.values))
+    if snapshot.next:
+        print(f"[run {run_id}] resuming at: {', '.join(snapshot.next)}")
+        with deadline(snapshot.values.get("sla_s")):
+            result = app.invoke(None, config)
+    elif snapshot.values:
+        print(f"[run {run_id}] already finished; returning stored result")
+        return snapshot.values
+    else:
+        with deadline(getattr(state, "sla_s", None)):
+            result = app.invoke(state, config)
+
+    _compact_run(saver, run_id)
+    return result
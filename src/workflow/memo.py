@@ -0,0 +1,147 @@
+"""
+Dependency-aware memoization of graph node outputs.
+
+Every node declares the state fields it reads (NODE_INPUTS) and the field it
+writes (NODE_OUTPUTS). Outputs are cached under a hash of the node name and
+the actual values of its inputs, so a re-plan that only changes days /
+persons / budget reuses geocode, weather, places and routing and re-executes
+just budget and itinerary; adding or removing a POI re-executes routing
+incrementally (src.tools.routing_matrix.update_matrix).
+
+Functions:
+- memoize_node(name, fn) -> callable
+- replan(app, previous, config=None, **changes) -> dict
+- clear_memo() -> None
+
+Nodes served from the memo are reported in the state's `skipped_nodes`.
+Outputs backed by an expiring provider cache (weather, places, routing)
+are only reused for that cache's TTL (NODE_TTL_S): a long-lived process
+(--interactive, --batch) fetches them again once the provider's data would
+be refreshed.
+Degraded outputs are passed through but never memoized: updates carrying
+"cuts" (deadline) or "degraded" (fallbacks and stale data, with or without
+a deadline, e.g. an expired forecast while Open-Meteo is down), so a
+re-plan after the provider recovers computes the real result. Per-run
+records of a node's work (PASS_THROUGH: cuts, degraded, llm_calls, the
+deadline start) are passed along when the node runs and not replayed on a
+memo hit.
+"""
+
+import copy
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from typing import Any, Dict, Optional, Tuple
+
+from pydantic import BaseModel
+
+from src.tools.deadline import deadline
+from src.tools.places import PLACES_CACHE
+from src.tools.routing_matrix import ROUTE_CACHE
+from src.tools.weather import WEATHER_CACHE
+
+# State fields each node reads
+NODE_INPUTS = {
+    "geocode": ("destination",),
+    "weather": ("geocode",),
+    "places": ("geocode",),
+    "routing": ("places", "extra_pois", "excluded_pois"),
+    "budget": ("destination", "days", "persons", "budget_inr", "budget_tier", "routing", "cities"),
+    "itinerary": ("days", "itinerary_mode", "budget", "weather", "places", "routing", "cities"),
+}
+
+# State field each node writes (defaults to the node name)
+NODE_OUTPUTS: Dict[str, str] = {}
+
+# Seconds a node's output may be reused: the TTL of the cache behind it
+NODE_TTL_S = {
+    "weather": WEATHER_CACHE.ttl_s,
+    "places": PLACES_CACHE.ttl_s,
+    "routing": ROUTE_CACHE.ttl_s,
+}
+
+# User-editable fields carried over by replan()
+PLAN_INPUTS = ("destination", "days", "persons", "budget_inr", "budget_tier", "destinations", "itinerary_mode",
+               "extra_pois", "excluded_pois", "sla_s")
+
+# Update fields describing one execution of a node, not its output
+PASS_THROUGH = ("cuts", "degraded", "llm_calls", "deadline_started_at")
+
+MEMO_MAX_ENTRIES = 256
+
+# key -> (time.monotonic() stored, output)
+_memo: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+_lock = threading.Lock()
+
+
+def _memo_key(name: str, inputs: Dict[str, Any]) -> str:
+    blob = json.dumps([name, inputs], sort_keys=True, default=str)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+def clear_memo() -> None:
+    with _lock:
+        _memo.clear()
+
+
+def memoize_node(name: str, fn):
+    """
+    Wrap a node function so it is skipped when its inputs are unchanged.
+    The wrapped node always returns a partial update {output_field: value}
+    (plus any PASS_THROUGH fields the node returned).
+    """
+    inputs = NODE_INPUTS[name]
+    output = NODE_OUTPUTS.get(name, name)
+
+    @wraps(fn)
+    def wrapper(state):
+        key = _memo_key(name, {f: getattr(state, f, None) for f in inputs})
+
+        ttl_s = NODE_TTL_S.get(name)
+        with _lock:
+            hit = key in _memo
+            if hit and ttl_s is not None and time.monotonic() - _memo[key][0] > ttl_s:
+                del _memo[key]
+                hit = False
+            if hit:
+                _memo.move_to_end(key)
+                value = copy.deepcopy(_memo[key][1])
+        if hit:
+            return {output: value, "skipped_nodes": [name]}
+
+        result = fn(state)
+        value = getattr(result, output) if isinstance(result, BaseModel) else result[output]
+        extra = {} if isinstance(result, BaseModel) else {f: result[f] for f in PASS_THROUGH if result.get(f)}
+        if extra.get("cuts") or extra.get("degraded"):
+            return {output: value, **extra}
+
+        with _lock:
+            _memo[key] = (time.monotonic(), copy.deepcopy(value))
+            while len(_memo) > MEMO_MAX_ENTRIES:
+                _memo.popitem(last=False)
+        return {output: value, **extra}
+
+    return wrapper
+
+
+def replan(app, previous: Dict[str, Any], config: Optional[Dict[str, Any]] = None, **changes) -> Dict[str, Any]:
+    """
+    Re-run a finished plan with some inputs changed, e.g.
+        replan(app, result, days=6, budget_tier="budget")
+    Only nodes whose inputs changed are executed; see result["skipped_nodes"].
+    The previous routing record is passed along, so a changed POI selection
+    (extra_pois / excluded_pois) only routes the added POIs.
+    """
+    unknown = set(changes) - set(PLAN_INPUTS)
+    if unknown:
+        raise ValueError(f"cannot re-plan on {sorted(unknown)}; editable fields: {PLAN_INPUTS}")
+
+    state_cls = app.builder.state_schema
+    state = state_cls(**{**{k: previous[k] for k in PLAN_INPUTS if previous.get(k) is not None}, **changes})
+    if "routing" in state_cls.model_fields:
+        state.routing = previous.get("routing")
+    with deadline(getattr(state, "sla_s", None)):
+        return app.invoke(state, config)
@@ -0,0 +1,129 @@
+"""
+Multi-city trips (e.g. Hanoi → Hoi An → Ho Chi Minh City).
+
+When TravelState.destinations is set, the graph entry fans out one
+geocode → weather → places → routing sub-pipeline per city with LangGraph's
+map-reduce `Send` API. The city tasks run concurrently in one superstep, so
+latency tracks the slowest city; their results are collected into
+TravelState.cities and a single budget pass and itinerary generation run
+over the combined results.
+
+Functions:
+- split_days(days, n) -> list
+- fan_out(state) -> "geocode" | list[Send]
+- city_node(state: CityState) -> dict
+"""
+
+import operator
+import time
+from typing import Annotated, Any, Dict, List, Optional
+
+from langgraph.graph import StateGraph, END
+from langgraph.types import Send
+from pydantic import BaseModel
+
+from src.tools.deadline import remaining, start_deadline, within
+from src.tools.geocode import geocode_many
+from src.tools.weather import get_weather_forecasts
+from src.workflow.memo import memoize_node
+from src.workflow.timing import deadline_node, timed_node
+from src.workflow.state import GeoRecord, WeatherRecord, RoutingRecord, _earliest
+from src.workflow.nodes.geocode_node import geocode_fallback, geocode_node
+from src.workflow.nodes.weather_node import weather_node, weather_fallback
+from src.workflow.nodes.places_node import places_node, places_fallback
+from src.workflow.nodes.routing_node import routing_node, routing_fallback
+
+
+class CityState(BaseModel):
+    # Position in the trip, so results can be put back in order
+    index: int = 0
+    destination: str
+    days: int = 1
+    # The trip's deadline, for runs that don't enter one (see src.workflow.timing)
+    sla_s: Optional[float] = None
+    deadline_started_at: Annotated[Optional[float], _earliest] = None
+
+    geocode: Optional[GeoRecord] = None
+    weather: Optional[WeatherRecord] = None
+    places: Optional[Dict[str, List[Dict[str, Any]]]] = None
+    routing: Optional[RoutingRecord] = None
+
+    skipped_nodes: Annotated[List[str], operator.add] = []
+    node_timings: Annotated[Dict[str, float], operator.or_] = {}
+    cuts: Annotated[List[Dict[str, Any]], operator.add] = []
+    degraded: Annotated[List[str], operator.add] = []
+
+
+def build_city_graph():
+    """Sequential per-city sub-pipeline (same nodes as the single-city graph)."""
+    graph = StateGraph(CityState)
+
+    def node(name, fn, fallback=None):
+        return timed_node(name, memoize_node(name, deadline_node(name, fn, fallback)))
+
+    graph.add_node("geocode", node("geocode", geocode_node, geocode_fallback))
+    graph.add_node("weather", node("weather", weather_node, weather_fallback))
+    graph.add_node("places", node("places", places_node, places_fallback))
+    graph.add_node("routing", node("routing", routing_node, routing_fallback))
+    graph.set_entry_point("geocode")
+    # A city whose geocode was cut ends here (no coordinates to work with)
+    graph.add_conditional_edges("geocode", lambda s: "weather" if s.geocode else END, ["weather", END])
+    graph.add_edge("weather", "places")
+    graph.add_edge("places", "routing")
+    graph.add_edge("routing", END)
+    return graph.compile()
+
+
+city_app = build_city_graph()
+
+
+def split_days(days: int, n: int) -> List[int]:
+    """Spread trip days over n cities, earlier cities get the remainder (min 1 each)."""
+    base, extra = divmod(max(days, n), n)
+    return [base + (1 if i < extra else 0) for i in range(n)]
+
+
+def fan_out(state):
+    """Graph entry: single destination → "geocode"; several → one Send per city."""
+    if not state.destinations:
+        return "geocode"
+    # The trip's deadline starts here when the caller didn't enter one
+    started_at = None
+    if state.sla_s is not None and remaining() is None:
+        started_at = state.deadline_started_at or time.time()
+    # Geocode every stop once, up front (deduplicated, rate-paced), and fetch
+    # all their forecasts in one Open-Meteo request; the city sub-pipelines
+    # then hit the geocode and weather caches
+    with within(start_deadline(state.sla_s, started_at) if started_at else None):
+        geos = [g for g in geocode_many(state.destinations) if g]
+        get_weather_forecasts([(g["lat"], g["lon"]) for g in geos])
+    days = split_days(state.days, len(state.destinations))
+    return [
+        Send("city", CityState(index=i, destination=dest, days=days[i], sla_s=state.sla_s,
+                               deadline_started_at=started_at))
+        for i, dest in enumerate(state.destinations)
+    ]
+
+
+def city_node(state: CityState) -> Dict[str, Any]:
+    """Run one city's sub-pipeline and append its results to TravelState.cities."""
+    result = city_app.invoke(state)
+    city = {
+        "index": state.index,
+        "destination": state.destination,
+        "days": state.days,
+        "geocode": result.get("geocode"),
+        "weather": result.get("weather"),
+        "places": result.get("places"),
+        "routing": result.get("routing"),
+    }
+    skipped = [f"{state.destination}:{name}" for name in result.get("skipped_nodes", [])]
+    timings = {f"{state.destination}:{name}": s for name, s in result.get("node_timings", {}).items()}
+    cuts = [{**c, "stage": f"{state.destination}:{c['stage']}"} for c in result.get("cuts", [])]
+    degraded = [f"{state.destination}:{name}" for name in result.get("degraded", [])]
+    return {"cities": [city], "skipped_nodes": skipped, "node_timings": timings, "cuts": cuts,
+            "degraded": degraded}
+
+
+def ordered_cities(state) -> List[Dict[str, Any]]:
+    return sorted(state.cities or [], key=lambda c: c["index"])
@@ -1,10 +1,28 @@
 
 from src.agents.budget_agent import budget_agent_run
+from src.tools.poi_index import haversine_m
+from src.tools.routing_matrix import SPEED_PROFILES
+from src.workflow.multi_city import ordered_cities
+from src.workflow.state import routing_matrix
+
+def _routing_km(routing):
+    """Total local distance: sum of the upper triangle of the distance matrix (km)."""
+    matrix = routing_matrix(routing)
+    if "distance_m" not in matrix:
+        return 0
+    dist_matrix = matrix["distance_m"]
+    total = 0
+    for i in range(len(dist_matrix)):
+        for j in range(i+1, len(dist_matrix[i])):
+            total += dist_matrix[i][j]
+    return total / 1000.0  # convert m → km
 
 def budget_node(state):
     """
     Node 5: Budget estimation using budget_agent_run.
     Works with LangGraph Pydantic TravelState.
+    Multi-city trips are budgeted once over all cities: local routing in
+    every city plus the road legs between consecutive cities.
     """
 
     # Access Pydantic fields directly
@@ -14,16 +32,19 @@ def budget_node(state):
     budget_inr = state.budget_inr
     budget_tier = state.budget_tier
 
-    # transport_total_km may or may not exist yet
-    transport_distance = 0
-    if state.routing and "distance_m" in state.routing:
-        # Example: total distance = sum of upper triangle
-        dist_matrix = state.routing["distance_m"]
-        total = 0
-        for i in range(len(dist_matrix)):
-            for j in range(i+1, len(dist_matrix[i])):
-                total += dist_matrix[i][j]
-        transport_distance = total / 1000.0  # convert m → km
+    cities = ordered_cities(state)
+    if cities:
+        destination = " → ".join(c["destination"] for c in cities)
+        transport_distance = sum(_routing_km(c["routing"]) for c in cities)
+        circuity = SPEED_PROFILES["driving"]["circuity"]
+        for a, b in zip(cities, cities[1:]):
+            ga, gb = a["geocode"], b["geocode"]
+            if not ga or not gb:
+                continue   # geocode cut under the deadline
+            transport_distance += haversine_m(ga["lat"], ga["lon"], gb["lat"], gb["lon"]) * circuity / 1000.0
+    else:
+        # transport_total_km may or may not exist yet
+        transport_distance = _routing_km(state.routing)
 
     request = {
         "destination": destination,
@@ -17,4 +17,19 @@ def geocode_node(state):
     if not geo:
         raise ValueError(f"Could not find geocode info for {destination}")
 
+    # Drop the raw Nominatim payload: nothing downstream reads it and it
+    # would otherwise be copied into every checkpoint.
+    geo = {k: v for k, v in geo.items() if k != "raw"}
+
     return {"geocode": geo}
+
+def geocode_fallback(state):
+    """
+    Deadline fallback: no coordinates. The graph then skips weather, places
+    and routing, and the plan ends with a budget and a template itinerary.
+    """
+    return {"geocode": None}
+
+def after_geocode(state) -> str:
+    """Next node: "weather", or straight to "budget" when geocoding was cut."""
+    return "weather" if state.geocode else "budget"
@@ -1,9 +1,210 @@
-from src.workflow.state import TravelState
-from src.agents.itinerary_agent import itinerary_agent_run
+import math
+import os
+
+from src.workflow.state import TravelState, routing_matrix, weather_forecast
+from src.agents.itinerary_agent import itinerary_agent_run, itinerary_agent_run_per_day
+from src.tools.circuit_breaker import OPEN, breaker_states
+from src.tools.deadline import record_cut, remaining
+from src.tools.itinerary import build_itinerary
+from src.tools.itinerary_cache import lookup, signature, store
+from src.tools.itinerary_template import render_itinerary
+from src.tools.llm_telemetry import collect_llm_calls
+from src.tools.poi import poi_from_dict
+from src.workflow.multi_city import ordered_cities
+
+# itinerary_mode="auto": trips this long are generated one day per completion
+PER_DAY_MIN_DAYS = 4
+
+# With less than this many seconds left in the plan deadline, the template
+# renderer is used instead of the LLM
+TEMPLATE_BELOW_S = 3.0
+
+def _routing_summary(routing: dict) -> dict:
+    # COMPRESS routing matrix
+    return {"summary": routing_matrix(routing).get("duration_readable", [])[:3]}
+
+def _weather(weather: dict) -> dict:
+    # Resolve the forecast reference for the prompt
+    return {**weather, "forecast": weather_forecast(weather)}
+
+def _day_weather(forecast: dict, day: int):
+    dates = forecast.get("time", [])
+    if day > len(dates):
+        return None
+    i = day - 1
+    return {
+        "date": dates[i],
+        "max": forecast.get("temperature_2m_max", [None] * day)[i],
+        "min": forecast.get("temperature_2m_min", [None] * day)[i],
+        "rain": forecast.get("precipitation_sum", [None] * day)[i],
+    }
+
+def _without(matrix: dict, skip: set) -> dict:
+    """The matrix restricted to the places not named in skip (same keys build_itinerary reads)."""
+    names = matrix.get("names") or []
+    keep = [i for i, n in enumerate(names) if n not in skip]
+    if len(keep) == len(names):
+        return matrix
+
+    def sub(square):
+        return [[square[i][j] for j in keep] for i in keep]
+
+    kept = {"names": [names[i] for i in keep], "duration_s": sub(matrix["duration_s"])}
+    if matrix.get("places"):
+        kept["places"] = [matrix["places"][i] for i in keep]
+    if matrix.get("modes"):
+        kept["modes"] = {m: {"duration_s": sub(mode["duration_s"])} for m, mode in matrix["modes"].items()}
+    return kept
+
+def _day_plans(destination: str, days: int, first_day: int, places: dict, routing: dict, weather: dict) -> list:
+    """
+    Per-day structure for one city: visits from build_itinerary over the
+    routing matrix (untimed top places if there is no matrix), the day's
+    forecast and a couple of food places. Food places routed with the sights
+    are left out of the visits. Day numbers start at first_day.
+    """
+    food = [p["name"] for p in places.get("food", []) if p.get("name")]
+    # Food places are lunch/dinner suggestions, not sights to visit
+    matrix = _without(routing_matrix(routing), set(food))
+    names = matrix.get("names") or []
+    if names and matrix.get("duration_s"):
+        per_day = max(1, math.ceil(len(names) / days))
+        pois = [poi_from_dict(p) for p in matrix["places"]] if matrix.get("places") else [{"name": n} for n in names]
+        schedule = [d["visits"] for d in build_itinerary(pois, matrix, places_per_day=per_day)]
+    else:
+        pool = [{"name": p["name"]} for g in ("attractions", "beaches") for p in places.get(g, []) if p.get("name")]
+        per_day = max(1, math.ceil(len(pool) / days))
+        schedule = [pool[i:i + per_day] for i in range(0, len(pool), per_day)]
+
+    # More scheduled days than trip days (drive-time limits): fold into the last day
+    if len(schedule) > days:
+        schedule = schedule[:days - 1] + [[v for d in schedule[days - 1:] for v in d]]
+
+    forecast = weather_forecast(weather)
+    plans = []
+    for i in range(days):
+        day = first_day + i
+        plans.append({
+            "day": day,
+            "destination": destination,
+            "weather": _day_weather(forecast, day),
+            "visits": schedule[i] if i < len(schedule) else [],
+            "food": [food[(2 * i + k) % len(food)] for k in range(min(2, len(food)))],
+        })
+    return plans
+
+def _all_day_plans(state: TravelState) -> list:
+    cities = ordered_cities(state) or [{
+        "destination": state.destination, "days": state.days,
+        "places": state.places or {}, "routing": state.routing, "weather": state.weather,
+    }]
+    day_plans, first_day = [], 1
+    for c in cities:
+        day_plans += _day_plans(c["destination"], c["days"], first_day, c["places"] or {}, c["routing"], c["weather"])
+        first_day += c["days"]
+    return day_plans
+
+def _llm_unavailable():
+    """Why the LLM should not be called for this plan (None if it can be)."""
+    if not os.getenv("GROQ_API_KEY"):
+        return "GROQ_API_KEY not set"
+    if breaker_states().get("groq", {}).get("state") == OPEN:
+        return "LLM circuit open"
+    left = remaining()
+    if left is not None and left < TEMPLATE_BELOW_S:
+        return f"{left:.1f}s left in the plan deadline"
+    return None
+
+def _signature(state: TravelState) -> dict:
+    cities = ordered_cities(state) or [{
+        "destination": state.destination, "geocode": state.geocode,
+        "places": state.places, "weather": state.weather,
+    }]
+    return signature(
+        [c["destination"] for c in cities], [c.get("geocode") for c in cities],
+        [c["places"] for c in cities], state.days, state.budget_tier,
+        [weather_forecast(c["weather"]) for c in cities],
+        persons=state.persons, mode="per_day" if _per_day(state) else "single",
+    )
+
+def _per_day(state: TravelState) -> bool:
+    if state.itinerary_mode == "auto":
+        return state.days >= PER_DAY_MIN_DAYS
+    return state.itinerary_mode == "per_day"
 
 def itinerary_node(state: TravelState) -> TravelState:
+    """
+    Node 6: write the itinerary. itinerary_mode picks a single completion,
+    one completion per day, or the template renderer (no LLM); the template
+    is also used whenever the LLM is unavailable or the deadline is near.
+    LLM itineraries are cached and reused for near-duplicate requests.
+    Telemetry of the LLM calls made goes to `llm_calls`.
+    """
+    with collect_llm_calls() as calls:
+        update = _itinerary(state)
+    return {**update, "llm_calls": list(calls)} if calls else update
+
+def _itinerary(state: TravelState) -> dict:
     if not state.budget:
         raise ValueError("Missing budget info in state")
+
+    if state.itinerary_mode == "template":
+        return {"itinerary": _template_itinerary(state)}
+
+    # Near-duplicate requests reuse a cached LLM itinerary (see src.tools.itinerary_cache)
+    sig = _signature(state)
+    hit = lookup(sig, state.budget, _all_day_plans(state))
+    if hit:
+        kind = "exact" if hit["exact"] else f"similar ({hit['similarity']:.2f})"
+        print(f"[itinerary] reusing a cached itinerary: {kind} match")
+        return {"itinerary": hit["itinerary"]}
+
+    # Template fast path when the LLM can't be used in time. Flagged as
+    # degraded (not just a deadline cut) so the memo never keeps it.
+    reason = _llm_unavailable()
+    if reason:
+        print(f"[warning] itinerary LLM skipped ({reason}); using the template itinerary")
+        record_cut("itinerary", f"template itinerary ({reason})")
+        return {"itinerary": _template_itinerary(state), "degraded": ["itinerary"]}
+
+    itinerary_text, degraded = _llm_itinerary(state)
+    if degraded:
+        return {"itinerary": itinerary_text, "degraded": ["itinerary"]}
+    store(sig, itinerary_text, state.budget)
+    return {"itinerary": itinerary_text}
+
+def _template_itinerary(state: TravelState) -> str:
+    places = None if ordered_cities(state) else state.places
+    return render_itinerary(state.budget, _all_day_plans(state), places)
+
+def _llm_itinerary(state: TravelState):
+    """(itinerary text, whether any part of it is a non-LLM fallback)."""
+    # Long trips: one bounded completion per day, generated concurrently
+    if _per_day(state):
+        data = {"budget": state.budget, "day_plans": _all_day_plans(state),
+                "places": None if ordered_cities(state) else state.places}
+        return itinerary_agent_run_per_day(data), data.get("degraded", False)
+
+    # Multi-city: one itinerary across all stops
+    cities = ordered_cities(state)
+    if cities:
+        data = {
+            "budget": state.budget,
+            "cities": [
+                {
+                    "destination": c["destination"],
+                    "days": c["days"],
+                    "weather": _weather(c["weather"]),
+                    "places": c["places"],
+                    "routing_summary": _routing_summary(c["routing"]),
+                }
+                for c in cities
+            ],
+            # For the template fallback (src.tools.itinerary_template)
+            "day_plans": _all_day_plans(state),
+        }
+        return itinerary_agent_run(data), data.get("degraded", False)
+
     if not state.weather:
         raise ValueError("Missing weather info in state")
     if not state.places:
@@ -11,20 +212,14 @@ def itinerary_node(state: TravelState) -> TravelState:
     if not state.routing:
         raise ValueError("Missing routing matrix in state")
 
-    # COMPRESS routing matrix
-    routing_small = {
-        "summary": state.routing.get("duration_readable", [])[:3]
-    }
+    routing_small = _routing_summary(state.routing)
 
     # Call LLM agent with compressed info
-    itinerary_text = itinerary_agent_run(
-        {
-            "budget": state.budget,
-            "weather": state.weather,
-            "places": state.places,
-            "routing_summary": routing_small,
-        }
-    )
-
-    state.itinerary = itinerary_text
-    return state
+    data = {
+        "budget": state.budget,
+        "weather": _weather(state.weather),
+        "places": state.places,
+        "routing_summary": routing_small,
+        "day_plans": _all_day_plans(state),
+    }
+    return itinerary_agent_run(data), data.get("degraded", False)
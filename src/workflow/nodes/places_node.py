@@ -1,6 +1,15 @@
-from src.tools.places import get_attractions, get_beaches, get_food
+from src.tools.deadline import remaining
+from src.tools.places import ATTRACTIONS, FOOD, iter_beaches, iter_places
+from src.tools.poi import poi_to_dict
+from src.tools.poi_index import dedupe_categories
 from src.workflow.state import TravelState
 
+# Distinct POIs kept per category (keeps prompts small)
+POIS_PER_GROUP = 3
+# Candidates streamed per category at most, and the time allowed for paging
+MAX_CANDIDATES = 60
+PLACES_BUDGET_S = 20.0
+
 def places_node(state: TravelState) -> TravelState:
     geo = state.geocode
     if not geo:
@@ -9,15 +18,27 @@ def places_node(state: TravelState) -> TravelState:
     lat = geo["lat"]
     lon = geo["lon"]
 
-    # Fetch full results
-    attractions = get_attractions(lat, lon)
-    beaches = get_beaches(lat, lon)
-    food = get_food(lat, lon)
+    # Stream each category page by page; all three first pages are requested
+    # at once, and later pages only if dedup still needs more candidates
+    left = remaining()
+    budget_s = PLACES_BUDGET_S if left is None else min(PLACES_BUDGET_S, left)
+    stream = {"max_pois": MAX_CANDIDATES, "time_budget_s": budget_s}
+    attractions = iter_places(lat, lon, ATTRACTIONS, 10000, **stream)
+    beaches = iter_beaches(lat, lon, **stream)
+    food = iter_places(lat, lon, FOOD, 8000, **stream)
 
+    # Merge the same landmark/beach returned under several categories (or as
+    # near-duplicate features) so it is routed and prompted only once.
     # KEEP ONLY TOP 3 EACH → to avoid token explosion
-    state.places = {
-        "attractions": attractions[:3],
-        "beaches": beaches[:3],
-        "food": food[:3],
-    }
+    groups = dedupe_categories({
+        "attractions": attractions,
+        "beaches": beaches,
+        "food": food,
+    }, limit=POIS_PER_GROUP)
+    # State holds the dict form (validated and checkpointed as JSON)
+    state.places = {group: [poi_to_dict(p) for p in pois] for group, pois in groups.items()}
     return state
+
+def places_fallback(state) -> dict:
+    """Deadline fallback: no POIs (routing and the itinerary cope with empty groups)."""
+    return {"places": {"attractions": [], "beaches": [], "food": []}}
@@ -1,9 +1,44 @@
-from src.tools.routing_matrix import compute_matrix_from_places
+from src.tools.poi import poi_from_dict
+from src.tools.routing_matrix import compute_matrix_from_places, update_matrix
+from src.workflow.artifacts import put_artifact
+from src.workflow.state import routing_matrix
+
+def _poi_key(p):
+    return (p.name, round(p.lat, 5), round(p.lon, 5))
+
+def _updated_matrix(previous, selected):
+    """
+    Bring the previous run's matrix up to date with `selected` (only the
+    added POIs, and legs estimated last time, are routed). None if it shares
+    no POI with the selection, or if it is a straight-line estimate
+    throughout (the deadline fallback's): that one is recomputed.
+    """
+    if not previous.get("places"):
+        return None
+    if previous.get("approximate") and "approx_cells" not in previous:
+        return None
+    wanted = {_poi_key(p) for p in selected}
+    have = [_poi_key(poi_from_dict(p)) for p in previous["places"]]
+    if not wanted.intersection(have):
+        return None
+    remove = [i for i, key in enumerate(have) if key not in wanted]
+    add = [p for p in selected if _poi_key(p) not in set(have)]
+    return update_matrix(previous, add=add, remove=remove)
 
 def routing_node(state):
     """
     Node 4: Build routing matrix from selected top places.
+    The matrix goes to the artifact store; state keeps a compact record.
+    If state already has a matrix (a re-plan that added or removed POIs), it
+    is updated incrementally instead of recomputed.
     """
+    return _routing(state, "osrm")
+
+def routing_fallback(state):
+    """Deadline fallback: straight-line estimate for the same POIs (no provider calls)."""
+    return _routing(state, "approx")
+
+def _routing(state, method):
     # Pydantic models don't have get(), so use attribute access
     places_data = state.places
 
@@ -14,43 +49,35 @@ def routing_node(state):
     beaches = places_data.get("beaches", [])
     food = places_data.get("food", [])
 
-    # Pick top 3 attractions + top 1 beach + top 1 food
-    selected = []
-
-    def convert_feature(f):
-        props = f.get("properties", {})
-        name = (
-            props.get("name")
-            or props.get("address_line1")
-            or "POI"
-        )
-        return {
-            "name": name,
-            "lat": props.get("lat"),
-            "lon": props.get("lon"),
-        }
-
-    for f in attractions[:3]:
-        selected.append(convert_feature(f))
-
-    if beaches:
-        selected.append(convert_feature(beaches[0]))
+    # Pick top 3 attractions + top 1 beach + top 1 food (POI records; the
+    # state keeps their dict form, or raw features from older checkpoints)
+    picked = attractions[:3] + beaches[:1] + food[:1]
 
-    if food:
-        selected.append(convert_feature(food[0]))
+    # Entries without coordinates can't be routed
+    selected = [p for p in map(poi_from_dict, picked) if p is not None]
 
-    # Remove invalid entries
-    selected = [p for p in selected if p["lat"] and p["lon"]]
+    # User edits: leave out excluded POIs, route the extra ones too
+    excluded = set(getattr(state, "excluded_pois", None) or [])
+    selected = [p for p in selected if p.name not in excluded]
+    for p in map(poi_from_dict, getattr(state, "extra_pois", None) or []):
+        if p is not None and p.name not in excluded and _poi_key(p) not in {_poi_key(q) for q in selected}:
+            selected.append(p)
 
     if not selected:
         # still keep routing key so next node doesn't break
-        state.routing = {
-            "names": [],
-            "duration_readable": [[]],
-        }
-        return state
+        return {"routing": {"names": [], "approximate": False, "matrix_ref": None}}
 
-    # Compute routing matrix
-    matrix = compute_matrix_from_places(selected)
-    state.routing = matrix
-    return state
+    # Compute routing matrix (incrementally when a previous one exists)
+    matrix = None
+    if method == "osrm":
+        matrix = _updated_matrix(routing_matrix(state.routing), selected)
+    matrix = matrix or compute_matrix_from_places(selected, method=method)
+    update = {
+        "routing": {
+            "names": matrix["names"],
+            "approximate": matrix.get("approximate", False),
+            "matrix_ref": put_artifact(matrix),
+        }
+    }
+    # Estimated legs (OSRM down or out of time): don't memoize, re-plans retry OSRM
+    return {**update, "degraded": ["routing"]} if update["routing"]["approximate"] else update
@@ -1,10 +1,16 @@
 
-from src.tools.weather import get_weather_forecast
+from src.tools.weather import WEATHER_CACHE, _cache_key, get_weather_forecasts
+from src.workflow.artifacts import put_artifact
 
 def weather_node(state):
     """
     Node 2: Fetch 7-day weather forecast using Open-Meteo.
     Works with LangGraph Pydantic state.
+    The daily forecast goes to the artifact store; state keeps a reference.
+    An expired cached forecast (Open-Meteo unavailable) is marked stale and
+    the update degraded, so it is not memoized.
+    Goes through the batched fetch, so a forecast a multi-city plan already
+    fetched for all stops at once (src.workflow.multi_city) is a cache hit.
     """
 
     geo = state.geocode   # Access via attribute
@@ -15,13 +21,30 @@ def weather_node(state):
     lon = geo["lon"]
     place = geo["place"]
 
-    forecast = get_weather_forecast(lat, lon)
+    forecast = get_weather_forecasts([(lat, lon)], strict=True)[0]
+    stale = bool(forecast.get("stale"))
 
-    return {
+    update = {
         "weather": {
             "place": place,
             "lat": lat,
             "lon": lon,
-            "forecast": forecast.get("daily", {})
+            "forecast_ref": put_artifact(forecast.get("daily", {})),
+            "stale": stale,
+        }
+    }
+    return {**update, "degraded": ["weather"]} if stale else update
+
+def weather_fallback(state):
+    """Deadline fallback: the cached forecast if there is one (even expired), else none."""
+    geo = state.geocode
+    cached = WEATHER_CACHE.get(_cache_key(geo["lat"], geo["lon"]), allow_stale=True)
+    return {
+        "weather": {
+            "place": geo["place"],
+            "lat": geo["lat"],
+            "lon": geo["lon"],
+            "forecast_ref": put_artifact(cached.get("daily", {})) if cached else None,
+            "stale": cached is not None,
         }
     }
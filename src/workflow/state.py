@@ -1,16 +1,100 @@
-from typing import Optional, Dict, Any
+"""
+Planning state shared by every node of the travel graph.
+
+TravelState only carries user inputs and compact typed records. Large
+payloads (the Open-Meteo forecast, routing matrices) live in the artifact
+store (src.workflow.artifacts) and are referenced by content hash; use
+weather_forecast() / routing_matrix() to resolve them when needed.
+"""
+
+import operator
+from typing import Optional, Dict, Any, List, Annotated
+from typing_extensions import NotRequired, TypedDict
 from pydantic import BaseModel
 
+from src.workflow.artifacts import get_artifact
+
+
+def _earliest(a: Optional[float], b: Optional[float]) -> Optional[float]:
+    return b if a is None else a if b is None else min(a, b)
+
+
+class GeoRecord(TypedDict):
+    place: str
+    lat: float
+    lon: float
+    display_name: Optional[str]
+
+
+class WeatherRecord(TypedDict):
+    place: str
+    lat: float
+    lon: float
+    forecast_ref: Optional[str]      # Open-Meteo "daily" block
+    stale: NotRequired[bool]         # expired cached forecast (provider unavailable)
+
+
+class RoutingRecord(TypedDict, total=False):
+    names: List[str]
+    approximate: bool
+    matrix_ref: Optional[str]        # full output of compute_matrix_from_places
+
+
 class TravelState(BaseModel):
+    # User input
     destination: Optional[str] = None
-    days: Optional[int] = 7
-    persons: Optional[int] = 1
-    budget_inr: Optional[int] = 30000
-    budget_tier: Optional[str] = "mid"
-
-    geocode: Optional[Dict[str, Any]] = None
-    weather: Optional[Dict[str, Any]] = None
-    places: Optional[Dict[str, Any]] = None
-    routing: Optional[Dict[str, Any]] = None
+    days: int = 5
+    persons: int = 1
+    budget_inr: int = 30000
+    budget_tier: str = "mid"
+    # Multi-city trip, in visiting order (overrides `destination`)
+    destinations: Optional[List[str]] = None
+    # "single" completion, "per_day" (concurrent, one per day), "template"
+    # (no LLM, see src.tools.itinerary_template) or "auto" (per_day for long
+    # trips; opt-in, since it multiplies the Groq calls per plan)
+    itinerary_mode: str = "single"
+    # POI edits on top of the automatic selection: {"name", "lat", "lon"} to
+    # route in addition, names to leave out
+    extra_pois: List[Dict[str, Any]] = []
+    excluded_pois: List[str] = []
+    # Time budget for the whole plan in seconds (see src.tools.deadline)
+    sla_s: Optional[float] = None
+    # time.time() the sla_s deadline started, when the graph started it
+    # itself (plain app.invoke; see src.workflow.timing.deadline_node)
+    deadline_started_at: Annotated[Optional[float], _earliest] = None
+
+    # Outputs from nodes
+    geocode: Optional[GeoRecord] = None
+    weather: Optional[WeatherRecord] = None
+    places: Optional[Dict[str, List[Dict[str, Any]]]] = None
+    routing: Optional[RoutingRecord] = None
     budget: Optional[Dict[str, Any]] = None
-    itinerary: Optional[Dict[str, Any]] = None
+    itinerary: Optional[str] = None
+    # Per-city geocode/weather/places/routing results (multi-city mode)
+    cities: Annotated[List[Dict[str, Any]], operator.add] = []
+
+    # Nodes whose output was reused from the memo (see src.workflow.memo)
+    skipped_nodes: Annotated[List[str], operator.add] = []
+    # Seconds spent per node (see src.workflow.timing)
+    node_timings: Annotated[Dict[str, float], operator.or_] = {}
+    # What was skipped or degraded to meet sla_s: {"stage", "cut", "at_s"}
+    cuts: Annotated[List[Dict[str, Any]], operator.add] = []
+    # Nodes whose output is a fallback or stale (provider down, deadline);
+    # never memoized, so a re-plan retries them
+    degraded: Annotated[List[str], operator.add] = []
+    # One record per LLM call: tokens, TTFT, latency, truncation (see src.tools.llm_telemetry)
+    llm_calls: Annotated[List[Dict[str, Any]], operator.add] = []
+
+
+def weather_forecast(weather: Optional[WeatherRecord]) -> Dict[str, Any]:
+    """Resolve a weather record's daily forecast ({} if unavailable)."""
+    if not weather or not weather.get("forecast_ref"):
+        return {}
+    return get_artifact(weather["forecast_ref"])
+
+
+def routing_matrix(routing: Optional[RoutingRecord]) -> Dict[str, Any]:
+    """Resolve a routing record's matrix ({} if no matrix was computed)."""
+    if not routing or not routing.get("matrix_ref"):
+        return {}
+    return get_artifact(routing["matrix_ref"])
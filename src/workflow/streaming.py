@@ -0,0 +1,167 @@
+"""
+Progressive run mode: node results as soon as they complete.
+
+Functions:
+- stream_run(app, state, run_id, saver) -> iterator of events
+- summarize(node, update) -> str
+- print_human(event) -> None
+- print_ndjson(event, out=sys.stdout) -> None
+
+stream_run() is the streaming counterpart of
+src.workflow.checkpoint.invoke_resumable (same new / resume / finished
+semantics). It drives the graph with `app.stream(..., stream_mode="updates")`
+and yields one event per completed node:
+
+    {"event": "start",  "run_id", "t": 0.0, "resumed_at": [...]}
+    {"event": "node",   "run_id", "t", "node", "summary", "update"}
+    {"event": "useful", "run_id", "t", "node"}        first user-facing result
+    {"event": "done",   "run_id", "t", "ttfu_s", "total_s", "result"}
+
+`t` is seconds since the run started. Time to first useful output (ttfu_s)
+is measured to the first node in USEFUL_NODES (weather, places, budget, …),
+since geocode alone tells the user nothing new. A plan's sla_s deadline
+applies as in invoke_resumable; degraded nodes carry their "cuts". print_human() renders events
+as a progressive console display; print_ndjson() writes one JSON object per
+line for batch and service consumers.
+"""
+
+import json
+import sys
+import time
+from typing import Any, Dict, Iterator
+
+from src.tools.deadline import start_deadline, within
+from src.tools.llm_telemetry import summarize_calls
+from src.workflow.checkpoint import _compact_run, _touch_run, run_config
+from src.workflow.state import routing_matrix, weather_forecast
+
+# Nodes whose output is worth showing to the user on its own
+USEFUL_NODES = ("weather", "places", "routing", "budget", "itinerary", "city")
+
+
+def _weather_line(weather: Dict[str, Any]) -> str:
+    daily = weather_forecast(weather)
+    days = list(zip(daily.get("time", []), daily.get("temperature_2m_max", []),
+                    daily.get("temperature_2m_min", []), daily.get("precipitation_sum", [])))
+    shown = ", ".join(f"{d[5:]} {hi:.0f}/{lo:.0f}°C {rain or 0:.0f}mm" for d, hi, lo, rain in days[:3])
+    more = f" (+{len(days) - 3} days)" if len(days) > 3 else ""
+    stale = " (stale forecast)" if weather.get("stale") else ""
+    return f"{weather.get('place')}: {shown or 'no forecast'}{more}{stale}"
+
+
+def _places_line(places: Dict[str, Any]) -> str:
+    return "; ".join(
+        f"{group}: {', '.join(p.get('name') or '?' for p in pois) or '-'}"
+        for group, pois in places.items()
+    )
+
+
+def summarize(node: str, update: Dict[str, Any]) -> str:
+    """One human-readable line for a node's partial update ('' if nothing to show)."""
+    if node == "geocode" and update.get("geocode"):
+        g = update["geocode"]
+        return f"{g.get('display_name') or g.get('place')} ({g['lat']:.3f}, {g['lon']:.3f})"
+    if node == "weather" and update.get("weather"):
+        return _weather_line(update["weather"])
+    if node == "places" and update.get("places"):
+        return _places_line(update["places"])
+    if node == "routing" and update.get("routing"):
+        routing = update["routing"]
+        if not routing.get("names"):
+            return "no routable POIs"
+        matrix = routing_matrix(routing)
+        legs = [t for i, row in enumerate(matrix.get("duration_s") or []) for j, t in enumerate(row) if i != j]
+        longest = f", longest leg {max(legs) / 60:.0f} min" if legs else ""
+        approx = " (approximate)" if routing.get("approximate") else ""
+        return f"{len(routing['names'])} POIs routed{longest}{approx}"
+    if node == "budget" and update.get("budget"):
+        budget = update["budget"]
+        assessment = budget.get("assessment") or {}
+        total = assessment.get("estimated_total") or (budget.get("breakdown") or {}).get("total_estimated")
+        verdict = "fits" if assessment.get("fits") else "over budget"
+        return f"estimated ₹{total:,.0f}, {verdict}" if isinstance(total, (int, float)) else verdict
+    if node == "itinerary" and update.get("itinerary"):
+        text = update["itinerary"]
+        calls = update.get("llm_calls")
+        if not calls:
+            return f"{len(text.split())} words"
+        llm = summarize_calls(calls)
+        return (f"{len(text.split())} words; {llm['calls']} LLM calls, "
+                f"{llm['completion_tokens']} tokens, TTFT p50 {llm['ttft_p50_s'] or 0:.2f}s")
+    if node == "city" and update.get("cities"):
+        city = update["cities"][0]
+        parts = [city["destination"]]
+        if city.get("weather"):
+            parts.append(_weather_line(city["weather"]))
+        if city.get("places"):
+            parts.append(_places_line(city["places"]))
+        return " | ".join(parts)
+    return ""
+
+
+def _with_cuts(line: str, update: Dict[str, Any]) -> str:
+    degraded = " [degraded]" if update.get("degraded") and not update.get("cuts") else ""
+    return line + "".join(f" [cut: {c['cut']}]" for c in update.get("cuts") or []) + degraded
+
+
+def stream_run(app, state, run_id: str, saver) -> Iterator[Dict[str, Any]]:
+    """
+    Run (or resume) the graph under run_id, yielding events as nodes finish.
+    A finished run yields start + done with the stored result.
+    """
+    config = run_config(run_id)
+    _touch_run(saver, run_id)
+    start = time.perf_counter()
+
+    def elapsed() -> float:
+        return round(time.perf_counter() - start, 3)
+
+    snapshot = app.get_state(config)
+    if snapshot.values and not snapshot.next:
+        yield {"event": "start", "run_id": run_id, "t": 0.0, "resumed_at": []}
+        yield {"event": "done", "run_id": run_id, "t": elapsed(), "ttfu_s": elapsed(),
+               "total_s": elapsed(), "result": snapshot.values}
+        return
+
+    resumed_at = list(snapshot.next)
+    yield {"event": "start", "run_id": run_id, "t": 0.0, "resumed_at": resumed_at}
+
+    ttfu = None
+    plan = start_deadline(snapshot.values.get("sla_s") if resumed_at else getattr(state, "sla_s", None))
+    steps = app.stream(None if resumed_at else state, config, stream_mode="updates")
+    while True:
+        # Only the graph's own steps run under the plan deadline, not the
+        # consumer's handling of the events in between
+        with within(plan):
+            chunk = next(steps, None)
+        if chunk is None:
+            break
+        for node, update in chunk.items():
+            if node.startswith("__") or not isinstance(update, dict):
+                continue
+            t = elapsed()
+            yield {"event": "node", "run_id": run_id, "t": t, "node": node,
+                   "summary": _with_cuts(summarize(node, update), update), "update": update}
+            if ttfu is None and node in USEFUL_NODES:
+                ttfu = t
+                yield {"event": "useful", "run_id": run_id, "t": t, "node": node}
+
+    _compact_run(saver, run_id)
+    total = elapsed()
+    yield {"event": "done", "run_id": run_id, "t": total, "ttfu_s": ttfu if ttfu is not None else total,
+           "total_s": total, "result": app.get_state(config).values}
+
+
+def print_human(event: Dict[str, Any]) -> None:
+    kind = event["event"]
+    if kind == "start" and event["resumed_at"]:
+        print(f"[run {event['run_id']}] resuming at: {', '.join(event['resumed_at'])}")
+    elif kind == "node":
+        print(f"[{event['t']:6.2f}s] {event['node']:<9} {event['summary']}")
+    elif kind == "done":
+        print(f"[stream] first useful output after {event['ttfu_s']:.2f}s, full plan after {event['total_s']:.2f}s")
+
+
+def print_ndjson(event: Dict[str, Any], out=sys.stdout) -> None:
+    out.write(json.dumps(event, ensure_ascii=False, default=str) + "\n")
+    out.flush()
@@ -0,0 +1,108 @@
+"""
+Per-node wall-clock timings and deadline stages.
+
+Functions:
+- timed_node(name, fn) -> callable
+- deadline_node(name, fn, fallback=None) -> callable
+
+The wrapped node adds {"node_timings": {name: seconds}} to its partial
+update; TravelState merges these into one dict per run (kept in
+checkpoints, so a resumed run still reports the nodes that ran earlier).
+Memo hits are timed too, so reused nodes show up with near-zero cost.
+
+deadline_node() runs a node inside its stage of the plan deadline
+(src.tools.deadline): KEEP_BACK[name] of the plan's budget is reserved for
+the nodes after it, so an early stage cannot eat the itinerary's time.
+Entry points that manage the deadline (invoke_resumable, stream_run,
+replan) enter it around the whole run; under a plain app.invoke the first
+node to run starts it from the state's sla_s and reports the start as
+deadline_started_at, which the later nodes continue from.
+Optional nodes come with a fallback (no provider calls) that replaces them
+when their stage has less than MIN_STAGE_S left or runs out mid-way. Cuts
+made by the node or its tools are added to its update as {"cuts": [...]},
+and a fallback's update is marked {"degraded": [name]}.
+"""
+
+import time
+from functools import wraps
+
+from pydantic import BaseModel
+
+from src.tools.deadline import DeadlineExceeded, record_cut, remaining, stage, start_deadline, within
+from src.workflow.memo import NODE_OUTPUTS
+
+# Share of the plan's time budget kept back for the stages after each node;
+# the itinerary (LLM calls) gets whatever is left at the end. Geocode is
+# mandatory (nothing else can start without it), so it may use all of it
+KEEP_BACK = {
+    "geocode": 0.0,
+    "weather": 0.70,
+    "places": 0.65,
+    "routing": 0.50,
+    "city": 0.50,
+    "budget": 0.45,
+    "itinerary": 0.0,
+}
+# Optional stages with less time than this left are skipped outright
+MIN_STAGE_S = 0.5
+
+
+def timed_node(name: str, fn):
+    """Wrap a node returning a partial-update dict so its run time is recorded."""
+
+    @wraps(fn)
+    def wrapper(state):
+        start = time.perf_counter()
+        update = fn(state)
+        elapsed = round(time.perf_counter() - start, 4)
+        return {**update, "node_timings": {**update.get("node_timings", {}), name: elapsed}}
+
+    return wrapper
+
+
+def deadline_node(name: str, fn, fallback=None):
+    """
+    Run a node within its deadline stage. With a fallback the node is
+    optional: fallback(state) stands in when time is short. Always returns
+    a partial-update dict.
+    """
+    output = NODE_OUTPUTS.get(name, name)
+
+    @wraps(fn)
+    def wrapper(state):
+        # No deadline entered by the caller: the plan's own, from the state
+        plan, started_at = None, None
+        sla_s = getattr(state, "sla_s", None)
+        if sla_s is not None and remaining() is None:
+            started_at = getattr(state, "deadline_started_at", None) or time.time()
+            plan = start_deadline(sla_s, started_at)
+        with within(plan):
+            update = run(state)
+        if plan is not None:
+            update = {**update, "deadline_started_at": started_at}
+        return update
+
+    def run(state):
+        fell_back = False
+        with stage(KEEP_BACK.get(name, 0.0)) as cuts:
+            left = remaining()
+            if fallback is not None and left is not None and left < MIN_STAGE_S:
+                record_cut(name, f"skipped ({left:.1f}s left)")
+                update, fell_back = fallback(state), True
+            else:
+                try:
+                    update = fn(state)
+                except DeadlineExceeded as e:
+                    if fallback is None:
+                        raise
+                    record_cut(name, f"fallback after deadline ({e})")
+                    update, fell_back = fallback(state), True
+        if isinstance(update, BaseModel):
+            update = {output: getattr(update, output)}
+        if fell_back and name not in update.get("degraded", []):
+            update = {**update, "degraded": list(update.get("degraded", [])) + [name]}
+        if cuts:
+            update = {**update, "cuts": list(update.get("cuts", [])) + cuts}
+        return update
+
+    return wrapper
@@ -1,62 +1,68 @@
 
-from langgraph.graph import StateGraph, END
-from pydantic import BaseModel, Field
-from typing import Optional, Dict, Any
+from langgraph.graph import StateGraph, START, END
+
+# Single state definition (re-exported for callers of this module)
+from src.workflow.state import TravelState
 
 # Import all nodes
-from src.workflow.nodes.geocode_node import geocode_node
-from src.workflow.nodes.weather_node import weather_node
-from src.workflow.nodes.places_node import places_node
-from src.workflow.nodes.routing_node import routing_node
+from src.workflow.nodes.geocode_node import after_geocode, geocode_fallback, geocode_node
+from src.workflow.nodes.weather_node import weather_node, weather_fallback
+from src.workflow.nodes.places_node import places_node, places_fallback
+from src.workflow.nodes.routing_node import routing_node, routing_fallback
 from src.workflow.nodes.budget_node import budget_node
 from src.workflow.nodes.itinerary_node import itinerary_node
+from src.workflow.memo import memoize_node
+from src.workflow.timing import deadline_node, timed_node
+from src.workflow.multi_city import fan_out, city_node
 
 
 # -------------------------
-# Define state structure
+# Build the workflow graph
 # -------------------------
 
-class TravelState(BaseModel):
-    # User input
-    destination: Optional[str] = None
-    days: int = 5
-    persons: int = 1
-    budget_inr: int = 30000
-    budget_tier: str = "mid"
+def build_travel_graph(checkpointer=None):
+    """
+    Compile the travel planning graph.
+    Pass a LangGraph checkpointer (see src.workflow.checkpoint) to persist
+    state after every node so failed runs can be resumed.
+    Node outputs are memoized on their inputs (see src.workflow.memo).
+    With `destinations` set, the per-city stages fan out in parallel
+    (see src.workflow.multi_city). Every node's run time is recorded in
+    `node_timings` (see src.workflow.timing). With `sla_s` set, every node
+    runs within its share of the plan deadline, whichever way the graph is
+    invoked (a plain invoke starts it at the first node); weather, places and routing
+    degrade to their fallbacks when time runs short (see `cuts`). Geocode
+    may use the whole budget; if even that runs out, the plan skips to the
+    budget and a template itinerary instead of failing.
+    """
+    workflow = StateGraph(TravelState)
 
-    # Outputs from nodes
-    geocode: Optional[dict] = None
-    weather: Optional[dict] = None
-    places: Optional[dict] = None
-    routing: Optional[dict] = None
-    budget: Optional[dict] = None
-    itinerary: Optional[dict] = None
+    def node(name, fn, fallback=None):
+        return timed_node(name, memoize_node(name, deadline_node(name, fn, fallback)))
 
+    # Register nodes
+    workflow.add_node("geocode", node("geocode", geocode_node, geocode_fallback))
+    workflow.add_node("weather", node("weather", weather_node, weather_fallback))
+    workflow.add_node("places", node("places", places_node, places_fallback))
+    workflow.add_node("routing", node("routing", routing_node, routing_fallback))
+    workflow.add_node("budget", node("budget", budget_node))
+    workflow.add_node("itinerary", node("itinerary", itinerary_node))
+    workflow.add_node("city", deadline_node("city", city_node))
+
+    # Entry: single destination → geocode; multi-city → one "city" task per stop
+    workflow.add_conditional_edges(START, fan_out, ["geocode", "city"])
+    workflow.add_edge("city", "budget")
+
+    # Add edges
+    workflow.add_conditional_edges("geocode", after_geocode, ["weather", "budget"])
+    workflow.add_edge("weather", "places")
+    workflow.add_edge("places", "routing")
+    workflow.add_edge("routing", "budget")
+    workflow.add_edge("budget", "itinerary")
+    workflow.add_edge("itinerary", END)
+
+    # Compile
+    return workflow.compile(checkpointer=checkpointer)
 
-# -------------------------
-# Build the workflow graph
-# -------------------------
 
-workflow = StateGraph(TravelState)
-
-# Register nodes
-workflow.add_node("geocode", geocode_node)
-workflow.add_node("weather", weather_node)
-workflow.add_node("places", places_node)
-workflow.add_node("routing", routing_node)
-workflow.add_node("budget", budget_node)
-workflow.add_node("itinerary", itinerary_node)
-
-# Set entry point
-workflow.set_entry_point("geocode")
-
-# Add edges
-workflow.add_edge("geocode", "weather")
-workflow.add_edge("weather", "places")
-workflow.add_edge("places", "routing")
-workflow.add_edge("routing", "budget")
-workflow.add_edge("budget", "itinerary")
-workflow.add_edge("itinerary", END)
-
-# Compile
-app = workflow.compile()
+app = build_travel_graph()
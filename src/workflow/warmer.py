@@ -0,0 +1,141 @@
+"""
+Cache warmer for the most planned destinations.
+
+Functions:
+- top_destinations(k=20, since_days=30, path=PLAN_ARCHIVE) -> list
+- warm_destination(destination, refresh_fraction=REFRESH_FRACTION) -> dict
+- warm(destinations, refresh_fraction=REFRESH_FRACTION) -> list
+
+Runs the per-city stages of a plan (geocode → weather → places → routing)
+for each destination, so the geocode cache, place queries, the weather
+cache and the route cache hold exactly what a real plan will ask for,
+including the routing matrix of the destination's top-ranked POIs.
+
+- Rate limits: every request goes through polite_get, so the warmer is paced
+  like any other caller and can run next to live traffic.
+- Incremental: fresh cache entries are hits, so nothing is re-fetched until
+  it is due.
+- Refresh-ahead: inside the warmer, entries older than refresh_fraction of
+  their TTL count as misses (src.tools.cache.refresh_ahead) and are
+  re-fetched before they expire. The geocode cache has no TTL.
+  Hit rates and entry ages: python -m src.tools.cache_admin stats
+- Resumable: caches are flushed after every destination and a re-run skips
+  whatever is still fresh, so an interrupted run just continues. The run
+  stops early when a provider's circuit breaker opens, instead of warming
+  with degraded data.
+
+    python -m src.workflow.warmer "Goa, India" "Hanoi, Vietnam"
+    python -m src.workflow.warmer --from-archive --top 20 --since-days 30
+"""
+
+import argparse
+import time
+from collections import Counter
+from datetime import date, timedelta
+from typing import Any, Dict, List, Sequence
+
+from pydantic import BaseModel
+
+from src.tools.cache import refresh_ahead
+from src.tools.circuit_breaker import OPEN, breaker_states
+from src.tools.geocode import geocode_many
+from src.tools.geocode_cache import GEOCODE_CACHE
+from src.tools.hedging import hedge_stats
+from src.tools.places import PLACES_CACHE
+from src.tools.routing_matrix import ROUTE_CACHE
+from src.tools.weather import WEATHER_CACHE, get_weather_forecasts
+from src.workflow.archive import PLAN_ARCHIVE, scan
+from src.workflow.multi_city import CityState
+from src.workflow.nodes.geocode_node import geocode_node
+from src.workflow.nodes.weather_node import weather_node
+from src.workflow.nodes.places_node import places_node
+from src.workflow.nodes.routing_node import routing_node
+
+REFRESH_FRACTION = 0.8
+
+STAGES = (("geocode", geocode_node), ("weather", weather_node),
+          ("places", places_node), ("routing", routing_node))
+
+
+def top_destinations(k: int = 20, since_days: int = 30, path: str = PLAN_ARCHIVE) -> List[str]:
+    """Most planned destinations in the plan archive (multi-city trips count each stop)."""
+    since = date.today() - timedelta(days=since_days)
+    counts: Counter = Counter()
+    for row in scan(["destination"], since=since, path=path):
+        for stop in (row["destination"] or "").split(" → "):
+            if stop.strip():
+                counts[stop.strip()] += 1
+    return [dest for dest, _ in counts.most_common(k)]
+
+
+def _requests_sent() -> int:
+    return sum(st["requests"] + st["hedges"] for st in hedge_stats().values())
+
+
+def warm_destination(destination: str, refresh_fraction: float = REFRESH_FRACTION) -> Dict[str, Any]:
+    """Run the per-city stages for one destination. Returns a small report."""
+    state = CityState(destination=destination)
+    sent = _requests_sent()
+    start = time.perf_counter()
+    with refresh_ahead(refresh_fraction):
+        for name, node in STAGES:
+            update = node(state)
+            if isinstance(update, BaseModel):
+                state = update
+            else:
+                for field, value in update.items():
+                    setattr(state, field, value)
+    for cache in (GEOCODE_CACHE, WEATHER_CACHE, PLACES_CACHE, ROUTE_CACHE):
+        cache.flush()
+    return {
+        "destination": destination,
+        "requests": _requests_sent() - sent,
+        "seconds": round(time.perf_counter() - start, 2),
+        "pois_routed": len((state.routing or {}).get("names") or []),
+    }
+
+
+def warm(destinations: Sequence[str], refresh_fraction: float = REFRESH_FRACTION) -> List[Dict[str, Any]]:
+    """Warm every destination in order; failures are reported, not raised."""
+    # Geocode all destinations and batch their forecasts before the per-city pass
+    with refresh_ahead(refresh_fraction):
+        geos = [g for g in geocode_many(destinations) if g]
+        get_weather_forecasts([(g["lat"], g["lon"]) for g in geos])
+
+    reports = []
+    for i, dest in enumerate(destinations, 1):
+        try:
+            report = warm_destination(dest, refresh_fraction)
+        except Exception as e:
+            report = {"destination": dest, "error": str(e)}
+        reports.append(report)
+        print(f"[warm {i}/{len(destinations)}] {report}")
+
+        tripped = [p for p, st in breaker_states().items() if st["state"] == OPEN]
+        if tripped:
+            print(f"[warm] stopping: circuit open for {', '.join(tripped)}; re-run later to resume")
+            break
+    return reports
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pre-populate provider caches for top destinations")
+    parser.add_argument("destinations", nargs="*")
+    parser.add_argument("--from-archive", action="store_true", help="rank destinations from the plan archive")
+    parser.add_argument("--archive", default=PLAN_ARCHIVE)
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--since-days", type=int, default=30)
+    parser.add_argument("--refresh-fraction", type=float, default=REFRESH_FRACTION,
+                        help="re-fetch entries older than this fraction of their TTL")
+    args = parser.parse_args()
+
+    dests = list(args.destinations)
+    if args.from_archive:
+        dests += [d for d in top_destinations(args.top, args.since_days, args.archive) if d not in dests]
+    if not dests:
+        parser.error("give destinations or --from-archive")
+
+    reports = warm(dests, args.refresh_fraction)
+    ok = [r for r in reports if "error" not in r]
+    print(f"[warm] {len(ok)}/{len(dests)} destinations warm, "
+          f"{sum(r['requests'] for r in ok)} provider requests")
@@ -0,0 +1,148 @@
+"""
+Shared test fixtures.
+
+- providers: fake Nominatim / Open-Meteo / Geoapify / OSRM / Groq (no
+  network). Per-host latency is configurable and honours the request
+  timeout like a real socket would (requests.Timeout).
+- Every test runs in its own scratch directory, so the file caches,
+  artifacts and checkpoints start empty; process-wide state (memo, rate
+  buckets, circuit breakers, hedging stats, itinerary cache index) is
+  reset too.
+"""
+
+import json
+import math
+import os
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+import requests
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("GEOAPIFY_API_KEY", "test")
+os.environ.setdefault("GROQ_API_KEY", "test")
+# Caches are relative to the working directory: never write them into the repo
+os.chdir(tempfile.mkdtemp(prefix="travel-planner-tests-"))
+
+from src.agents import itinerary_agent  # noqa: E402
+from src.tools import circuit_breaker, hedging, itinerary_cache, rate_limit  # noqa: E402
+from src.tools.cache import CACHES  # noqa: E402
+from src.workflow import artifacts  # noqa: E402
+from src.workflow.memo import clear_memo  # noqa: E402
+
+
+class FakeResponse:
+    def __init__(self, payload, status_code=200):
+        self._payload = payload
+        self.status_code = status_code
+        self.headers = {}
+        self.text = json.dumps(payload)
+
+    def json(self):
+        return self._payload
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(str(self.status_code), response=self)
+
+
+def _feature(i, lat, lon, category):
+    la, lo = lat + 0.01 * i, lon + 0.01 * i
+    return {"type": "Feature",
+            "properties": {"name": f"{category} {i}", "lat": la, "lon": lo, "formatted": f"{category} {i}",
+                           "categories": [category], "place_id": f"{category}-{i}"},
+            "geometry": {"type": "Point", "coordinates": [lo, la]}}
+
+
+class FakeProviders:
+    """
+    Answers the provider URLs the tools call; latency[host or "groq"] in
+    seconds, coords[query] the Nominatim answer (15.3, 74.08 by default).
+    """
+
+    def __init__(self):
+        self.latency = {}
+        self.calls = []
+        self.coords = {}
+
+    def _wait(self, key, timeout):
+        delay = self.latency.get(key, 0.0)
+        if timeout is not None and delay > timeout:
+            time.sleep(timeout)
+            raise requests.Timeout(f"{key} took longer than {timeout:.2f}s")
+        time.sleep(delay)
+
+    def get(self, url, params=None, headers=None, timeout=None, **kwargs):
+        parts = urlsplit(url)
+        q = {k: v[0] for k, v in parse_qs(parts.query).items()}
+        q.update({k: str(v) for k, v in (params or {}).items()})
+        host = parts.netloc
+        self.calls.append(host)
+        self._wait(host, timeout)
+        if "nominatim" in host:
+            lat, lon = self.coords.get(q["q"], (15.3, 74.08))
+            return FakeResponse([{"lat": str(lat), "lon": str(lon), "display_name": q["q"], "place_id": 1}])
+        if "open-meteo" in host:
+            daily = {"time": ["2026-01-01", "2026-01-02", "2026-01-03"], "temperature_2m_max": [31, 32, 30],
+                     "temperature_2m_min": [22, 23, 22], "precipitation_sum": [0.0, 1.2, 0.0]}
+            lats = q["latitude"].split(",")
+            one = [{"latitude": float(la), "daily": daily} for la in lats]
+            return FakeResponse(one[0] if len(one) == 1 else one)
+        if "geoapify" in host:
+            lon, lat = map(float, q["filter"].split(":")[1].split(",")[:2])
+            offset, limit = int(q.get("offset", 0)), int(q.get("limit", 20))
+            category = q["categories"].split(",")[0]
+            return FakeResponse({"features": [_feature(i, lat, lon, category)
+                                              for i in range(offset, min(25, offset + limit))]})
+        if "osrm" in host:
+            (a, b), (c, d) = [tuple(map(float, p.split(","))) for p in parts.path.split("/")[-1].split(";")]
+            dist = math.hypot(a - c, b - d) * 111000 * 1.3
+            return FakeResponse({"code": "Ok", "routes": [{"distance": dist, "duration": dist / 11}]})
+        raise AssertionError(f"unexpected request to {url}")
+
+    def groq(self, *args, **kwargs):
+        fake = self
+
+        def create(model, messages, max_tokens, stream=False, timeout=None, **kw):
+            fake.calls.append("groq")
+            fake._wait("groq", timeout)
+            text = f"## Day 1 — Itinerary\nLLM itinerary ({len(messages[0]['content'])} prompt chars)"
+            usage = SimpleNamespace(prompt_tokens=100, completion_tokens=20)
+            chunk = SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=text),
+                                                             finish_reason="stop")], usage=usage)
+            return iter([chunk])
+
+        return SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+
+
+@pytest.fixture(autouse=True)
+def scratch_dir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(artifacts, "ARTIFACT_DIR", tmp_path / "artifacts")
+    artifacts._lru.clear()
+    for cache in CACHES.values():
+        cache._data, cache._dirty = None, False
+        cache._changed, cache._deleted = set(), set()
+    itinerary_cache._index = None
+    clear_memo()
+    rate_limit._buckets.clear()
+    circuit_breaker._breakers.clear()
+    hedging.reset_stats()
+    yield tmp_path
+    # pytest restores the invocation directory before atexit: write what the
+    # test left in the caches here, not there
+    for cache in CACHES.values():
+        cache.flush()
+
+
+@pytest.fixture
+def providers(monkeypatch):
+    fake = FakeProviders()
+    monkeypatch.setattr(requests, "get", fake.get)
+    monkeypatch.setattr(itinerary_agent, "Groq", fake.groq)
+    return fake
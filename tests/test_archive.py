@@ -0,0 +1,108 @@
+import datetime as dt
+import json
+
+import pytest
+
+from src.workflow import archive
+from src.workflow.archive import append_plan, list_columns, scan, seal
+
+DAY = 86400
+T0 = dt.datetime(2026, 10, 1, 12).timestamp()
+
+
+def plan(destination, total=20000):
+    return {"destination": destination, "days": 2, "persons": 1, "budget_inr": 30000,
+            "budget": {"breakdown": {"destination": destination, "days": 2, "total_estimated": total},
+                       "assessment": {"fits": True}},
+            "node_timings": {"geocode": 0.1, "routing": 0.5},
+            "itinerary": f"## Day 1 — {destination}"}
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [T0]
+    monkeypatch.setattr(archive.time, "time", lambda: now[0])
+    return now
+
+
+@pytest.fixture
+def opened(monkeypatch):
+    """(chunk dir, column) of every column file scan() decompresses."""
+    calls = []
+    read = archive._read_column
+
+    def spy(chunk_dir, col, chunk):
+        calls.append((chunk_dir.name, col))
+        return read(chunk_dir, col, chunk)
+
+    monkeypatch.setattr(archive, "_read_column", spy)
+    return calls
+
+
+def test_append_counts_the_tail_without_reading_it(tmp_path, monkeypatch):
+    root = tmp_path / "plans"
+    monkeypatch.setattr(archive, "CHUNK_ROWS", 3)
+    append_plan(plan("Goa"), "r0", path=str(root))
+    monkeypatch.setattr(archive, "_read_tail", lambda root: pytest.fail("tail re-read"))
+
+    append_plan(plan("Goa"), "r1", path=str(root))
+    assert (root / "tail.rows").read_text() == "2"
+    assert not (root / "manifest.json").exists()
+
+    monkeypatch.undo()
+    monkeypatch.setattr(archive, "CHUNK_ROWS", 3)
+    append_plan(plan("Pune"), "r2", path=str(root))
+
+    manifest = json.loads((root / "manifest.json").read_text())
+    assert [(c["dir"], c["rows"], c["destinations"]) for c in manifest["chunks"]] == [("c000001", 3, ["goa", "pune"])]
+    assert (root / "tail.jsonl").read_text() == "" and (root / "tail.rows").read_text() == "0"
+    assert [r["run_id"] for r in scan(["run_id"], path=str(root))] == ["r0", "r1", "r2"]
+
+
+def test_scan_prunes_chunks_and_columns(tmp_path, clock, opened):
+    root = str(tmp_path / "plans")
+    for i, dest in enumerate(["Goa", "Goa", "Pune", "Hanoi → Hoi An"]):
+        clock[0] = T0 + i * DAY
+        append_plan(plan(dest, total=1000 * i), f"r{i}", path=root)
+        if i < 3:
+            seal(root)          # one chunk per day, the last row stays in the tail
+
+    assert [r["run_id"] for r in scan(["run_id"], destination="goa", path=root)] == ["r0", "r1"]
+    # Pune's chunk is skipped from the manifest; no itinerary or unrequested column is opened
+    assert opened == [("c000001", "destination"), ("c000001", "date"), ("c000001", "run_id"),
+                      ("c000002", "destination"), ("c000002", "date"), ("c000002", "run_id")]
+
+    opened.clear()
+    rows = list(scan(["run_id", "budget.total_estimated"], since="2026-10-02", until=dt.date(2026, 10, 3), path=root))
+    assert rows == [{"run_id": "r1", "budget.total_estimated": 1000}, {"run_id": "r2", "budget.total_estimated": 2000}]
+    assert {d for d, _ in opened} == {"c000002", "c000003"}
+
+    opened.clear()
+    (latest,) = scan(destination="hoi an", path=root)
+    assert latest["run_id"] == "r3" and latest["timing.routing"] == 0.5
+    assert "itinerary" not in latest and opened == []
+
+    assert next(scan(["itinerary"], destination="pune", path=root)) == {"itinerary": "## Day 1 — Pune"}
+    assert {"run_id", "budget.total_estimated", "matrix.n_places", "itinerary"} <= set(list_columns(root))
+
+
+def test_seal_recovers_from_a_crash_before_the_manifest(tmp_path, monkeypatch):
+    root = tmp_path / "plans"
+    append_plan(plan("Goa"), "r0", path=str(root))
+
+    def crash(root, manifest):
+        raise OSError("disk full")
+
+    with monkeypatch.context() as m:
+        m.setattr(archive, "_store_manifest", crash)
+        with pytest.raises(OSError):
+            seal(str(root))
+    assert (root / "c000001").is_dir() and not (root / "manifest.json").exists()
+
+    append_plan(plan("Pune"), "r1", path=str(root))
+    assert seal(str(root)) == 2
+
+    manifest = json.loads((root / "manifest.json").read_text())
+    assert [(c["dir"], c["rows"]) for c in manifest["chunks"]] == [("c000001", 2)]
+    assert [r["run_id"] for r in scan(["run_id"], path=str(root))] == ["r0", "r1"]
+    assert seal(str(root)) == 0
@@ -0,0 +1,67 @@
+import json
+import multiprocessing
+
+import pytest
+
+from src.tools import cache as cache_module
+from src.tools.cache import FileCache
+
+WORKERS, WRITES = 4, 25
+
+
+@pytest.fixture(autouse=True)
+def private_registry(monkeypatch):
+    # Caches made here stay out of the process-wide registry (and its atexit flush)
+    monkeypatch.setattr(cache_module, "CACHES", {})
+
+
+def read(path):
+    return json.loads(path.read_text())
+
+
+def test_flush_merges_instead_of_overwriting(tmp_path):
+    path = tmp_path / "shared_cache.json"
+    a, b = FileCache(str(path), name="a"), FileCache(str(path), name="b")
+    a.set("x", 1)
+    b.set("y", 2)
+    b.set("z", "from b")
+    a.set("z", "from a")      # newer write of the same key
+
+    a.flush()
+    b.flush()
+
+    assert {k: e["v"] for k, e in read(path).items()} == {"x": 1, "y": 2, "z": "from a"}
+    # b sees a's entries after its own flush; a deletion merges too
+    assert b.get("x") == 1
+    b.prune(max_age_s=-1)
+    b.flush()
+    assert read(path) == {}
+
+
+def _writer(path, worker):
+    cache = FileCache(path, name=f"worker{worker}")
+    for i in range(WRITES):
+        cache.set(f"{worker}:{i}", i)
+        cache.set("shared", [worker, i])
+        cache.flush()
+
+
+@pytest.mark.skipif(cache_module.fcntl is None, reason="no cross-process file lock on this platform")
+def test_concurrent_flushes_keep_every_process_entries(tmp_path):
+    path = str(tmp_path / "shared_cache.json")
+    ctx = multiprocessing.get_context("fork")
+    procs = [ctx.Process(target=_writer, args=(path, w)) for w in range(WORKERS)]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join(30)
+    assert [p.exitcode for p in procs] == [0] * WORKERS
+
+    data = read(tmp_path / "shared_cache.json")
+    assert {f"{w}:{i}" for w in range(WORKERS) for i in range(WRITES)} <= set(data)
+    # The newest write of the shared key won: some worker's last one
+    assert data["shared"]["v"][1] == WRITES - 1
+    assert data["shared"]["t"] == max(e["t"] for k, e in data.items())
+    # Every process's counters were added to the sidecar, none lost
+    stats = read(tmp_path / "shared_cache.json.stats.json")
+    assert stats["writes"] == WORKERS * WRITES * 2
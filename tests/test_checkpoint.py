@@ -0,0 +1,59 @@
+import pytest
+
+from src.workflow import travel_graph
+from src.workflow.checkpoint import invoke_resumable, new_run_id, open_checkpointer, prune_checkpoints, run_config
+from src.workflow.memo import clear_memo
+from src.workflow.travel_graph import TravelState, build_travel_graph
+
+
+def test_failed_run_resumes_at_the_failed_node(providers, monkeypatch):
+    real_budget = travel_graph.budget_node
+    failures = []
+
+    def flaky_budget(state):
+        if not failures:
+            failures.append(1)
+            raise RuntimeError("budget service down")
+        return real_budget(state)
+
+    monkeypatch.setattr(travel_graph, "budget_node", flaky_budget)
+    saver = open_checkpointer("checkpoints.sqlite")
+    app = build_travel_graph(checkpointer=saver)
+    run_id = new_run_id()
+
+    with pytest.raises(RuntimeError):
+        invoke_resumable(app, TravelState(destination="Goa", days=2), run_id, saver)
+    assert app.get_state(run_config(run_id)).next == ("budget",)
+
+    # A fresh process: nothing memoized, only the checkpoint is left
+    clear_memo()
+    before = list(providers.calls)
+    assert any("nominatim" in c for c in before) and any("osrm" in c for c in before)
+    result = invoke_resumable(app, TravelState(destination="ignored"), run_id, saver)
+
+    assert result["destination"] == "Goa" and result["itinerary"]
+    assert [c for c in providers.calls[len(before):] if c != "groq"] == []
+
+
+def test_finished_run_is_returned_without_running_anything(providers):
+    saver = open_checkpointer("checkpoints.sqlite")
+    app = build_travel_graph(checkpointer=saver)
+    run_id = new_run_id()
+    first = invoke_resumable(app, TravelState(destination="Goa", days=2), run_id, saver)
+    calls = len(providers.calls)
+
+    again = invoke_resumable(app, TravelState(destination="Goa", days=2), run_id, saver)
+
+    assert again["itinerary"] == first["itinerary"]
+    assert len(providers.calls) == calls
+
+
+def test_expired_runs_are_pruned(providers):
+    saver = open_checkpointer("checkpoints.sqlite")
+    app = build_travel_graph(checkpointer=saver)
+    run_id = new_run_id()
+    invoke_resumable(app, TravelState(destination="Goa", days=2), run_id, saver)
+
+    assert prune_checkpoints(saver, retention_s=3600) == 0
+    assert prune_checkpoints(saver, retention_s=-1) == 1
+    assert not app.get_state(run_config(run_id)).values
@@ -0,0 +1,51 @@
+import time
+
+from src.workflow.checkpoint import invoke_resumable, new_run_id, open_checkpointer
+from src.workflow.travel_graph import TravelState, app, build_travel_graph
+
+NOMINATIM = "nominatim.openstreetmap.org"
+
+
+def _plan(destination, sla_s):
+    saver = open_checkpointer("checkpoints.sqlite")
+    app = build_travel_graph(checkpointer=saver)
+    start = time.monotonic()
+    result = invoke_resumable(app, TravelState(destination=destination, days=2, sla_s=sla_s), new_run_id(), saver)
+    return result, time.monotonic() - start
+
+
+def test_slow_geocoder_gets_the_whole_budget(providers):
+    providers.latency[NOMINATIM] = 0.6
+    result, elapsed = _plan("Slowtown", sla_s=2.0)
+
+    assert result["geocode"]["lat"] == 15.3
+    assert result["itinerary"]
+    assert elapsed < 2.0 + 1.0
+
+
+def test_geocoder_slower_than_the_sla_still_returns_a_plan(providers):
+    providers.latency[NOMINATIM] = 5.0
+    result, elapsed = _plan("Nowhere Slow", sla_s=1.0)
+
+    assert elapsed < 1.0 + 1.0
+    assert result["geocode"] is None
+    assert any(c["stage"] == "geocode" for c in result["cuts"])
+    assert "geocode" in result["degraded"]
+    # No coordinates: the location stages are skipped, budget and a template itinerary remain
+    assert result.get("weather") is None and result.get("routing") is None
+    assert result["budget"]["breakdown"]["destination"] == "Nowhere Slow"
+    assert result["itinerary"].startswith("# Nowhere Slow")
+    assert "groq" not in providers.calls
+
+
+def test_plain_invoke_keeps_the_sla(providers):
+    providers.latency["router.project-osrm.org"] = 5.0
+    start = time.monotonic()
+    result = app.invoke(TravelState(destination="Slow Roads", days=2, sla_s=1.5))
+    elapsed = time.monotonic() - start
+
+    assert elapsed < 1.5 + 1.0
+    assert result["deadline_started_at"] is not None
+    assert any(c["stage"] == "routing" for c in result["cuts"])
+    assert result["routing"]["approximate"] and "routing" in result["degraded"]
+    assert result["itinerary"]
@@ -0,0 +1,82 @@
+import pytest
+
+from src.tools import gazetteer
+from src.tools.gazetteer import Gazetteer, build_index, normalize_name
+from src.tools.geocode import nominatim_geocode
+
+ROWS = [
+    # geonameid, name, asciiname, alternatenames, lat, lon, class, code, cc, population
+    (2988507, "Paris", "Paris", "Lutece,Paname", 48.85, 2.35, "P", "PPLC", "FR", 2138551),
+    (4717560, "Paris", "Paris", "", 33.66, -95.56, "P", "PPL", "US", 24782),
+    (1260607, "Panaji", "Panaji", "Panjim,Pangim", 15.49, 73.82, "P", "PPLA", "IN", 114405),
+    (3448439, "São Paulo", "Sao Paulo", "", -23.55, -46.64, "P", "PPLA", "BR", 10021295),
+    (1275339, "Mumbai", "Mumbai", "Bombay", 19.07, 72.88, "P", "PPLA", "IN", 12691836),
+    (9999999, "Tiny", "Tiny", "", 1.0, 1.0, "P", "PPL", "IN", 10),
+    (8888888, "Ridge", "Ridge", "", 1.0, 1.0, "T", "HLL", "IN", 0),   # terrain: not indexed
+]
+COUNTRIES = {"FR": "France", "US": "United States", "IN": "India", "BR": "Brazil"}
+
+
+@pytest.fixture
+def index(tmp_path):
+    dump = tmp_path / "cities.txt"
+    dump.write_text("".join(
+        "\t".join(map(str, [gid, name, ascii_, alt, lat, lon, cls, code, cc, "", "", "", "", "", pop,
+                            "", "", "UTC", "2024-01-01"])) + "\n"
+        for gid, name, ascii_, alt, lat, lon, cls, code, cc, pop in ROWS
+    ), encoding="utf-8")
+    info = tmp_path / "countryInfo.txt"
+    info.write_text("#ISO\tISO3\tISO-Numeric\tfips\tCountry\n" + "".join(
+        f"{cc}\t{cc}X\t0\t{cc}\t{name}\n" for cc, name in COUNTRIES.items()), encoding="utf-8")
+    path = tmp_path / "gazetteer.idx"
+    stats = build_index(str(dump), str(path), country_info=str(info), min_population=100)
+    return path, stats
+
+
+def test_build_skips_small_places_and_other_feature_classes(index):
+    path, stats = index
+    gaz = Gazetteer(str(path))
+
+    assert stats["records"] == 5
+    assert stats["bytes"] == path.stat().st_size
+    assert gaz.lookup("Tiny") is None and gaz.lookup("Ridge") is None
+
+
+def test_lookup_ranks_by_importance_and_resolves_alternate_names(index):
+    gaz = Gazetteer(str(index[0]))
+
+    assert gaz.lookup("paris")["country_code"] == "FR"
+    assert gaz.lookup("Paris, United States")["geonameid"] == 4717560
+    assert gaz.lookup("Paris, us")["geonameid"] == 4717560
+    assert gaz.lookup("Panjim")["display_name"] == "Panaji, India"
+    assert gaz.lookup("SAO PAULO")["geonameid"] == 3448439
+    assert normalize_name("São  Paulo!") == "sao paulo"
+
+
+def test_qualified_name_that_does_not_match_is_a_miss(index):
+    gaz = Gazetteer(str(index[0]))
+
+    assert gaz.lookup("Paris, Germany") is None
+    assert gaz.lookup("Mumbai, Brazil") is None
+    assert gaz.lookup(" , ") is None
+
+
+def test_prefix_lookup_ranks_by_feature_then_population(index):
+    gaz = Gazetteer(str(index[0]))
+
+    assert [r["geonameid"] for r in gaz.prefix("pa")] == [2988507, 1260607, 4717560]
+    assert [r["geonameid"] for r in gaz.prefix("pa", limit=1)] == [2988507]
+    assert gaz.prefix("zz") == []
+
+
+def test_geocoder_uses_the_gazetteer_and_nominatim_only_for_misses(index, providers, monkeypatch):
+    monkeypatch.setenv("GAZETTEER_INDEX", str(index[0]))
+    monkeypatch.setattr(gazetteer, "_default", None)
+
+    local = nominatim_geocode("Bombay")
+    assert local["display_name"] == "Mumbai, India" and local["raw"]["source"] == "geonames"
+    assert not providers.calls
+
+    remote = nominatim_geocode("Paris, Germany")
+    assert remote["lat"] == 15.3
+    assert providers.calls == ["nominatim.openstreetmap.org"]
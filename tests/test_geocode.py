@@ -0,0 +1,58 @@
+import time
+
+import requests
+
+from src.tools.geocode import geocode_many, nominatim_geocode
+from src.tools.geocode_cache import save_to_cache
+
+NOMINATIM = "nominatim.openstreetmap.org"
+
+
+def test_variants_of_a_name_are_geocoded_once(providers):
+    providers.coords.update({"Goa, India": (15.3, 74.1), "Pune": (18.5, 73.9)})
+    places = ["Goa, India", " goa,india", "", "GOA INDIA", "Pune"]
+
+    results = geocode_many(places)
+
+    assert providers.calls.count(NOMINATIM) == 2
+    assert results[2] is None
+    assert [r["place"] for i, r in enumerate(results) if i != 2] == ["Goa, India", " goa,india", "GOA INDIA", "Pune"]
+    assert {(r["lat"], r["lon"]) for r in results[:2] + results[3:4]} == {(15.3, 74.1)}
+    assert (results[4]["lat"], results[4]["lon"]) == (18.5, 73.9)
+
+    # Every variant was cached: single lookups and later batches make no request
+    providers.calls.clear()
+    assert nominatim_geocode("GOA INDIA")["lat"] == 15.3
+    assert geocode_many(["Pune", "goa india"])[1]["place"] == "goa india"
+    assert providers.calls == []
+
+
+def test_cached_places_are_served_without_a_request(providers):
+    save_to_cache("Hanoi", {"place": "Hanoi", "lat": 21.03, "lon": 105.85, "display_name": "Hanoi"})
+
+    (hanoi, goa) = geocode_many(["hanoi", "Goa"])
+
+    assert hanoi == {"place": "hanoi", "lat": 21.03, "lon": 105.85, "display_name": "Hanoi"}
+    assert goa["lat"] == 15.3
+    assert providers.calls == [NOMINATIM]
+
+
+def test_lookups_overlap_but_keep_nominatims_rate(providers, monkeypatch):
+    providers.latency[NOMINATIM] = 1.5
+    starts = []
+
+    def timed_get(*args, **kwargs):
+        starts.append(time.monotonic())
+        return providers.get(*args, **kwargs)
+
+    monkeypatch.setattr(requests, "get", timed_get)
+    t0 = time.monotonic()
+    results = geocode_many(["Hanoi", "Hoi An", "Saigon"])
+    elapsed = time.monotonic() - t0
+
+    assert all(results)
+    starts.sort()
+    # 1 req/s: requests start a second apart, and overlap their 1.5 s latency
+    # (one after the other they would take 4.5 s)
+    assert all(b - a >= 0.95 for a, b in zip(starts, starts[1:]))
+    assert elapsed < 4.0
@@ -0,0 +1,93 @@
+import threading
+import time
+
+import pytest
+import requests
+from conftest import FakeResponse
+
+from src.tools import hedging, rate_limit
+from src.tools.hedging import hedge_stats, hedged_get
+from src.tools.rate_limit import polite_get
+
+HOST = "hedge.test"
+URL = f"http://{HOST}/search"
+
+
+@pytest.fixture
+def slow_first(monkeypatch):
+    """requests.get where call #1 takes `first_s` and the others answer at once; returns call start times."""
+    starts, lock = [], threading.Lock()
+    first_s = [0.4]
+
+    def get(url, params=None, headers=None, timeout=None):
+        with lock:
+            starts.append(time.monotonic())
+            n = len(starts)
+        if n == 1:
+            time.sleep(first_s[0])
+        return FakeResponse({"call": n})
+
+    monkeypatch.setattr(requests, "get", get)
+    return starts, first_s
+
+
+def warm(latency_s=0.01):
+    hedging._host_stats(HOST).latencies.extend([latency_s] * hedging.MIN_SAMPLES)
+
+
+def test_no_hedge_without_enough_samples(slow_first):
+    starts, _ = slow_first
+    assert hedged_get(URL, timeout=2).json() == {"call": 1}
+    assert len(starts) == 1
+
+
+def test_slow_primary_is_hedged_and_the_backup_wins(slow_first):
+    starts, _ = slow_first
+    warm()
+
+    assert hedged_get(URL, timeout=2).json() == {"call": 2}
+    assert starts[1] - starts[0] == pytest.approx(hedging.MIN_DELAY_S, abs=0.03)
+    stats = hedge_stats()[HOST]
+    assert (stats["requests"], stats["hedges"], stats["hedge_wins"]) == (1, 1, 1)
+
+
+def test_hedges_are_capped_at_the_ratio(slow_first):
+    starts, _ = slow_first
+    warm()
+    recent = hedging._host_stats(HOST).recent_hedged
+    recent.extend([True] * 2 + [False] * 18)     # already 10% hedged
+
+    assert hedged_get(URL, timeout=2).json() == {"call": 1}
+    assert len(starts) == 1 and hedge_stats()[HOST]["hedges"] == 0
+
+
+def test_hedge_waits_for_a_token_of_the_host(slow_first, monkeypatch):
+    starts, _ = slow_first
+    monkeypatch.setitem(rate_limit.PROVIDER_LIMITS, HOST, (10.0, 1))
+    warm()
+
+    assert polite_get(URL, timeout=2).json() == {"call": 2}
+    # The hedge was due after 0.05 s but the bucket only had a token after 0.1 s
+    assert starts[1] - starts[0] >= 0.095
+
+
+def test_no_hedge_when_the_bucket_has_no_token_in_time(slow_first, monkeypatch):
+    starts, _ = slow_first
+    monkeypatch.setitem(rate_limit.PROVIDER_LIMITS, HOST, (2.0, 1))
+    warm()
+
+    assert polite_get(URL, timeout=2).json() == {"call": 1}
+    assert len(starts) == 1
+    assert hedge_stats()[HOST]["hedges"] == 0
+
+
+def test_token_is_returned_when_the_primary_wins_the_wait(slow_first, monkeypatch):
+    starts, first_s = slow_first
+    first_s[0] = 0.08           # answers while the hedge waits for its token (due at 0.1 s)
+    monkeypatch.setitem(rate_limit.PROVIDER_LIMITS, HOST, (10.0, 1))
+    released = []
+    monkeypatch.setattr(rate_limit, "release", released.append)
+    warm()
+
+    assert polite_get(URL, timeout=2).json() == {"call": 1}
+    assert len(starts) == 1 and released == [HOST]
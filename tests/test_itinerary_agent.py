@@ -0,0 +1,141 @@
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from src.agents import itinerary_agent
+from src.agents.itinerary_agent import GROQ_HOST, itinerary_agent_run, itinerary_agent_run_per_day
+from src.tools import circuit_breaker, rate_limit
+from src.tools.circuit_breaker import get_breaker
+
+
+class RateLimited(Exception):
+    status_code = 429
+    response = SimpleNamespace(headers={"retry-after": "1"})
+
+
+def fake_groq(monkeypatch, starts, fail=None):
+    def create(model, messages, max_tokens, stream=False, timeout=None, **kw):
+        starts.append(time.monotonic())
+        if fail:
+            raise fail()
+        day = messages[0]["content"].split("Write ONLY Day ")[-1].split(" ")[0]
+        delta = SimpleNamespace(content=f"## Day {day} — LLM", finish_reason=None)
+        return iter([SimpleNamespace(choices=[SimpleNamespace(delta=delta, finish_reason="stop")], usage=None)])
+
+    client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    monkeypatch.setattr(itinerary_agent, "Groq", lambda **kw: client)
+
+
+def trip(days):
+    return {
+        "budget": {"breakdown": {"destination": "Goa", "days": days, "persons": 2, "total_estimated": 40000}},
+        "day_plans": [{"day": d, "destination": "Goa", "weather": None,
+                       "visits": [{"name": f"Sight {d}"}], "food": ["Cafe"]} for d in range(1, days + 1)],
+    }
+
+
+def test_per_day_calls_are_paced_by_the_groq_bucket(monkeypatch):
+    monkeypatch.setitem(rate_limit.PROVIDER_LIMITS, GROQ_HOST, (10.0, 2))
+    starts = []
+    fake_groq(monkeypatch, starts)
+    data = trip(5)
+
+    text = itinerary_agent_run_per_day(data, timeout_s=5)
+
+    # 6 calls (5 days + overview): a burst of 2, then one every 0.1 s
+    assert len(starts) == 6
+    assert max(starts) - min(starts) == pytest.approx(0.4, abs=0.05)
+    assert "## Day 5 — LLM" in text and not data.get("degraded")
+
+
+def test_slot_wait_counts_against_the_call_timeout(monkeypatch):
+    monkeypatch.setitem(rate_limit.PROVIDER_LIMITS, GROQ_HOST, (1.0, 1))
+    starts = []
+    fake_groq(monkeypatch, starts)
+    data = trip(3)
+
+    text = itinerary_agent_run_per_day(data, timeout_s=1.5)
+
+    # Only the calls that got a slot within 1.5 s went out; the rest are plain day plans
+    assert len(starts) == 2
+    assert data["degraded"]
+    assert "## Day 3 — Goa" in text and "- Sight 3" in text
+
+
+def test_429_holds_back_groq_without_tripping_the_breaker(monkeypatch):
+    monkeypatch.setitem(rate_limit.PROVIDER_LIMITS, GROQ_HOST, (100.0, 20))
+    starts = []
+    fake_groq(monkeypatch, starts, fail=RateLimited)
+    data = trip(7)
+
+    itinerary_agent_run_per_day(data, timeout_s=5)
+
+    assert data["degraded"]
+    assert get_breaker("groq").state == "closed"
+    # Retry-After: 1 blocks the bucket for every caller
+    assert rate_limit.get_bucket(GROQ_HOST).try_reserve(0.5) is None
+
+
+def no_api_key(**kw):
+    raise RuntimeError("The api_key client option must be set")
+
+
+def test_client_failure_degrades_the_single_completion(monkeypatch):
+    monkeypatch.setattr(itinerary_agent, "Groq", no_api_key)
+    data = {**trip(2), "weather": {"forecast": {}}, "routing_summary": {"summary": None},
+            "places": {"attractions": [{"name": "Fort Aguada"}], "beaches": [], "food": [{"name": "Cafe"}]}}
+
+    text = itinerary_agent_run(data)
+
+    assert data["degraded"]
+    assert "Fort Aguada" in text
+
+
+def test_client_failure_degrades_per_day(monkeypatch):
+    monkeypatch.setattr(itinerary_agent, "Groq", no_api_key)
+    data = trip(2)
+
+    text = itinerary_agent_run_per_day(data)
+
+    assert data["degraded"]
+    assert "- Sight 1" in text and "- Sight 2" in text
+
+
+def test_failed_completion_falls_back_to_the_template(monkeypatch):
+    monkeypatch.setattr(itinerary_agent, "Groq", no_api_key)
+    data = trip(2)
+
+    text = itinerary_agent_run_per_day(data)
+
+    # No LLM text at all: the whole template itinerary, budget included
+    assert text.startswith("# Goa — 2 days")
+    assert "**Morning**\n- Sight 1" in text and "- Lunch at Cafe" in text
+    assert "## Budget" in text
+
+
+class DroppedStream:
+    """A stream that delivers one chunk and then loses the connection."""
+
+    def __init__(self):
+        self.closed = False
+
+    def __iter__(self):
+        delta = SimpleNamespace(content="## Day 1", finish_reason=None)
+        yield SimpleNamespace(choices=[SimpleNamespace(delta=delta, finish_reason=None)], usage=None)
+        raise ConnectionError("connection reset mid-stream")
+
+    def close(self):
+        self.closed = True
+
+
+def test_stream_is_closed_when_the_breaker_trips_mid_stream(monkeypatch):
+    monkeypatch.setitem(circuit_breaker.BREAKER_CONFIG, "groq", {"min_calls": 1})
+    stream = DroppedStream()
+    client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=lambda **kw: stream)))
+
+    with pytest.raises(ConnectionError):
+        itinerary_agent._complete(client, "prompt", timeout=5)
+
+    assert get_breaker("groq").state == "open"
+    assert stream.closed
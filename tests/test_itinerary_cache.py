@@ -0,0 +1,86 @@
+from src.tools.itinerary_cache import lookup, signature, store
+from src.workflow.travel_graph import TravelState, build_travel_graph
+
+PLACES = {"attractions": [{"name": f"Fort {i}"} for i in range(6)], "beaches": [{"name": "Calangute"}]}
+FORECAST = {"temperature_2m_max": [31] * 10, "precipitation_sum": [0.0] * 10}
+
+
+def _sig(days=5, persons=2, mode="single", destination="Goa"):
+    return signature([destination], [{"lat": 15.3, "lon": 74.08}], [PLACES], days, "mid", [FORECAST],
+                     persons=persons, mode=mode)
+
+
+def _budget(days=5, persons=2, scale=1):
+    breakdown = {"destination": "Goa", "days": days, "persons": persons, "flight": 8000 * persons,
+                 "hotel": 3000 * days * scale, "meals": 1200 * days * persons, "sightseeing": 500 * days * persons,
+                 "local_transport": 1500, "contingency": 900 * days}
+    breakdown["total_estimated"] = sum(v for k, v in breakdown.items() if k not in ("destination", "days", "persons"))
+    return {"breakdown": breakdown}
+
+
+def _text(days, budget):
+    b = budget["breakdown"]
+    lines = [f"# Goa: {days} days for {b['persons']} travellers",
+             f"Total {b['total_estimated']:,} INR ({b['total_estimated'] // b['persons']:,} per person)",
+             f"Hotel ₹{b['hotel']:,}, meals ₹{b['meals']:,}"]
+    for d in range(1, days + 1):
+        lines += [f"## Day {d}", f"Visit Fort {d}"]
+    # Not budget lines: a figure or day count here is about the place
+    lines[-1] += f", open {days} days a week, {b['contingency']:,} steps to the top"
+    return "\n".join(lines)
+
+
+def test_exact_hit_updates_the_budget_figures():
+    store(_sig(), _text(5, _budget()), _budget())
+    hit = lookup(_sig(), _budget(scale=2))
+
+    assert hit["exact"] and hit["similarity"] == 1.0
+    new = _budget(scale=2)["breakdown"]
+    assert f"Hotel ₹{new['hotel']:,}" in hit["itinerary"]
+    assert f"Total {new['total_estimated']:,} INR ({new['total_estimated'] // 2:,} per person)" in hit["itinerary"]
+
+
+def test_similar_hit_adapts_days_and_every_figure():
+    store(_sig(days=5), _text(5, _budget(days=5)), _budget(days=5))
+    extra = [{"day": 6, "destination": "Goa", "weather": None, "visits": [{"name": "Fort 5"}], "food": []}]
+    hit = lookup(_sig(days=6), _budget(days=6), extra)
+
+    assert hit and not hit["exact"]
+    text = hit["itinerary"]
+    new = _budget(days=6)["breakdown"]
+    assert text.startswith("# Goa: 6 days for 2 travellers")
+    assert f"Hotel ₹{new['hotel']:,}, meals ₹{new['meals']:,}" in text
+    assert f"({new['total_estimated'] // 2:,} per person)" in text
+    assert "Day 6" in text
+    assert "open 5 days a week, 4,500 steps to the top" in text
+
+
+def test_same_cell_other_city_is_not_reused():
+    store(_sig(destination="Pune"), _text(5, _budget()), _budget())
+
+    assert lookup(_sig(destination="Mumbai"), _budget()) is None
+    assert lookup(_sig(destination="pune"), _budget())["exact"]
+
+
+def test_no_reuse_across_persons_or_mode():
+    store(_sig(), _text(5, _budget()), _budget())
+
+    assert lookup(_sig(persons=3), _budget(persons=3)) is None
+    assert lookup(_sig(mode="per_day"), _budget()) is None
+
+
+def test_ambiguous_figures_are_not_reused():
+    budget = _budget()
+    budget["breakdown"]["local_transport"] = budget["breakdown"]["contingency"]
+    store(_sig(), _text(5, budget), budget)
+
+    assert lookup(_sig(), _budget(scale=2)) is None
+
+
+def test_single_itinerary_is_not_served_to_a_per_day_run(providers):
+    app = build_travel_graph()
+    app.invoke(TravelState(destination="Goa", days=4, itinerary_mode="single"))
+    single_calls = providers.calls.count("groq")
+    app.invoke(TravelState(destination="Goa", days=4, itinerary_mode="auto"))
+
+    assert providers.calls.count("groq") > single_calls
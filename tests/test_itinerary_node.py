@@ -0,0 +1,17 @@
+from src.tools import rate_limit
+from src.workflow.state import TravelState, routing_matrix
+from src.workflow.travel_graph import build_travel_graph
+
+
+def test_food_places_are_meals_not_visits(providers, monkeypatch):
+    for host in ("api.geoapify.com", "router.project-osrm.org"):
+        monkeypatch.setitem(rate_limit.PROVIDER_LIMITS, host, (1000.0, 100))
+    result = build_travel_graph().invoke(TravelState(destination="Goa", days=2, itinerary_mode="template"))
+
+    food = {p["name"] for p in result["places"]["food"]}
+    # The routing node routes a food place along with the sights...
+    assert food & set(routing_matrix(result["routing"])["names"])
+    # ...but the itinerary only books it for a meal
+    lines = [line for line in result["itinerary"].splitlines() if any(name in line for name in food)]
+    assert lines
+    assert all(line.startswith(("- Lunch at ", "- Dinner at ")) for line in lines)
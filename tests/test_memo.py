@@ -0,0 +1,23 @@
+from src.workflow import memo
+from src.workflow.memo import replan
+from src.workflow.travel_graph import TravelState, build_travel_graph
+
+
+def test_replan_reuses_unchanged_nodes(providers):
+    app = build_travel_graph()
+    first = app.invoke(TravelState(destination="Goa", days=2))
+    second = replan(app, first, days=3, budget_tier="budget")
+
+    assert set(second["skipped_nodes"]) == {"geocode", "weather", "places", "routing"}
+    assert second["budget"]["breakdown"]["days"] == 3
+
+
+def test_outputs_are_not_reused_past_their_cache_ttl(providers, monkeypatch):
+    app = build_travel_graph()
+    first = app.invoke(TravelState(destination="Goa", days=2))
+    monkeypatch.setitem(memo.NODE_TTL_S, "weather", 0)
+    monkeypatch.setitem(memo.NODE_TTL_S, "places", 0)
+    second = replan(app, first, days=3)
+
+    assert "weather" not in second["skipped_nodes"] and "places" not in second["skipped_nodes"]
+    assert "geocode" in second["skipped_nodes"]
@@ -0,0 +1,60 @@
+from src.data.pricing_model import estimate_local_transport_cost
+from src.tools import rate_limit
+from src.tools.poi_index import haversine_m
+from src.workflow.multi_city import fan_out, split_days
+from src.workflow.state import TravelState, routing_matrix
+from src.workflow.travel_graph import build_travel_graph
+
+STOPS = {"Hanoi": (21.03, 105.85), "Hoi An": (15.88, 108.33), "Saigon": (10.78, 106.70)}
+
+
+def test_split_days():
+    assert split_days(5, 3) == [2, 2, 1]
+    assert split_days(2, 3) == [1, 1, 1]
+
+
+def test_single_destination_does_not_fan_out(providers):
+    assert fan_out(TravelState(destination="Goa")) == "geocode"
+    assert providers.calls == []
+
+
+def test_fan_out_sends_one_task_per_city(providers):
+    providers.coords.update(STOPS)
+    sends = fan_out(TravelState(destinations=list(STOPS), days=5))
+
+    assert [s.node for s in sends] == ["city"] * 3
+    assert [(s.arg.index, s.arg.destination, s.arg.days) for s in sends] == [
+        (0, "Hanoi", 2), (1, "Hoi An", 2), (2, "Saigon", 1)]
+    # Geocoded once each up front, forecasts in one batched request
+    assert providers.calls.count("nominatim.openstreetmap.org") == 3
+    assert providers.calls.count("api.open-meteo.com") == 1
+
+
+def test_cities_are_planned_and_merged_in_order(providers, monkeypatch):
+    providers.coords.update(STOPS)
+    for host in ("api.geoapify.com", "router.project-osrm.org"):
+        monkeypatch.setitem(rate_limit.PROVIDER_LIMITS, host, (1000.0, 100))
+    result = build_travel_graph().invoke(TravelState(destinations=["Saigon", "Hanoi", "Hoi An"], days=4))
+
+    cities = sorted(result["cities"], key=lambda c: c["index"])
+    assert [c["destination"] for c in cities] == ["Saigon", "Hanoi", "Hoi An"]
+    assert [c["days"] for c in cities] == [2, 1, 1]
+    for c in cities:
+        assert (c["geocode"]["lat"], c["geocode"]["lon"]) == STOPS[c["destination"]]
+        assert c["weather"]["forecast_ref"]
+        assert routing_matrix(c["routing"])["names"] == c["routing"]["names"]
+        assert any(c["places"].values())
+    # The city sub-pipelines reused the up-front geocodes and forecasts
+    assert providers.calls.count("nominatim.openstreetmap.org") == 3
+    assert providers.calls.count("api.open-meteo.com") == 1
+
+    assert {"Saigon:geocode", "Hanoi:routing", "Hoi An:places"} <= set(result["node_timings"])
+    assert not result.get("skipped_nodes") and not result.get("degraded")
+
+    # One budget over every city, including the legs between them
+    breakdown = result["budget"]["breakdown"]
+    assert breakdown["destination"] == "Saigon → Hanoi → Hoi An"
+    assert breakdown["days"] == 4
+    legs_km = (haversine_m(*STOPS["Saigon"], *STOPS["Hanoi"]) + haversine_m(*STOPS["Hanoi"], *STOPS["Hoi An"])) / 1000
+    assert breakdown["local_transport"] > estimate_local_transport_cost(legs_km, breakdown["destination"])
+    assert result["itinerary"]
@@ -0,0 +1,81 @@
+import threading
+
+import pytest
+
+from src.tools import places
+from src.tools.circuit_breaker import CircuitOpenError
+from src.tools.deadline import DeadlineExceeded
+from src.tools.places import BEACHES, NATURE, iter_beaches, iter_places
+from src.workflow.nodes.places_node import MAX_CANDIDATES, places_node
+from src.workflow.state import TravelState
+
+
+def feature(category, i):
+    lat, lon = 15.3 + 0.001 * i, 74.08
+    return {"properties": {"name": f"{category} {i}", "lat": lat, "lon": lon, "place_id": f"{category}-{i}"}}
+
+
+@pytest.fixture
+def geoapify(monkeypatch):
+    """Fake _fetch_places: `total[category]` results (default 1000); records (category, offset) per page."""
+    pages, lock = [], threading.Lock()
+    total, errors = {}, {}
+
+    def fetch(lat, lon, category, radius=5000, limit=20, offset=0):
+        with lock:
+            pages.append((category, offset))
+        if category in errors:
+            raise errors[category]
+        n = total.get(category, 1000)
+        return {"features": [feature(category, i) for i in range(offset, min(n, offset + limit))]}
+
+    monkeypatch.setattr(places, "_fetch_places", fetch)
+    return pages, total, errors
+
+
+def test_stream_stops_at_max_candidates(geoapify):
+    pages, _, _ = geoapify
+
+    pois = list(iter_places(15.3, 74.08, "tourism", max_pois=MAX_CANDIDATES))
+
+    assert len(pois) == MAX_CANDIDATES
+    assert pages == [("tourism", 0), ("tourism", 20), ("tourism", 40)]
+
+
+def test_stream_ends_with_the_results(geoapify):
+    pages, total, _ = geoapify
+    total["tourism"] = 30
+
+    assert len(list(iter_places(15.3, 74.08, "tourism", max_pois=MAX_CANDIDATES))) == 30
+    assert pages == [("tourism", 0), ("tourism", 20)]
+
+
+def test_places_node_reads_only_the_pages_it_needs(geoapify):
+    pages, _, _ = geoapify
+    state = TravelState(destination="Goa", geocode={"place": "Goa", "lat": 15.3, "lon": 74.08, "display_name": "Goa"})
+
+    state = places_node(state)
+
+    assert all(len(group) == 3 for group in state.places.values())
+    # Three distinct POIs each come from the first page: the next one is never requested
+    assert sorted(offset for _, offset in pages) == [0, 0, 0]
+
+
+def test_beaches_fall_back_to_nature_when_the_sea_is_empty(geoapify):
+    pages, total, _ = geoapify
+    total[BEACHES] = 0
+
+    pois = list(iter_beaches(15.3, 74.08, max_pois=5))
+
+    assert [p.name for p in pois] == [f"{NATURE} {i}" for i in range(5)]
+    assert [c for c, _ in pages] == [BEACHES, NATURE]
+
+
+@pytest.mark.parametrize("error", [DeadlineExceeded("plan deadline reached"), CircuitOpenError("geoapify circuit open")])
+def test_beaches_raise_deadline_and_open_circuit(geoapify, error):
+    pages, _, errors = geoapify
+    errors[BEACHES] = error
+
+    with pytest.raises(type(error)):
+        list(iter_beaches(15.3, 74.08, max_pois=5))
+    assert [c for c, _ in pages] == [BEACHES]
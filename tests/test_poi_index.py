@@ -0,0 +1,76 @@
+from src.tools.poi import UNNAMED, poi_from_dict
+from src.tools.poi_index import POIIndex, dedupe_categories
+
+LAT, LON = 15.4909, 73.8278
+NEAR = 0.0002      # ~22 m
+FAR = 0.005        # ~550 m
+
+
+def place(name, dlat=0.0, place_id=None, categories=()):
+    return {"name": name, "lat": LAT + dlat, "lon": LON, "place_id": place_id, "categories": list(categories)}
+
+
+def test_same_place_id_merges_across_groups():
+    out = dedupe_categories({
+        "attractions": [place("Fort Aguada", place_id="p1", categories=["tourism.sights"])],
+        "beaches": [place("Fort Aguada", FAR, place_id="p1", categories=["beach"])],
+    })
+
+    assert out["beaches"] == []
+    (fort,) = out["attractions"]
+    assert fort.groups == ("attractions", "beaches")
+    assert fort.category_names == ["tourism.sights", "beach"]
+    assert (fort.lat, fort.lon) == (LAT, LON)
+
+
+def test_nearby_names_merge_only_when_they_are_the_same_place():
+    index = POIIndex()
+    index.add(place("Fort Aguada"), "attractions")
+
+    assert index.add(place("Aguada Fort", NEAR), "beaches")[1]
+    assert index.add(place("Fort Aguada.", NEAR), "food")[1]
+    assert not index.add(place("Fort Aguada", FAR))[1]
+    assert not index.add(place("Fort Aguada Lighthouse", NEAR))[1]
+    assert not index.add(place("Fortune Cafe", NEAR))[1]
+    assert len(index) == 4 and index.merged == 2
+    assert index.pois[0].groups == ("attractions", "beaches", "food")
+
+
+def test_unnamed_pois_merge_into_their_named_neighbour():
+    assert poi_from_dict(place("")).name == UNNAMED
+
+    out = dedupe_categories({
+        "attractions": [place(""), place("Goa", FAR)],
+        "beaches": [place("Candolim Beach", NEAR, categories=["beach"]), place(None, FAR + NEAR)],
+    })
+
+    # The unnamed copy came first: it is kept, under the name of the copy merged into it
+    assert [p.name for p in out["attractions"]] == ["Candolim Beach", "Goa"]
+    assert out["attractions"][0].groups == ("attractions", "beaches")
+    assert out["beaches"] == []
+
+
+def test_streams_stop_at_the_limit_and_are_closed():
+    read = []
+
+    def stream():
+        for i in range(10):
+            read.append(i)
+            yield place(f"Stop {i}", i * FAR)
+
+    gen = stream()
+    out = dedupe_categories({"attractions": gen, "food": [place("Stop 0")]}, limit=3)
+
+    assert [p.name for p in out["attractions"]] == ["Stop 0", "Stop 1", "Stop 2"]
+    assert read == [0, 1, 2]
+    assert gen.gi_frame is None
+    assert out["food"] == []
+
+
+def test_nearest_and_within():
+    index = POIIndex()
+    for i in range(5):
+        index.add(place(f"Stop {i}", i * FAR))
+
+    assert [p.name for p in index.nearest(LAT + 3.1 * FAR, LON, k=2)] == ["Stop 3", "Stop 4"]
+    assert [p.name for p in index.within(LAT, LON, 1200)] == ["Stop 0", "Stop 1", "Stop 2"]
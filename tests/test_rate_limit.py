@@ -0,0 +1,82 @@
+import threading
+import time
+from email.utils import formatdate
+
+import pytest
+import requests
+
+from conftest import FakeResponse
+from src.tools import rate_limit
+from src.tools.rate_limit import TokenBucket, _parse_retry_after, polite_get
+
+
+def test_gcra_spaces_tokens_after_the_burst():
+    bucket = TokenBucket(rate=10, burst=2)
+    waits = [bucket.reserve() for _ in range(5)]
+
+    assert waits[:2] == [0.0, 0.0]
+    assert waits[2:] == pytest.approx([0.1, 0.2, 0.3], abs=0.01)
+
+
+def test_concurrent_callers_get_exactly_the_rate():
+    rate_limit.configure("paced.example", rate=20, burst=1)
+    starts = []
+
+    def worker():
+        for _ in range(5):
+            rate_limit.acquire("paced.example")
+            starts.append(time.monotonic())
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    starts.sort()
+    gaps = [b - a for a, b in zip(starts, starts[1:])]
+    assert starts[-1] - starts[0] == pytest.approx(19 / 20, abs=0.05)
+    assert min(gaps) > 0.03
+
+
+def test_buckets_sharing_a_file_pace_each_other(tmp_path):
+    a = TokenBucket(rate=2, burst=1, path=tmp_path / "host.bucket")
+    b = TokenBucket(rate=2, burst=1, path=tmp_path / "host.bucket")
+
+    assert a.reserve() == 0.0
+    assert b.reserve() == pytest.approx(0.5, abs=0.02)
+
+
+def test_retry_after_blocks_the_host(monkeypatch):
+    rate_limit.configure("busy.example", rate=100, burst=10)
+    sent = []
+
+    def fake_get(url, params=None, headers=None, timeout=None):
+        sent.append(time.monotonic())
+        if len(sent) == 1:
+            resp = FakeResponse({}, status_code=429)
+            resp.headers = {"Retry-After": "0.4"}
+            return resp
+        return FakeResponse({"ok": True})
+
+    monkeypatch.setattr(requests, "get", fake_get)
+    resp = polite_get("https://busy.example/api", hedge=False)
+
+    assert resp.json() == {"ok": True}
+    assert sent[1] - sent[0] >= 0.39
+
+
+def test_a_blocked_host_holds_every_caller_without_a_burst_after():
+    bucket = TokenBucket(rate=10, burst=5)
+    bucket.block(0.5)
+
+    assert bucket.try_reserve(0.1) is None
+    assert [bucket.reserve() for _ in range(3)] == pytest.approx([0.5, 0.6, 0.7], abs=0.02)
+
+
+def test_retry_after_http_date():
+    in_two_minutes = formatdate(time.time() + 120, usegmt=True)
+
+    assert _parse_retry_after("7") == 7.0
+    assert _parse_retry_after(in_two_minutes) == pytest.approx(120, abs=2)
+    assert _parse_retry_after("soon") is None
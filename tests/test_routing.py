@@ -0,0 +1,29 @@
+from src.workflow.nodes.places_node import places_node
+from src.workflow.nodes.routing_node import routing_node
+from src.workflow.state import TravelState, routing_matrix
+from src.workflow.travel_graph import build_travel_graph
+
+
+def test_places_output_routes_to_a_non_empty_matrix(providers):
+    state = TravelState(destination="Goa", days=2, geocode={"place": "Goa", "lat": 15.3, "lon": 74.08, "display_name": "Goa"})
+    state = places_node(state)
+    assert any(state.places.values())
+
+    update = routing_node(state)
+    routing = update["routing"]
+    matrix = routing_matrix(routing)
+
+    assert routing["names"] and not routing["approximate"]
+    assert "degraded" not in update
+    assert matrix["names"] == routing["names"]
+    n = len(routing["names"])
+    assert len(matrix["duration_s"]) == n and all(len(row) == n for row in matrix["duration_s"])
+    assert any(d > 0 for row in matrix["distance_m"] for d in row)
+
+
+def test_planned_trip_has_a_routed_matrix(providers):
+    result = build_travel_graph().invoke(TravelState(destination="Goa", days=2))
+
+    assert routing_matrix(result["routing"])["names"]
+    assert any("osrm" in host for host in providers.calls)
+    assert "routing" not in result.get("degraded", [])
@@ -0,0 +1,131 @@
+from types import SimpleNamespace
+
+import pytest
+
+from src.tools import rate_limit, routing_matrix
+from src.tools.routing_matrix import calibrate_profile, compute_approx_matrix, compute_matrix_from_places, update_matrix
+from src.workflow.artifacts import put_artifact
+from src.workflow.nodes.routing_node import routing_node
+from src.workflow.state import TravelState
+
+# Along one meridian, so the fake OSRM's degree distance matches great-circle distance
+PLACES = [{"name": f"P{i}", "lat": 15.30 + 0.02 * i, "lon": 74.08} for i in range(6)]
+
+
+def test_approx_matrix_uses_the_profile(monkeypatch):
+    monkeypatch.setitem(routing_matrix.SPEED_PROFILES, "driving", {"circuity": 2.0, "speed_kmh": 36.0})
+    matrix = compute_approx_matrix(PLACES[:2])
+
+    gc = routing_matrix.haversine_matrix_m([p["lat"] for p in PLACES[:2]], [p["lon"] for p in PLACES[:2]])[0, 1]
+    assert matrix["approximate"] and matrix["names"] == ["P0", "P1"]
+    assert matrix["distance_m"][0][1] == pytest.approx(2.0 * gc)
+    assert matrix["duration_s"][0][1] == pytest.approx(2.0 * gc / 10.0)
+    assert matrix["duration_readable"][0][1].startswith("~")
+    assert matrix["distance_m"][0][0] == 0.0
+
+
+def test_calibration_fits_osrm_and_approx_follows(providers, monkeypatch):
+    monkeypatch.setitem(rate_limit.PROVIDER_LIMITS, "router.project-osrm.org", (1000.0, 100))
+    monkeypatch.setitem(routing_matrix.SPEED_PROFILES, "driving", dict(routing_matrix.SPEED_PROFILES["driving"]))
+
+    # The fake OSRM routes 1.3 × the straight line at 11 m/s
+    profile = calibrate_profile(PLACES, sample_size=8)
+
+    assert profile["circuity"] == pytest.approx(1.3, rel=0.01)
+    assert profile["speed_kmh"] == pytest.approx(39.6, rel=0.01)
+    assert routing_matrix.SPEED_PROFILES["driving"] == profile
+    assert providers.calls.count("router.project-osrm.org") == 8
+
+    approx = compute_approx_matrix(PLACES)
+    routed = compute_matrix_from_places(PLACES, modes=())
+    for i in range(len(PLACES)):
+        for j in range(len(PLACES)):
+            assert approx["duration_s"][i][j] == pytest.approx(routed["duration_s"][i][j], rel=0.01)
+
+
+def test_calibration_keeps_the_profile_when_osrm_fails(providers, monkeypatch):
+    before = dict(routing_matrix.SPEED_PROFILES["driving"])
+    monkeypatch.setattr(routing_matrix, "osrm_route", lambda *a, **k: (_ for _ in ()).throw(RuntimeError("down")))
+
+    assert calibrate_profile(PLACES, sample_size=4) == before
+    assert routing_matrix.SPEED_PROFILES["driving"] == before
+
+
+@pytest.fixture
+def osrm(providers, monkeypatch):
+    """Fast fake OSRM; osrm.down holds latitudes whose routes fail."""
+    monkeypatch.setitem(rate_limit.PROVIDER_LIMITS, "router.project-osrm.org", (1000.0, 100))
+    route = routing_matrix.osrm_route
+    down = set()
+
+    def flaky(lat1, lon1, lat2, lon2, mode="driving"):
+        if {lat1, lat2} & down:
+            raise ConnectionError("OSRM unavailable")
+        return route(lat1, lon1, lat2, lon2, mode=mode)
+
+    monkeypatch.setattr(routing_matrix, "osrm_route", flaky)
+    return SimpleNamespace(down=down, calls=lambda: providers.calls.count("router.project-osrm.org"))
+
+
+def assert_consistent(matrix):
+    n = len(matrix["names"])
+    assert [p["name"] for p in matrix["places"]] == matrix["names"]
+    for sq in routing_matrix._square_lists(matrix):
+        assert len(sq) == n and all(len(row) == n for row in sq)
+    for i, j in matrix.get("approx_cells", []):
+        assert matrix["distance_readable"][i][j].startswith("~")
+
+
+def test_added_poi_routes_only_its_row_and_column(osrm):
+    matrix = compute_matrix_from_places(PLACES[:4])
+    before = osrm.calls()
+
+    update_matrix(matrix, add=[PLACES[4]])
+
+    # N = 5 now: the 2N - 1 new cells are 8 routed legs plus the diagonal
+    assert osrm.calls() - before == 8
+    assert_consistent(matrix)
+    full = compute_matrix_from_places(PLACES[:5])
+    assert matrix["duration_s"] == full["duration_s"]
+    assert matrix["modes"]["walking"] == full["modes"]["walking"]
+
+
+def test_removal_keeps_estimated_cells_aligned(osrm):
+    osrm.down.add(PLACES[3]["lat"])
+    matrix = compute_matrix_from_places(PLACES[:5])
+    assert matrix["approximate"] and len(matrix["approx_cells"]) == 8
+
+    update_matrix(matrix, remove=["P1", 0])
+
+    assert matrix["names"] == ["P2", "P3", "P4"]
+    assert_consistent(matrix)
+    # Still down: the cells of P3 stay estimated, at its new index
+    assert sorted(map(tuple, matrix["approx_cells"])) == [(0, 1), (1, 0), (1, 2), (2, 1)]
+    assert matrix["approximate"]
+
+
+def test_estimated_cells_are_rerouted_when_osrm_is_back(osrm):
+    osrm.down.add(PLACES[2]["lat"])
+    matrix = compute_matrix_from_places(PLACES[:4])
+    assert len(matrix["approx_cells"]) == 6
+
+    osrm.down.clear()
+    before = osrm.calls()
+    update_matrix(matrix, remove=["P0"])
+
+    # Only the 4 estimated cells left after the removal were routed
+    assert osrm.calls() - before == 4
+    assert matrix["approx_cells"] == [] and not matrix["approximate"]
+    assert_consistent(matrix)
+    assert matrix == compute_matrix_from_places(PLACES[1:4])
+
+
+def test_replan_recomputes_a_straight_line_matrix(osrm):
+    state = TravelState(destination="Goa", places={"attractions": PLACES[:3]},
+                        routing={"names": [], "approximate": True,
+                                 "matrix_ref": put_artifact(compute_approx_matrix(PLACES[:3]))})
+
+    routing = routing_node(state)["routing"]
+
+    assert not routing["approximate"]
+    assert osrm.calls() == 6
@@ -0,0 +1,51 @@
+import io
+import json
+
+from travel_planner import run_streaming
+from src.workflow.checkpoint import new_run_id, open_checkpointer
+from src.workflow.travel_graph import TravelState, build_travel_graph
+
+NODES = ["geocode", "weather", "places", "routing", "budget", "itinerary"]
+
+
+def ndjson_run(app, saver, run_id, state=None):
+    out = io.StringIO()
+    result = run_streaming(app, state or TravelState(destination="Goa", days=2), run_id, saver, "ndjson", out)
+    return result, [json.loads(line) for line in out.getvalue().splitlines()]
+
+
+def test_ndjson_events_arrive_in_node_order(providers):
+    providers.latency["groq"] = 0.5
+    saver = open_checkpointer("checkpoints.sqlite")
+    app = build_travel_graph(checkpointer=saver)
+    run_id = new_run_id()
+
+    result, events = ndjson_run(app, saver, run_id)
+
+    kinds = [e["event"] if e["event"] != "node" else e["node"] for e in events]
+    assert kinds == ["start", "geocode", "weather", "useful", *NODES[2:], "done"]
+    assert all(e["run_id"] == run_id for e in events)
+    assert [e["t"] for e in events] == sorted(e["t"] for e in events)
+    assert events[0]["resumed_at"] == []
+
+    useful, done = events[3], events[-1]
+    assert useful["node"] == "weather"
+    # The user sees the forecast long before the itinerary's LLM call returns
+    assert done["ttfu_s"] == useful["t"]
+    assert done["total_s"] - done["ttfu_s"] >= 0.5
+    assert "Goa" in events[1]["summary"] and "°C" in events[2]["summary"]
+    assert done["result"]["itinerary"] == result["itinerary"]
+
+
+def test_finished_run_streams_start_and_done(providers):
+    saver = open_checkpointer("checkpoints.sqlite")
+    app = build_travel_graph(checkpointer=saver)
+    run_id = new_run_id()
+    first, _ = ndjson_run(app, saver, run_id)
+    calls = len(providers.calls)
+
+    result, events = ndjson_run(app, saver, run_id)
+
+    assert [e["event"] for e in events] == ["start", "done"]
+    assert result["itinerary"] == first["itinerary"]
+    assert len(providers.calls) == calls
@@ -0,0 +1,46 @@
+import pytest
+
+from src.tools import rate_limit
+from src.workflow.archive import append_plan
+from src.workflow.state import TravelState
+from src.workflow.travel_graph import build_travel_graph
+from src.workflow.warmer import top_destinations, warm
+
+
+@pytest.fixture(autouse=True)
+def fast_providers(monkeypatch):
+    for host in ("api.geoapify.com", "router.project-osrm.org"):
+        monkeypatch.setitem(rate_limit.PROVIDER_LIMITS, host, (1000.0, 100))
+
+
+def test_warmed_destination_plans_without_provider_calls(providers):
+    (report,) = warm(["Goa"])
+    assert report["requests"] > 0 and report["pois_routed"] > 0
+
+    providers.calls.clear()
+    result = build_travel_graph().invoke(TravelState(destination="Goa", days=2, itinerary_mode="template"))
+
+    assert result["routing"]["names"]
+    assert providers.calls == []
+
+
+def test_rerun_is_incremental_and_refresh_ahead_refetches(providers):
+    warm(["Goa"])
+
+    providers.calls.clear()
+    (again,) = warm(["Goa"])
+    assert again["requests"] == 0 and providers.calls == []
+
+    # Every entry past 0% of its TTL is due: all but the (TTL-less) geocode are re-fetched
+    (refreshed,) = warm(["Goa"], refresh_fraction=0.0)
+    assert refreshed["requests"] > 0
+    assert "nominatim.openstreetmap.org" not in providers.calls
+    assert {"api.open-meteo.com", "api.geoapify.com", "router.project-osrm.org"} <= set(providers.calls)
+
+
+def test_top_destinations_count_every_stop(tmp_path):
+    path = str(tmp_path / "plans")
+    for dest in ["Goa", "Pune", "Goa", "Hanoi → Goa", "Hanoi"]:
+        append_plan({"destination": dest}, path=path)
+
+    assert top_destinations(2, path=path) == ["Goa", "Hanoi"]
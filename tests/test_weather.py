@@ -0,0 +1,75 @@
+import pytest
+
+from src.tools import weather
+from src.tools.weather import WEATHER_CACHE, WEATHER_TTL_S, _cache_key, get_weather_forecast, get_weather_forecasts
+from src.workflow.nodes.weather_node import weather_node
+from src.workflow.state import TravelState, weather_forecast
+
+OPEN_METEO = "api.open-meteo.com"
+STOPS = [(21.03, 105.85), (15.88, 108.33), (10.78, 106.70), (16.05, 108.22), (12.24, 109.19)]
+
+
+def expire(lat, lon, forecast):
+    WEATHER_CACHE.set(_cache_key(lat, lon), forecast)
+    WEATHER_CACHE._entries()[_cache_key(lat, lon)]["t"] -= WEATHER_TTL_S + 1
+
+
+def unavailable(*args, **kwargs):
+    raise ConnectionError("open-meteo down")
+
+
+def test_batched_response_is_split_back_per_location(providers):
+    WEATHER_CACHE.set(_cache_key(*STOPS[1]), {"latitude": "cached"})
+    coords = STOPS + [STOPS[0]]
+
+    results = get_weather_forecasts(coords, batch_size=2)
+
+    # 4 locations to fetch (one cached, one repeated): two requests of two
+    assert providers.calls == [OPEN_METEO, OPEN_METEO]
+    assert [r["latitude"] for r in results] == [21.03, "cached", 10.78, 16.05, 12.24, 21.03]
+    assert all(r["daily"]["time"] for i, r in enumerate(results) if i != 1)
+
+    providers.calls.clear()
+    assert get_weather_forecast(*STOPS[4])["latitude"] == 12.24
+    assert providers.calls == []
+
+
+def test_single_location_batch(providers):
+    (forecast,) = get_weather_forecasts(STOPS[:1])
+    assert forecast["latitude"] == 21.03 and providers.calls == [OPEN_METEO]
+
+
+def test_failed_batch_serves_stale_forecasts(providers, monkeypatch):
+    expire(*STOPS[0], {"latitude": "old"})
+    monkeypatch.setattr(weather, "polite_get", unavailable)
+
+    results = get_weather_forecasts(STOPS[:2])
+    assert results == [{"latitude": "old", "stale": True}, None]
+
+    assert get_weather_forecast(*STOPS[0]) == {"latitude": "old", "stale": True}
+    with pytest.raises(ConnectionError):
+        get_weather_forecast(*STOPS[1])
+
+
+def test_weather_node_reuses_a_batched_forecast(providers):
+    get_weather_forecasts(STOPS[:3])
+    providers.calls.clear()
+    lat, lon = STOPS[2]
+    state = TravelState(destination="Saigon", geocode={"place": "Saigon", "lat": lat, "lon": lon, "display_name": "Saigon"})
+
+    update = weather_node(state)
+
+    assert providers.calls == []
+    assert weather_forecast(update["weather"])["temperature_2m_max"] == [31, 32, 30]
+    assert not update["weather"]["stale"] and "degraded" not in update
+
+
+def test_weather_node_marks_a_stale_forecast(providers, monkeypatch):
+    expire(*STOPS[0], {"daily": {"time": ["2026-01-01"]}})
+    monkeypatch.setattr(weather, "polite_get", unavailable)
+    state = TravelState(destination="Hanoi", geocode={"place": "Hanoi", "lat": STOPS[0][0], "lon": STOPS[0][1],
+                                                      "display_name": "Hanoi"})
+
+    update = weather_node(state)
+
+    assert update["weather"]["stale"] and update["degraded"] == ["weather"]
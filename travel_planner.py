@@ -1,27 +1,203 @@
-from src.workflow.travel_graph import app, TravelState
+from src.workflow.travel_graph import build_travel_graph, TravelState
+from src.workflow.checkpoint import open_checkpointer, invoke_resumable, new_run_id, run_config, CHECKPOINT_DB
+from src.workflow.memo import replan
+from src.workflow.archive import append_plan, PLAN_ARCHIVE
+from src.workflow.streaming import stream_run, print_human, print_ndjson
+from src.tools.circuit_breaker import breaker_events, breaker_states
+from src.tools.llm_telemetry import format_summary, summarize_calls
+from src.tools.geocode import geocode_many
+from src.tools.weather import get_weather_forecasts
+import argparse
+import json
+import shlex
 import sys
 from pprint import pprint
 
+
+def read_batch(path):
+    """Batch file: one destination per line, or JSON lines with TravelState fields
+    (e.g. {"destination": "Goa, India", "days": 4} or {"destinations": ["Hanoi", "Hoi An"]})."""
+    with open(path, encoding="utf-8") as fh:
+        for line in fh:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            yield json.loads(line) if line.startswith("{") else {"destination": line}
+
+
+def run_streaming(app, state, run_id, saver, fmt, out=None):
+    """Run with progressive output ("human" lines or "ndjson" events); returns the final state."""
+    result = None
+    for event in stream_run(app, state, run_id, saver):
+        if fmt == "ndjson":
+            print_ndjson(event, out or sys.stdout)
+        else:
+            print_human(event)
+        if event["event"] == "done":
+            result = event["result"]
+    return result
+
+
+def run_batch(app, saver, path, archive, stream=None, out=None, sla=None):
+    """Plan every trip in the batch file and append each finished plan to the archive."""
+    trips = [{"sla_s": sla, **fields} for fields in read_batch(path)]
+    # Geocode every place in the batch once, up front, then fetch all their
+    # forecasts in a few multi-location requests
+    geos = geocode_many([d for t in trips for d in (t.get("destinations") or [t.get("destination")]) if d])
+    get_weather_forecasts([(g["lat"], g["lon"]) for g in geos if g])
+
+    done = failed = 0
+    llm_calls = []
+    for i, fields in enumerate(trips, 1):
+        run_id = new_run_id()
+        try:
+            if stream:
+                result = run_streaming(app, TravelState(**fields), run_id, saver, stream, out)
+            else:
+                result = invoke_resumable(app, TravelState(**fields), run_id, saver)
+        except Exception as e:
+            failed += 1
+            print(f"[batch {i}] {fields} failed: {e} (resume with --run-id {run_id})")
+            continue
+        if archive:
+            append_plan(result, run_id, path=archive)
+        done += 1
+        llm_calls += result.get("llm_calls") or []
+        cut = f", {len(result['cuts'])} cuts" if result.get("cuts") else ""
+        print(f"[batch {i}] {result['budget']['breakdown']['destination']}: done ({run_id}{cut})")
+    print(f"[batch] {done} planned, {failed} failed" + (f"; archived to {archive}" if archive else ""))
+    report_llm(llm_calls, "[batch] LLM")
+    report_breakers()
+
+
+def poi_edits(changes, previous):
+    """Turn add="Name@lat,lon" / remove="Name" into extra_pois / excluded_pois changes."""
+    extra = list(previous.get("extra_pois") or [])
+    excluded = list(previous.get("excluded_pois") or [])
+    if "add" in changes:
+        name, _, coords = changes.pop("add").rpartition("@")
+        lat, lon = (float(x) for x in coords.split(","))
+        extra.append({"name": name, "lat": lat, "lon": lon})
+        excluded = [n for n in excluded if n != name]
+        changes["extra_pois"] = extra
+        changes["excluded_pois"] = excluded
+    if "remove" in changes:
+        name = changes.pop("remove")
+        changes["extra_pois"] = [p for p in extra if p["name"] != name]
+        changes["excluded_pois"] = excluded + [name]
+
+
+def report_cuts(result):
+    """List what was skipped or degraded to meet the plan's time budget."""
+    for cut in result.get("cuts") or []:
+        print(f"[deadline] cut at {cut['at_s']:.2f}s in {cut['stage']}: {cut['cut']}")
+    if result.get("degraded"):
+        print(f"[degraded] fallback or stale output from: {', '.join(dict.fromkeys(result['degraded']))} "
+              "(recomputed on the next plan)")
+
+
+def report_llm(calls, prefix="[llm]"):
+    """One summary line for LLM calls: tokens, TTFT, latency, throughput, truncation."""
+    if calls:
+        print(f"{prefix} {format_summary(summarize_calls(calls))}")
+
+
+def report_breakers():
+    """Show provider circuit breakers if any of them tripped during the run."""
+    if breaker_events():
+        for provider, st in breaker_states().items():
+            print(f"[breaker] {provider}: {st['state']} (error rate {st['error_rate']:.0%} over {st['calls']} calls)")
+
+
 if __name__ == "__main__":
-    # Take destination from argument
-    if len(sys.argv) < 2:
-        print("Usage: python travel_planner.py \"Goa, India\"")
-        sys.exit(1)
+    parser = argparse.ArgumentParser(description="Multi-agent travel planner")
+    parser.add_argument("destination", nargs="?", help='e.g. "Goa, India"')
+    parser.add_argument("--cities", nargs="+", metavar="CITY",
+                        help='multi-city trip in order, e.g. --cities "Hanoi" "Hoi An" "Ho Chi Minh City"')
+    parser.add_argument("--run-id", help="resume (or re-show) a previous run by id")
+    parser.add_argument("--checkpoint-db", default=CHECKPOINT_DB, help="SQLite checkpoint file")
+    parser.add_argument("--interactive", action="store_true",
+                        help="after the plan, tweak days/persons/budget and re-plan incrementally")
+    parser.add_argument("--itinerary-mode", choices=("auto", "single", "per_day", "template"), default="single",
+                        help="single: one completion (default); per_day: one concurrent completion per day "
+                             "plus an overview (auto: for trips of 4+ days); template: no LLM, rendered in milliseconds")
+    parser.add_argument("--batch", metavar="FILE",
+                        help="plan every trip in FILE (one destination or JSON object per line)")
+    parser.add_argument("--archive", default=PLAN_ARCHIVE,
+                        help="plan archive directory (see src.workflow.archive); '' disables archiving")
+    parser.add_argument("--sla", type=float, metavar="SECONDS",
+                        help="time budget per plan; slow stages are degraded to meet it (see result cuts)")
+    parser.add_argument("--stream", choices=("human", "ndjson"),
+                        help="show each node's result as soon as it completes (ndjson: one JSON event per line)")
+    args = parser.parse_args()
+
+    # In NDJSON mode stdout carries only events; diagnostics go to stderr
+    events_out = sys.stdout
+    if args.stream == "ndjson":
+        sys.stdout = sys.stderr
 
-    destination = sys.argv[1]
+    if args.batch:
+        saver = open_checkpointer(args.checkpoint_db)
+        run_batch(build_travel_graph(checkpointer=saver), saver, args.batch, args.archive,
+                  stream=args.stream, out=events_out, sla=args.sla)
+        raise SystemExit(0)
 
-    # Initial state
+    if not args.destination and not args.cities and not args.run_id:
+        print("Usage: python travel_planner.py \"Goa, India\" [--run-id RUN_ID]")
+        print("       python travel_planner.py --cities \"Hanoi\" \"Hoi An\" \"Ho Chi Minh City\"")
+        print("       python travel_planner.py --batch trips.txt")
+        raise SystemExit(1)
+
+    # Initial state (ignored when resuming an existing run)
     state = TravelState(
-        destination=destination,
+        destination=args.destination,
+        destinations=args.cities,
+        itinerary_mode=args.itinerary_mode,
+        sla_s=args.sla,
         days=5,
         persons=1,
         budget_inr=30000,
         budget_tier="mid"
     )
 
-    # Run the graph
-    result = app.invoke(state)
+    # Run the graph with per-node checkpoints
+    saver = open_checkpointer(args.checkpoint_db)
+    app = build_travel_graph(checkpointer=saver)
+    run_id = args.run_id or new_run_id()
+    print(f"[run {run_id}] if this run fails, resume with: --run-id {run_id}")
+
+    # Re-showing a finished run must not archive it twice
+    snapshot = app.get_state(run_config(run_id))
+    finished = bool(snapshot.values) and not snapshot.next
+    if args.stream:
+        result = run_streaming(app, state, run_id, saver, args.stream, events_out)
+    else:
+        result = invoke_resumable(app, state, run_id, saver)
+    if args.archive and not finished:
+        append_plan(result, run_id, path=args.archive)
 
-    # Print the final itinerary
-    pprint(result["itinerary"])
+    # Print the final itinerary (NDJSON consumers have it in the "done" event)
+    if args.stream != "ndjson":
+        pprint(result["itinerary"])
+    report_cuts(result)
+    report_llm(result.get("llm_calls"))
+    report_breakers()
 
+    # Interactive re-planning: unchanged nodes are served from the memo
+    while args.interactive:
+        line = input("\nChange days, persons, budget_inr, budget_tier (e.g. days=6 budget_tier=budget),\n"
+                     "add/remove a POI (e.g. add=\"Chapora Fort@15.605,73.736\" remove=\"Baga Beach\"), blank to quit: ").strip()
+        if not line:
+            break
+        try:
+            changes = dict(item.split("=", 1) for item in shlex.split(line))
+            poi_edits(changes, result)
+            replan_id = new_run_id()
+            result = replan(app, result, config=run_config(replan_id), **changes)
+        except ValueError as e:
+            print(f"[replan] {e}")
+            continue
+        if args.archive:
+            append_plan(result, replan_id, path=args.archive)
+        print(f"[replan] reused: {', '.join(result['skipped_nodes']) or 'nothing'}")
+        pprint(result["itinerary"])